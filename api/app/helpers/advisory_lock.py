@@ -0,0 +1,42 @@
+"""Postgres advisory locks for work that must not run twice across processes."""
+
+import asyncio
+import hashlib
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from sqlalchemy import func, select
+from sqlalchemy.engine import Engine
+
+
+def advisory_key(*parts: object) -> int:
+    """Map `parts` to a signed 64-bit advisory lock key."""
+    digest = hashlib.sha256(":".join(str(part) for part in parts).encode("utf-8"))
+    return int.from_bytes(digest.digest()[:8], "big", signed=True)
+
+
+@asynccontextmanager
+async def advisory_xact_lock(
+    engine: Engine, key: int, timeout: float, poll_interval: float = 0.2
+) -> AsyncIterator[bool]:
+    """
+    Hold a transaction-level advisory lock on a dedicated connection.
+
+    Yields whether the lock was acquired within `timeout` seconds. The lock
+    lives in its own transaction, so the caller's session can commit freely
+    while holding it; it is released when the block exits, or by Postgres
+    if the process dies. Polls with pg_try_advisory_xact_lock rather than
+    blocking, so waiting never stalls the event loop.
+    """
+    with engine.connect() as conn:
+        transaction = conn.begin()
+        try:
+            deadline = time.monotonic() + timeout
+            acquired = conn.scalar(select(func.pg_try_advisory_xact_lock(key)))
+            while not acquired and time.monotonic() < deadline:
+                await asyncio.sleep(poll_interval)
+                acquired = conn.scalar(select(func.pg_try_advisory_xact_lock(key)))
+            yield bool(acquired)
+        finally:
+            transaction.rollback()
@@ -1,23 +1,38 @@
 from fastapi.security import HTTPBearer
-from jose import jwt, JWTError
-from fastapi import Request, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi.security.api_key import APIKeyHeader
+from jose import jwk, jwt, JWTError
+from fastapi import Request, Depends, HTTPException, Security
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+import hashlib
 import logging
-import json
-import httpx
+import time
 from cryptography.hazmat.primitives.asymmetric.rsa import RSAPublicNumbers
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives import serialization
 import base64
 from app.models import User
-from app.helpers.database import get_db
+from app.helpers.cache import LRUCache
+from app.helpers.database import dialect_insert, get_async_db
+from app.helpers.jwks import jwks_cache
 from app.helpers.secrets import Secrets
+from app.helpers.secrets_service import SecretsService
 
 logger = logging.getLogger(__name__)
 
 ALGORITHMS = ["RS256"]
 token_auth_scheme = HTTPBearer()
 
+API_KEY_NAME = "X-API-Key"
+api_key_header = APIKeyHeader(name=API_KEY_NAME, auto_error=True)
+
+# Parsed public keys by kid, until the JWKS they came from is next refreshed,
+# and verified claims by token hash until `exp`
+signing_key_cache: LRUCache[str, jwk.Key] = LRUCache(maxsize=32)
+claims_cache: LRUCache[str, dict] = LRUCache(maxsize=4096)
+# Auth0 sub -> users.id, so steady-state requests resolve the user by primary key
+user_id_cache: LRUCache[str, int] = LRUCache(maxsize=10000)
+
 
 def ensure_bytes(key):
     if isinstance(key, str):
@@ -41,40 +56,54 @@ def rsa_pem_from_jwk(jwk):
     )
 
 
-async def get_jwks():
-    secrets = Secrets()
-    auth0_issuer_url: str = f"https://{secrets.Auth0Domain}/"
-    jwks_uri: str = f"{auth0_issuer_url}.well-known/jwks.json"
+async def get_jwks_uri() -> str:
+    secrets = await Secrets.aload()
+    return f"https://{secrets.Auth0Domain}/.well-known/jwks.json"
 
-    logger.debug(f"Fetching JWKS from: {jwks_uri}")
-    async with httpx.AsyncClient() as client:
-        response = await client.get(jwks_uri)
-        jwks = response.json()
-        logger.debug(f"Received JWKS: {json.dumps(jwks, indent=2)}")
-        return jwks
+
+async def get_jwks():
+    return await jwks_cache.get(await get_jwks_uri())
 
 
 async def get_signing_key(token):
-    jwks = await get_jwks()
     try:
         header = jwt.get_unverified_header(token)
         logger.debug(f"Token header: {header}")
 
-        for key in jwks["keys"]:
-            if key["kid"] == header["kid"]:
-                logger.debug(f"Found matching key: {key['kid']}")
-                if key["kty"] == "RSA":
-                    return rsa_pem_from_jwk(key)
+        kid = header["kid"]
+        signing_key = signing_key_cache.get(kid)
+        if signing_key is not None:
+            return signing_key
+
+        key = await jwks_cache.get_key(await get_jwks_uri(), kid)
+        if key is not None and key["kty"] == "RSA":
+            logger.debug(f"Found matching key: {key['kid']}")
+            signing_key = jwk.construct(rsa_pem_from_jwk(key), ALGORITHMS[0])
+            # Expire with the key set, so a key Auth0 rotates out or revokes
+            # stops validating once the JWKS no longer lists it
+            signing_key_cache.set(kid, signing_key, ttl=jwks_cache.expires_in())
+            return signing_key
 
         logger.error(f"No matching key found. Token kid: {header['kid']}")
         raise HTTPException(status_code=401, detail="No matching key found")
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting signing key: {str(e)}")
         raise HTTPException(status_code=401, detail=f"Invalid token: {str(e)}")
 
 
+def _token_cache_key(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
 async def validate_jwt(token):
-    secrets = Secrets()
+    cache_key = _token_cache_key(token)
+    cached_claims = claims_cache.get(cache_key)
+    if cached_claims is not None:
+        return cached_claims
+
+    secrets = await Secrets.aload()
     auth0_issuer_url: str = f"https://{secrets.Auth0Domain}/"
     auth0_audience: str = secrets.Auth0Audience
 
@@ -90,6 +119,9 @@ async def validate_jwt(token):
             audience=auth0_audience,
             issuer=auth0_issuer_url,
         )
+        ttl = payload.get("exp", 0) - time.time()
+        if ttl > 0:
+            claims_cache.set(cache_key, payload, ttl=ttl)
         return payload
     except JWTError as e:
         logger.error(f"Error validating JWT: {e}")
@@ -99,20 +131,11 @@ async def validate_jwt(token):
 async def get_authenticated_user(
     request: Request,
     token: HTTPBearer = Depends(token_auth_scheme),
-    db: Session = Depends(get_db),
 ):
     try:
         payload = await validate_jwt(token.credentials)
         sub = payload["sub"]
 
-        # Check if user exists, create if not
-        db_user = db.query(User).filter(User.sub == sub).first()
-        if not db_user:
-            db_user = User(sub=sub)
-            db.add(db_user)
-            db.commit()
-            db.refresh(db_user)
-
         user = {
             "sub": sub,
             "token": token.credentials,
@@ -122,3 +145,55 @@ async def get_authenticated_user(
     except JWTError as e:
         logger.error(f"Invalid token: {e}")
         raise HTTPException(status_code=401, detail="Invalid token")
+
+
+async def _get_or_create_user(db: AsyncSession, sub: str) -> User:
+    """
+    Insert the user if missing in a single statement. Concurrent first logins
+    race on the unique sub instead of both inserting.
+    """
+    stmt = (
+        dialect_insert(db, User)
+        .values(sub=sub)
+        .on_conflict_do_nothing(index_elements=[User.sub])
+        .returning(User)
+    )
+    user = (await db.scalars(stmt)).first()
+    if user is None:
+        user = (await db.scalars(select(User).where(User.sub == sub))).one()
+    await db.commit()
+    return user
+
+
+async def get_current_user(
+    auth_user: dict = Depends(get_authenticated_user),
+    db: AsyncSession = Depends(get_async_db),
+) -> User:
+    """
+    Resolve the authenticated user's row. FastAPI caches dependencies per
+    request, so every router depending on this shares one lookup. The row
+    is loaded on the async session; its columns stay readable after the
+    session closes, which is all routers on the sync session need.
+    """
+    sub = auth_user["sub"]
+    user_id = user_id_cache.get(sub)
+    user = await db.get(User, user_id) if user_id is not None else None
+    if user is None:
+        user = await _get_or_create_user(db, sub)
+        user_id_cache.set(sub, user.id)
+    return user
+
+
+async def verify_api_key(api_key: str = Security(api_key_header)):
+    stored_api_key = await SecretsService().aget_secret("INTERNAL_API_KEY")
+    if not stored_api_key:
+        raise HTTPException(
+            status_code=500,
+            detail={"message": "API key not configured", "code": "API_KEY_ERROR"},
+        )
+    if api_key != stored_api_key:
+        raise HTTPException(
+            status_code=403,
+            detail={"message": "Invalid API key", "code": "INVALID_API_KEY"},
+        )
+    return api_key
@@ -9,6 +9,43 @@ class Config:
     InfisicalClientSecret: str
     InfisicalProjectId: str
     Environment: str
+    SecretsCacheTTL: int
+    SecretsNegativeCacheTTL: int
+    SecretsMaxWorkers: int
+    SecretsMaxStale: int
+    SecretsRefreshInterval: int
+    SecretsRefreshRecentWindow: int
+    SecretsBackend: str
+    CredentialsMasterKey: str | None
+    CredentialsMasterKeyFile: str | None
+    BatchUpdateConcurrency: int
+    BatchUpdateVendorConcurrency: dict[str, int]
+    DatadogTimeout: float
+    DatadogConnectTimeout: float
+    DatadogMaxConnections: int
+    DatadogMaxRetries: int
+    DatadogRetryBackoff: float
+    DatadogRetryMaxBackoff: float
+    AwsClientCacheSize: int
+    AwsCeMaxWorkers: int
+    AwsGroupByLinkedAccount: bool
+    RefreshLockMode: str
+    RefreshLockTimeout: float
+    RefreshWorkersEnabled: bool
+    RefreshWorkerPollInterval: float
+    RefreshJobMaxAttempts: int
+    RefreshWorkerShardIndex: int
+    RefreshWorkerShardCount: int
+    VendorRateLimits: dict[str, dict[str, float]]
+    CostIngestionMode: str
+    DatabasePoolSize: int
+    DatabaseMaxOverflow: int
+    DatabasePoolTimeout: float
+    DatabasePoolPrePing: bool
+    DatabasePoolRecycle: int
+    DatabaseStatementTimeout: int
+    DatabaseEcho: bool
+    DatabasePgBouncer: bool
 
     def __init__(self):
         env_file = find_dotenv()
@@ -21,3 +58,98 @@ class Config:
         self.InfisicalClientSecret = os.getenv("INFISICAL_CLIENT_SECRET")
         self.InfisicalProjectId = os.getenv("INFISICAL_PROJECT_ID")
         self.Environment = os.getenv("ENVIRONMENT", "dev")
+        self.SecretsCacheTTL = int(os.getenv("SECRETS_CACHE_TTL", "300"))
+        self.SecretsNegativeCacheTTL = int(
+            os.getenv("SECRETS_NEGATIVE_CACHE_TTL", "30")
+        )
+        self.SecretsMaxWorkers = int(os.getenv("SECRETS_MAX_WORKERS", "8"))
+        self.SecretsMaxStale = int(os.getenv("SECRETS_MAX_STALE", "3600"))
+        self.SecretsRefreshInterval = int(os.getenv("SECRETS_REFRESH_INTERVAL", "30"))
+        self.SecretsRefreshRecentWindow = int(
+            os.getenv("SECRETS_REFRESH_RECENT_WINDOW", "900")
+        )
+        # Where customer credentials live: "infisical" or "database"
+        self.SecretsBackend = os.getenv("SECRETS_BACKEND", "infisical")
+        self.CredentialsMasterKey = os.getenv("CREDENTIALS_MASTER_KEY")
+        self.CredentialsMasterKeyFile = os.getenv("CREDENTIALS_MASTER_KEY_FILE")
+        # Refresh jobs a queue worker claims and runs at once
+        self.BatchUpdateConcurrency = int(os.getenv("BATCH_UPDATE_CONCURRENCY", "16"))
+        self.BatchUpdateVendorConcurrency = {
+            "aws": int(os.getenv("BATCH_UPDATE_AWS_CONCURRENCY", "4")),
+            "datadog": int(os.getenv("BATCH_UPDATE_DATADOG_CONCURRENCY", "8")),
+        }
+        self.DatadogTimeout = float(os.getenv("DATADOG_TIMEOUT", "30"))
+        self.DatadogConnectTimeout = float(os.getenv("DATADOG_CONNECT_TIMEOUT", "5"))
+        self.DatadogMaxConnections = int(os.getenv("DATADOG_MAX_CONNECTIONS", "20"))
+        self.DatadogMaxRetries = int(os.getenv("DATADOG_MAX_RETRIES", "3"))
+        self.DatadogRetryBackoff = float(os.getenv("DATADOG_RETRY_BACKOFF", "0.5"))
+        self.DatadogRetryMaxBackoff = float(
+            os.getenv("DATADOG_RETRY_MAX_BACKOFF", "30")
+        )
+        self.AwsClientCacheSize = int(os.getenv("AWS_CLIENT_CACHE_SIZE", "256"))
+        self.AwsCeMaxWorkers = int(os.getenv("AWS_CE_MAX_WORKERS", "8"))
+        # Break AWS costs down by linked account as well as by service
+        self.AwsGroupByLinkedAccount = (
+            os.getenv("AWS_GROUP_BY_LINKED_ACCOUNT", "false").lower() == "true"
+        )
+        # "local" coalesces refreshes per process; "advisory" also locks in Postgres
+        self.RefreshLockMode = os.getenv("REFRESH_LOCK_MODE", "local")
+        self.RefreshLockTimeout = float(os.getenv("REFRESH_LOCK_TIMEOUT", "30"))
+        # Run refresh queue workers inside the API process
+        self.RefreshWorkersEnabled = (
+            os.getenv("REFRESH_WORKERS_ENABLED", "true").lower() == "true"
+        )
+        self.RefreshWorkerPollInterval = float(
+            os.getenv("REFRESH_WORKER_POLL_INTERVAL", "5")
+        )
+        self.RefreshJobMaxAttempts = int(os.getenv("REFRESH_JOB_MAX_ATTEMPTS", "3"))
+        # Limit this process's workers to one slice of the refresh queue
+        self.RefreshWorkerShardIndex = int(os.getenv("REFRESH_WORKER_SHARD_INDEX", "0"))
+        self.RefreshWorkerShardCount = int(os.getenv("REFRESH_WORKER_SHARD_COUNT", "1"))
+        # Outbound cost API calls per second, for the whole vendor and per
+        # credential (Datadog organisation, AWS config); a rate of 0 disables
+        self.VendorRateLimits = {
+            "datadog": {
+                "rate": float(os.getenv("DATADOG_RATE_LIMIT", "10")),
+                "burst": float(os.getenv("DATADOG_RATE_BURST", "20")),
+                "credential_rate": float(
+                    os.getenv("DATADOG_CREDENTIAL_RATE_LIMIT", "1")
+                ),
+                "credential_burst": float(
+                    os.getenv("DATADOG_CREDENTIAL_RATE_BURST", "5")
+                ),
+            },
+            "aws": {
+                "rate": float(os.getenv("AWS_CE_RATE_LIMIT", "5")),
+                "burst": float(os.getenv("AWS_CE_RATE_BURST", "10")),
+                "credential_rate": float(
+                    os.getenv("AWS_CE_CREDENTIAL_RATE_LIMIT", "1")
+                ),
+                "credential_burst": float(
+                    os.getenv("AWS_CE_CREDENTIAL_RATE_BURST", "5")
+                ),
+            },
+        }
+        # "monthly" refetches whole months; "daily" stores daily costs for the
+        # current and previous month and rolls them up locally. Daily costs
+        # carry no breakdown, so in daily mode the service and product
+        # breakdown is only stored for the older, monthly-fetched months
+        self.CostIngestionMode = os.getenv("COST_INGESTION_MODE", "monthly")
+        self.DatabasePoolSize = int(os.getenv("DATABASE_POOL_SIZE", "10"))
+        self.DatabaseMaxOverflow = int(os.getenv("DATABASE_MAX_OVERFLOW", "10"))
+        self.DatabasePoolTimeout = float(os.getenv("DATABASE_POOL_TIMEOUT", "30"))
+        self.DatabasePoolPrePing = (
+            os.getenv("DATABASE_POOL_PRE_PING", "true").lower() == "true"
+        )
+        # Seconds before a connection is replaced; -1 keeps connections forever
+        self.DatabasePoolRecycle = int(os.getenv("DATABASE_POOL_RECYCLE", "1800"))
+        # Milliseconds; 0 disables the timeout
+        self.DatabaseStatementTimeout = int(
+            os.getenv("DATABASE_STATEMENT_TIMEOUT", "30000")
+        )
+        # Log every SQL statement
+        self.DatabaseEcho = os.getenv("DATABASE_ECHO", "false").lower() == "true"
+        # Connecting through PgBouncer in transaction pooling mode
+        self.DatabasePgBouncer = (
+            os.getenv("DATABASE_PGBOUNCER", "false").lower() == "true"
+        )
@@ -0,0 +1,173 @@
+"""Process-wide cache for the Auth0 JSON Web Key Set."""
+
+import asyncio
+import logging
+import re
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = 3600
+MIN_TTL_SECONDS = 60
+MIN_FORCED_REFRESH_INTERVAL_SECONDS = 30
+FETCH_TIMEOUT_SECONDS = 5.0
+# After a failed refresh, cached keys are served this long before retrying
+FAILED_FETCH_BACKOFF_SECONDS = 30
+
+_MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+
+def ttl_from_cache_control(header: Optional[str], default: int) -> int:
+    """
+    Return the max-age of a Cache-Control header, or `default` if absent.
+    Never drops below MIN_TTL_SECONDS so a misconfigured header cannot turn
+    every request back into a JWKS fetch.
+    """
+    match = _MAX_AGE_RE.search(header or "")
+    ttl = int(match.group(1)) if match else default
+    return max(ttl, MIN_TTL_SECONDS)
+
+
+class JWKSCache:
+    """
+    Holds the JWKS in memory until its Cache-Control max-age expires.
+
+    Concurrent callers that miss the cache share a single fetch. A token
+    signed with an unknown kid triggers at most one forced refresh, and
+    forced refreshes are rate limited so bogus kids cannot hammer Auth0.
+    If a refresh fails, the cached keys are served for `failure_backoff`
+    seconds before the next attempt.
+    """
+
+    def __init__(
+        self,
+        default_ttl: int = DEFAULT_TTL_SECONDS,
+        min_forced_refresh_interval: int = MIN_FORCED_REFRESH_INTERVAL_SECONDS,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        failure_backoff: int = FAILED_FETCH_BACKOFF_SECONDS,
+    ):
+        self.default_ttl = default_ttl
+        self.min_forced_refresh_interval = min_forced_refresh_interval
+        self.failure_backoff = failure_backoff
+        self._transport = transport
+        self._lock = asyncio.Lock()
+        self._jwks: Optional[Dict[str, Any]] = None
+        self._jwks_uri: Optional[str] = None
+        self._fetched_at = 0.0
+        self._expires_at = 0.0
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.fetches = 0
+        self.fetch_errors = 0
+
+    def _is_fresh(self, jwks_uri: str) -> bool:
+        return (
+            self._jwks is not None
+            and self._jwks_uri == jwks_uri
+            and time.monotonic() < self._expires_at
+        )
+
+    async def get(self, jwks_uri: str) -> Dict[str, Any]:
+        """Return the JWKS for `jwks_uri`, fetching it only if expired."""
+        if self._is_fresh(jwks_uri):
+            self.hits += 1
+            return self._jwks  # type: ignore[return-value]
+
+        self.misses += 1
+        generation = self._generation
+        async with self._lock:
+            # Another coroutine may have refreshed while we waited on the lock
+            if self._generation != generation and self._is_fresh(jwks_uri):
+                return self._jwks  # type: ignore[return-value]
+            return await self._fetch(jwks_uri)
+
+    async def get_key(self, jwks_uri: str, kid: str) -> Optional[Dict[str, Any]]:
+        """Return the JWK matching `kid`, refreshing once if it is unknown."""
+        jwks = await self.get(jwks_uri)
+        key = _find_key(jwks, kid)
+        if key is not None:
+            return key
+
+        generation = self._generation
+        async with self._lock:
+            if self._generation == generation:
+                since_fetch = time.monotonic() - self._fetched_at
+                if since_fetch < self.min_forced_refresh_interval:
+                    logger.warning(
+                        f"Unknown kid {kid}, JWKS refreshed {since_fetch:.0f}s ago"
+                    )
+                    return None
+                logger.info(f"Unknown kid {kid}, forcing JWKS refresh")
+                await self._fetch(jwks_uri)
+            return _find_key(self._jwks or {}, kid)
+
+    async def _fetch(self, jwks_uri: str) -> Dict[str, Any]:
+        logger.debug(f"Fetching JWKS from: {jwks_uri}")
+        self.fetches += 1
+        try:
+            async with httpx.AsyncClient(
+                timeout=FETCH_TIMEOUT_SECONDS, transport=self._transport
+            ) as client:
+                response = await client.get(jwks_uri)
+                response.raise_for_status()
+                jwks = response.json()
+        except Exception as e:
+            self.fetch_errors += 1
+            if self._jwks is not None and self._jwks_uri == jwks_uri:
+                logger.error(
+                    f"JWKS refresh failed, serving cached keys for "
+                    f"{self.failure_backoff}s: {str(e)}"
+                )
+                # Back off so an outage does not add a fetch timeout to
+                # every authenticated request
+                now = time.monotonic()
+                self._fetched_at = now
+                self._expires_at = now + self.failure_backoff
+                self._generation += 1
+                return self._jwks
+            raise
+
+        ttl = ttl_from_cache_control(
+            response.headers.get("cache-control"), self.default_ttl
+        )
+        now = time.monotonic()
+        self._jwks = jwks
+        self._jwks_uri = jwks_uri
+        self._fetched_at = now
+        self._expires_at = now + ttl
+        self._generation += 1
+        return jwks
+
+    def expires_in(self) -> float:
+        """Seconds until the cached key set is next refreshed."""
+        return max(0.0, self._expires_at - time.monotonic())
+
+    def clear(self) -> None:
+        self._jwks = None
+        self._jwks_uri = None
+        self._fetched_at = 0.0
+        self._expires_at = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "fetches": self.fetches,
+            "fetch_errors": self.fetch_errors,
+            "keys": len((self._jwks or {}).get("keys", [])),
+            "expires_in": round(self.expires_in(), 1),
+        }
+
+
+def _find_key(jwks: Dict[str, Any], kid: str) -> Optional[Dict[str, Any]]:
+    for key in jwks.get("keys", []):
+        if key.get("kid") == kid:
+            return key
+    return None
+
+
+jwks_cache = JWKSCache()
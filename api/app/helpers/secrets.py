@@ -1,5 +1,6 @@
 from dataclasses import dataclass
 from app.helpers.secrets_service import SecretsService
+import asyncio
 import os
 
 
@@ -18,3 +19,18 @@ class Secrets:
         self.Auth0Audience = secrets.get_secret(
             "AUTH0_AUDIENCE", os.getenv("AUTH0_AUDIENCE", "")
         )
+
+    @classmethod
+    async def aload(cls) -> "Secrets":
+        """Load the app secrets without blocking the event loop."""
+        service = SecretsService()
+        app_secret_key, auth0_domain, auth0_audience = await asyncio.gather(
+            service.aget_secret("APP_SECRET_KEY", os.getenv("APP_SECRET_KEY")),
+            service.aget_secret("AUTH0_DOMAIN", os.getenv("AUTH0_DOMAIN")),
+            service.aget_secret("AUTH0_AUDIENCE", os.getenv("AUTH0_AUDIENCE", "")),
+        )
+        secrets = cls.__new__(cls)
+        secrets.AppSecretKey = app_secret_key
+        secrets.Auth0Domain = auth0_domain
+        secrets.Auth0Audience = auth0_audience
+        return secrets
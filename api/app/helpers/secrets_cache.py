@@ -0,0 +1,177 @@
+"""In-memory cache for secrets fetched from Infisical."""
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+# (secret_path, secret_name, environment)
+SecretKey = Tuple[str, str, str]
+
+
+@dataclass
+class SecretEntry:
+    value: Optional[str]  # None records a miss
+    fetched_at: float
+    expires_at: float
+    last_used: float
+
+    def is_fresh(self, now: Optional[float] = None) -> bool:
+        return (now if now is not None else time.monotonic()) < self.expires_at
+
+
+class SecretCache:
+    """
+    Thread-safe TTL cache of secret values keyed by (path, name, env).
+
+    Misses are cached too, for `negative_ttl` seconds, so a secret that does
+    not exist is not looked up again on every request. Expired values are
+    still served for up to `max_stale` seconds so callers can keep working
+    while a refresh runs or while Infisical is unavailable.
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        negative_ttl: float,
+        max_stale: float = 0.0,
+        latency_samples: int = 1000,
+    ):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_stale = max_stale
+        self._entries: Dict[SecretKey, SecretEntry] = {}
+        self._refreshing: Set[SecretKey] = set()
+        self._lock = threading.Lock()
+        self._latencies: Deque[float] = deque(maxlen=latency_samples)
+        self.hits = 0
+        self.negative_hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.fetches = 0
+        self.fetch_errors = 0
+        self.refreshes = 0
+
+    def get(self, key: SecretKey) -> Optional[SecretEntry]:
+        """
+        Return the entry for `key` if it is fresh, or if it holds a value that
+        expired less than `max_stale` seconds ago. Check `is_fresh` on the
+        result to tell the two apart.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.is_fresh(now):
+                if entry.value is None:
+                    self.negative_hits += 1
+                else:
+                    self.hits += 1
+            elif entry.value is not None and now < entry.expires_at + self.max_stale:
+                self.stale_hits += 1
+            else:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            entry.last_used = now
+            return entry
+
+    def peek(self, key: SecretKey) -> Optional[SecretEntry]:
+        """Return the entry for `key` regardless of age, without counting a read."""
+        with self._lock:
+            return self._entries.get(key)
+
+    def set(self, key: SecretKey, value: Optional[str]) -> None:
+        now = time.monotonic()
+        ttl = self.ttl if value is not None else self.negative_ttl
+        with self._lock:
+            previous = self._entries.get(key)
+            self._entries[key] = SecretEntry(
+                value=value,
+                fetched_at=now,
+                expires_at=now + ttl,
+                last_used=previous.last_used if previous else now,
+            )
+
+    def invalidate(self, key: SecretKey) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def begin_refresh(self, key: SecretKey) -> bool:
+        """Claim `key` for refreshing; False if a refresh is already running."""
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def end_refresh(self, key: SecretKey) -> None:
+        with self._lock:
+            self._refreshing.discard(key)
+            self.refreshes += 1
+
+    def due_for_refresh(
+        self, refresh_ahead: float, recent_window: float, pinned_path: str
+    ) -> List[SecretKey]:
+        """
+        Keys holding a value that expires within `refresh_ahead` seconds.
+        Secrets under `pinned_path` are always included; others only if they
+        were read within the last `recent_window` seconds.
+        """
+        now = time.monotonic()
+        with self._lock:
+            return [
+                key
+                for key, entry in self._entries.items()
+                if entry.value is not None
+                and entry.expires_at - now <= refresh_ahead
+                and (key[0] == pinned_path or now - entry.last_used <= recent_window)
+                and key not in self._refreshing
+            ]
+
+    def record_fetch(self, seconds: float, failed: bool = False) -> None:
+        with self._lock:
+            self.fetches += 1
+            if failed:
+                self.fetch_errors += 1
+            self._latencies.append(seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            served = self.hits + self.negative_hits + self.stale_hits
+            lookups = served + self.misses
+            return {
+                "size": len(self._entries),
+                "ttl": self.ttl,
+                "negative_ttl": self.negative_ttl,
+                "max_stale": self.max_stale,
+                "hits": self.hits,
+                "negative_hits": self.negative_hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "hit_ratio": round(served / lookups, 4) if lookups else 0.0,
+                "fetches": self.fetches,
+                "fetch_errors": self.fetch_errors,
+                "refreshes": self.refreshes,
+                "refreshing": len(self._refreshing),
+                "fetch_latency_ms": _latency_summary(latencies),
+            }
+
+
+def _latency_summary(latencies: list) -> Dict[str, float]:
+    if not latencies:
+        return {"avg": 0.0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+    return {
+        "avg": round(sum(latencies) / len(latencies) * 1000, 2),
+        "p50": round(latencies[len(latencies) // 2] * 1000, 2),
+        "p95": round(latencies[int(len(latencies) * 0.95)] * 1000, 2),
+        "max": round(latencies[-1] * 1000, 2),
+    }
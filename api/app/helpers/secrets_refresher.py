@@ -0,0 +1,64 @@
+"""Background task that keeps cached secrets warm."""
+
+import asyncio
+import logging
+from typing import Optional
+
+from app.helpers.config import Config
+from app.helpers.secrets_service import SecretsService
+
+logger = logging.getLogger(__name__)
+
+
+class SecretsRefresher:
+    """
+    Periodically re-fetches secrets shortly before their cache TTL runs out,
+    so requests read from memory instead of waiting on Infisical.
+    """
+
+    def __init__(
+        self,
+        service: SecretsService,
+        interval: float,
+        recent_window: float,
+    ):
+        self.service = service
+        self.interval = interval
+        self.recent_window = recent_window
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_config(cls, service: SecretsService) -> "SecretsRefresher":
+        config = Config()
+        return cls(
+            service,
+            interval=config.SecretsRefreshInterval,
+            recent_window=config.SecretsRefreshRecentWindow,
+        )
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="secrets-refresher")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                # Two intervals of headroom so a slow cycle cannot let entries expire
+                refreshed = await self.service.arefresh_due(
+                    refresh_ahead=self.interval * 2, recent_window=self.recent_window
+                )
+                if refreshed:
+                    logger.debug(f"Refreshed {refreshed} cached secrets")
+            except Exception as e:
+                logger.error(f"Secrets refresh cycle failed: {str(e)}")
@@ -1,7 +1,28 @@
+from concurrent.futures import ThreadPoolExecutor
 from infisical_sdk import InfisicalSDKClient
-from typing import Optional
+from infisicalapi_client.exceptions import NotFoundException
+from typing import Any, Dict, Optional
+import asyncio
 import json
+import logging
+import time
 from app.helpers.config import Config
+from app.helpers.secrets_cache import SecretCache, SecretKey
+
+logger = logging.getLogger(__name__)
+
+CUSTOMER_SECRETS_PATH = "/customer-secrets"
+
+
+def parse_secret_value(value: Optional[str]) -> str | dict | None:
+    """Decode JSON secret values into dicts, leaving plain strings untouched."""
+    if not value:
+        return None
+
+    try:
+        return json.loads(value)
+    except json.JSONDecodeError:
+        return value
 
 
 class SecretsService:
@@ -15,6 +36,17 @@ class SecretsService:
             config = Config()
 
             cls._env = config.Environment
+            cls._cache = SecretCache(
+                ttl=config.SecretsCacheTTL,
+                negative_ttl=config.SecretsNegativeCacheTTL,
+                max_stale=config.SecretsMaxStale,
+            )
+            # The Infisical SDK is synchronous; async callers offload to this
+            # bounded pool so a slow fetch never blocks the event loop
+            cls._executor = ThreadPoolExecutor(
+                max_workers=config.SecretsMaxWorkers,
+                thread_name_prefix="infisical",
+            )
 
             client_id = config.InfisicalClientId
             client_secret = config.InfisicalClientSecret
@@ -41,6 +73,37 @@ class SecretsService:
     def get_secret(
         self, secret_name: str, default: Optional[str] = None, secret_path: str = "/"
     ) -> Optional[str]:
+        key = (secret_path, secret_name, self._env)
+        entry = self._cache.get(key)
+        if entry is None:
+            value = self._load_secret(key)
+        else:
+            if not entry.is_fresh():
+                self._schedule_refresh(key)
+            value = entry.value
+        return value if value is not None else default
+
+    async def aget_secret(
+        self, secret_name: str, default: Optional[str] = None, secret_path: str = "/"
+    ) -> Optional[str]:
+        """Async get_secret: cache hits return inline, misses run on the pool."""
+        key = (secret_path, secret_name, self._env)
+        entry = self._cache.get(key)
+        if entry is None:
+            loop = asyncio.get_running_loop()
+            value = await loop.run_in_executor(self._executor, self._load_secret, key)
+        else:
+            if not entry.is_fresh():
+                self._schedule_refresh(key)
+            value = entry.value
+        return value if value is not None else default
+
+    def _fetch_secret(self, secret_name: str, secret_path: str) -> Optional[str]:
+        """
+        Fetch a secret from Infisical. Returns None if it does not exist and
+        raises on any other error.
+        """
+        started = time.perf_counter()
         try:
             secret = self._client.secrets.get_secret_by_name(
                 secret_name=secret_name,
@@ -48,10 +111,69 @@ class SecretsService:
                 environment_slug=self._env,
                 secret_path=secret_path,
             )
+            self._cache.record_fetch(time.perf_counter() - started)
             return secret.to_dict()["secret"]["secretValue"]
+        except NotFoundException:
+            self._cache.record_fetch(time.perf_counter() - started)
+            return None
+        except Exception:
+            self._cache.record_fetch(time.perf_counter() - started, failed=True)
+            raise
+
+    def _load_secret(self, key: SecretKey) -> Optional[str]:
+        """
+        Fetch and cache a secret the cache cannot serve. Only a NotFound is
+        cached as a miss; on other errors nothing is cached and None is
+        returned, so the caller falls back to its default and the next read
+        tries Infisical again.
+        """
+        secret_path, secret_name, _ = key
+        try:
+            value = self._fetch_secret(secret_name, secret_path)
+        except Exception as e:
+            logger.error(f"Error fetching secret {secret_name}: {str(e)}")
+            return None
+        self._cache.set(key, value)
+        return value
+
+    def refresh_secret(self, key: SecretKey) -> None:
+        """
+        Re-fetch a cached secret. If Infisical fails, the cached value is
+        left in place and keeps being served until it is `max_stale` old.
+        """
+        secret_path, secret_name, _ = key
+        try:
+            self._cache.set(key, self._fetch_secret(secret_name, secret_path))
         except Exception as e:
-            print(f"Error fetching secret {secret_name}: {str(e)}")
-            return default
+            logger.warning(f"Error refreshing secret {secret_name}: {str(e)}")
+        finally:
+            self._cache.end_refresh(key)
+
+    def _schedule_refresh(self, key: SecretKey) -> None:
+        if self._cache.begin_refresh(key):
+            self._executor.submit(self.refresh_secret, key)
+
+    async def arefresh_due(self, refresh_ahead: float, recent_window: float) -> int:
+        """
+        Refresh app-level secrets, and customer secrets read in the last
+        `recent_window` seconds, that expire within `refresh_ahead` seconds.
+        Returns the number of secrets refreshed.
+        """
+        due = self._cache.due_for_refresh(
+            refresh_ahead=refresh_ahead, recent_window=recent_window, pinned_path="/"
+        )
+        keys = [key for key in due if self._cache.begin_refresh(key)]
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(
+            *(
+                loop.run_in_executor(self._executor, self.refresh_secret, key)
+                for key in keys
+            )
+        )
+        return len(keys)
+
+    def cache_stats(self) -> Dict[str, Any]:
+        return self._cache.stats()
 
     def create_customer_secret(
         self, secret_name: str, secret_value: str | dict, secret_type: str
@@ -67,7 +189,7 @@ class SecretsService:
             self._client.secrets.create_secret_by_name(
                 secret_name=secret_name,
                 project_id=self._project_id,
-                secret_path="/customer-secrets",
+                secret_path=CUSTOMER_SECRETS_PATH,
                 environment_slug=self._env,
                 secret_value=secret_value,
             )
@@ -76,22 +198,89 @@ class SecretsService:
             self._client.secrets.update_secret_by_name(
                 current_secret_name=secret_name,
                 project_id=self._project_id,
-                secret_path="/customer-secrets",
+                secret_path=CUSTOMER_SECRETS_PATH,
                 environment_slug=self._env,
                 secret_value=secret_value,
             )
+        finally:
+            self._cache.invalidate((CUSTOMER_SECRETS_PATH, secret_name, self._env))
         return secret_name
 
-    def get_customer_secret(self, secret_id: str) -> str | dict:
+    def get_customer_secret(self, secret_id: str) -> str | dict | None:
         """
         Retrieve a customer secret from Infisical.
         If the value is JSON, it will be parsed into a dict.
         """
-        value = self.get_secret(secret_name=secret_id, secret_path="/customer-secrets")
-        if not value:
-            return None
+        value = self.get_secret(
+            secret_name=secret_id, secret_path=CUSTOMER_SECRETS_PATH
+        )
+        return parse_secret_value(value)
+
+    async def aget_customer_secret(self, secret_id: str) -> str | dict | None:
+        value = await self.aget_secret(
+            secret_name=secret_id, secret_path=CUSTOMER_SECRETS_PATH
+        )
+        return parse_secret_value(value)
 
+    def list_customer_secrets(self) -> Dict[str, str]:
+        """
+        Fetch every secret under /customer-secrets in one call and prime the
+        cache with them. Returns a mapping of secret name to raw value.
+        """
+        started = time.perf_counter()
         try:
-            return json.loads(value)
-        except json.JSONDecodeError:
-            return value
+            response = self._client.secrets.list_secrets(
+                project_id=self._project_id,
+                environment_slug=self._env,
+                secret_path=CUSTOMER_SECRETS_PATH,
+                include_imports=False,
+            )
+            self._cache.record_fetch(time.perf_counter() - started)
+        except Exception:
+            self._cache.record_fetch(time.perf_counter() - started, failed=True)
+            raise
+
+        values = {
+            secret["secretKey"]: secret["secretValue"]
+            for secret in response.to_dict().get("secrets", [])
+        }
+        for name, value in values.items():
+            self._cache.set((CUSTOMER_SECRETS_PATH, name, self._env), value)
+        return values
+
+    def snapshot_customer_secrets(self) -> "SecretSnapshot":
+        """Return a pre-warmed snapshot of all customer secrets."""
+        return SecretSnapshot(self.list_customer_secrets(), fallback=self)
+
+
+class SecretSnapshot:
+    """
+    Customer secrets fetched up front, e.g. for a batch run.
+
+    Exposes the same get_customer_secret interface as SecretsService so the
+    vendor services can take either. Secrets created after the snapshot was
+    taken are looked up through `fallback`, if one is given.
+    """
+
+    def __init__(
+        self, values: Dict[str, str], fallback: Optional[SecretsService] = None
+    ):
+        self._values = values
+        self._fallback = fallback
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def get_customer_secret(self, secret_id: str) -> str | dict | None:
+        if secret_id in self._values:
+            return parse_secret_value(self._values[secret_id])
+        if self._fallback is not None:
+            return self._fallback.get_customer_secret(secret_id)
+        return None
+
+    async def aget_customer_secret(self, secret_id: str) -> str | dict | None:
+        if secret_id in self._values:
+            return parse_secret_value(self._values[secret_id])
+        if self._fallback is not None:
+            return await self._fallback.aget_customer_secret(secret_id)
+        return None
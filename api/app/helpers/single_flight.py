@@ -0,0 +1,47 @@
+"""Coalesce concurrent calls for the same key into one in-flight call."""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Generic, Hashable, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+T = TypeVar("T")
+
+
+class SingleFlight(Generic[K, T]):
+    """
+    The first caller for a key runs `fn`; callers arriving while it runs
+    await the same result (or exception) instead of running their own.
+
+    The shared call runs as its own task, so a caller being cancelled does
+    not cancel the work the other callers are waiting on.
+    """
+
+    def __init__(self):
+        self._flights: Dict[K, "asyncio.Task[T]"] = {}
+        self.calls = 0
+        self.shared = 0
+
+    async def do(self, key: K, fn: Callable[[], Awaitable[T]]) -> T:
+        self.calls += 1
+        task = self._flights.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._flights[key] = task
+            task.add_done_callback(lambda done: self._land(key, done))
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
+
+    def _land(self, key: K, task: "asyncio.Task[T]") -> None:
+        if self._flights.get(key) is task:
+            del self._flights[key]
+
+    def in_flight(self, key: K) -> bool:
+        return key in self._flights
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "shared": self.shared,
+            "in_flight": len(self._flights),
+        }
@@ -1,12 +1,27 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException
 from starlette.middleware.sessions import SessionMiddleware
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import vendor_metrics, users, forecast, configuration, budget
+from app.routers import (
+    vendor_metrics,
+    users,
+    forecast,
+    configuration,
+    budget,
+    internal,
+)
 from app.helpers.secrets import Secrets
+from app.helpers.secrets_refresher import SecretsRefresher
+from app.helpers.secrets_service import SecretsService
 from app.migrations.run_all import run_migrations
+from app.services.aws_clients import shutdown_ce_clients
+from app.services.datadog_client import close_datadog_client
+from app.services.refresh_queue import get_refresh_worker, stop_refresh_worker
+from app.helpers.config import Config
+from app.helpers.database import async_engine
 from pythonjsonlogger import jsonlogger
 
 import logging
@@ -30,8 +45,23 @@ logger = logging.getLogger(__name__)
 run_migrations()
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    config = Config()
+    secrets_refresher = SecretsRefresher.from_config(SecretsService())
+    secrets_refresher.start()
+    if config.RefreshWorkersEnabled:
+        get_refresh_worker().start()
+    yield
+    await stop_refresh_worker()
+    await secrets_refresher.stop()
+    await close_datadog_client()
+    shutdown_ce_clients()
+    await async_engine.dispose()
+
+
 def setup_app():
-    app = FastAPI()
+    app = FastAPI(lifespan=lifespan)
 
     # Add exception handlers
     @app.exception_handler(RequestValidationError)
@@ -75,3 +105,4 @@ app.include_router(users.router)
 app.include_router(forecast.router)
 app.include_router(configuration.router)
 app.include_router(budget.router)
+app.include_router(internal.router)
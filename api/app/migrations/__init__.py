@@ -9,6 +9,24 @@ from .create_vendor_metrics_table import upgrade as create_vendor_metrics_table
 from .add_updated_at_to_vendor_metrics import (
     upgrade as add_updated_at_to_vendor_metrics,
 )
+from .create_customer_credentials_table import (
+    upgrade as create_customer_credentials_table,
+)
+from .create_aws_cost_breakdowns_table import (
+    upgrade as create_aws_cost_breakdowns_table,
+)
+from .create_datadog_cost_breakdowns_table import (
+    upgrade as create_datadog_cost_breakdowns_table,
+)
+from .create_vendor_sync_state_table import upgrade as create_vendor_sync_state_table
+from .create_refresh_jobs_table import upgrade as create_refresh_jobs_table
+from .add_refresh_job_sharding import upgrade as add_refresh_job_sharding
+from .create_vendor_daily_costs_table import (
+    upgrade as create_vendor_daily_costs_table,
+)
+from .convert_vendor_metrics_month_to_date import (
+    upgrade as convert_vendor_metrics_month_to_date,
+)
 
 # List of migrations in order of execution
 MIGRATIONS = [
@@ -19,4 +37,12 @@ MIGRATIONS = [
     add_config_name,
     create_vendor_metrics_table,  # Add vendor metrics table
     add_updated_at_to_vendor_metrics,  # Add the new migration
+    create_customer_credentials_table,  # Database-backed secrets backend
+    create_aws_cost_breakdowns_table,  # Per-service AWS costs
+    create_datadog_cost_breakdowns_table,  # Per-product Datadog costs
+    create_vendor_sync_state_table,  # Refresh planning state per series
+    create_refresh_jobs_table,  # Durable batch refresh queue
+    add_refresh_job_sharding,  # One active job per series, worker shards
+    create_vendor_daily_costs_table,  # Daily ingestion and its coverage
+    convert_vendor_metrics_month_to_date,  # DATE months, covering series index
 ]
@@ -0,0 +1,76 @@
+import logging
+from sqlalchemy import text
+from app.helpers.database import engine
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def upgrade():
+    logger.info("Starting migration: Adding sharding to refresh_jobs")
+
+    try:
+        with engine.begin() as conn:
+            logger.info("Adding shard_key column...")
+            conn.execute(
+                text(
+                    """
+                    ALTER TABLE refresh_jobs
+                    ADD COLUMN IF NOT EXISTS shard_key INTEGER NOT NULL DEFAULT 0
+                    """
+                )
+            )
+
+            # Older duplicates would block the unique index; the newest
+            # active job per series is kept
+            logger.info("Retiring duplicate active jobs...")
+            conn.execute(
+                text(
+                    """
+                    UPDATE refresh_jobs
+                    SET status = 'failed',
+                        last_error = 'Superseded by a newer job for the series',
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE status IN ('pending', 'running')
+                    AND id NOT IN (
+                        SELECT MAX(id) FROM refresh_jobs
+                        WHERE status IN ('pending', 'running')
+                        GROUP BY user_id, vendor, identifier
+                    )
+                    """
+                )
+            )
+
+            logger.info("Creating unique index on active jobs...")
+            conn.execute(
+                text(
+                    """
+                    CREATE UNIQUE INDEX IF NOT EXISTS uq_refresh_jobs_active_series
+                    ON refresh_jobs(user_id, vendor, identifier)
+                    WHERE status IN ('pending', 'running')
+                    """
+                )
+            )
+
+            logger.info("Refresh job sharding added successfully")
+    except Exception as e:
+        logger.error(f"Migration failed: {str(e)}")
+        raise
+
+
+def downgrade():
+    logger.info("Starting downgrade: Removing sharding from refresh_jobs")
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("DROP INDEX IF EXISTS uq_refresh_jobs_active_series"))
+            conn.execute(
+                text("ALTER TABLE refresh_jobs DROP COLUMN IF EXISTS shard_key")
+            )
+            logger.info("Refresh job sharding removed successfully")
+    except Exception as e:
+        logger.error(f"Downgrade failed: {str(e)}")
+        raise
+
+
+if __name__ == "__main__":
+    upgrade()
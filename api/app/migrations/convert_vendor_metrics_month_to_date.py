@@ -0,0 +1,91 @@
+import logging
+from sqlalchemy import text
+from app.helpers.database import engine
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def upgrade():
+    logger.info("Starting migration: Converting vendor_metrics.month to DATE")
+
+    try:
+        with engine.begin() as conn:
+            month_type = conn.execute(
+                text(
+                    """
+                    SELECT data_type FROM information_schema.columns
+                    WHERE table_name = 'vendor_metrics' AND column_name = 'month'
+                    """
+                )
+            ).scalar()
+            if month_type != "date":
+                logger.info("Converting MM-YYYY months to first-of-month dates...")
+                conn.execute(
+                    text(
+                        """
+                        ALTER TABLE vendor_metrics
+                        ALTER COLUMN month TYPE DATE
+                        USING TO_DATE(month, 'MM-YYYY')
+                        """
+                    )
+                )
+
+            # Covers the per-series reads: range and order on month, with
+            # cost read from the index alone. Replaces the unique constraint.
+            logger.info("Creating covering series index...")
+            conn.execute(
+                text(
+                    """
+                    CREATE UNIQUE INDEX IF NOT EXISTS uq_vendor_metrics_series_month
+                    ON vendor_metrics(user_id, vendor, identifier, month)
+                    INCLUDE (cost)
+                    """
+                )
+            )
+            conn.execute(
+                text(
+                    """
+                    ALTER TABLE vendor_metrics DROP CONSTRAINT IF EXISTS
+                    uq_vendor_metrics_user_vendor_identifier_month
+                    """
+                )
+            )
+
+            logger.info("Vendor metrics month converted successfully")
+    except Exception as e:
+        logger.error(f"Migration failed: {str(e)}")
+        raise
+
+
+def downgrade():
+    logger.info("Starting downgrade: Converting vendor_metrics.month to MM-YYYY")
+    try:
+        with engine.begin() as conn:
+            conn.execute(
+                text(
+                    """
+                    ALTER TABLE vendor_metrics
+                    ALTER COLUMN month TYPE VARCHAR
+                    USING TO_CHAR(month, 'MM-YYYY')
+                    """
+                )
+            )
+            conn.execute(
+                text(
+                    """
+                    ALTER TABLE vendor_metrics
+                    ADD CONSTRAINT uq_vendor_metrics_user_vendor_identifier_month
+                    UNIQUE (user_id, vendor, identifier, month)
+                    """
+                )
+            )
+            conn.execute(text("DROP INDEX IF EXISTS uq_vendor_metrics_series_month"))
+            logger.info("Vendor metrics month converted back successfully")
+    except Exception as e:
+        logger.error(f"Downgrade failed: {str(e)}")
+        raise
+
+
+if __name__ == "__main__":
+    upgrade()
@@ -0,0 +1,53 @@
+import logging
+from sqlalchemy import text
+from app.helpers.database import engine
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def upgrade():
+    logger.info("Starting migration: Creating customer_credentials table")
+
+    try:
+        with engine.begin() as conn:
+            logger.info("Creating customer_credentials table...")
+            conn.execute(
+                text(
+                    """
+                    CREATE TABLE IF NOT EXISTS customer_credentials (
+                        id SERIAL PRIMARY KEY,
+                        name VARCHAR NOT NULL,
+                        secret_type VARCHAR,
+                        ciphertext BYTEA NOT NULL,
+                        nonce BYTEA NOT NULL,
+                        wrapped_key BYTEA NOT NULL,
+                        key_nonce BYTEA NOT NULL,
+                        master_key_id VARCHAR NOT NULL,
+                        created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+                        updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+                        CONSTRAINT uq_customer_credentials_name UNIQUE (name)
+                    )
+                    """
+                )
+            )
+
+            logger.info("Customer credentials table created successfully")
+    except Exception as e:
+        logger.error(f"Migration failed: {str(e)}")
+        raise
+
+
+def downgrade():
+    logger.info("Starting downgrade: Dropping customer_credentials table")
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("DROP TABLE IF EXISTS customer_credentials"))
+            logger.info("Customer credentials table dropped successfully")
+    except Exception as e:
+        logger.error(f"Downgrade failed: {str(e)}")
+        raise
+
+
+if __name__ == "__main__":
+    upgrade()
@@ -0,0 +1,53 @@
+import logging
+from sqlalchemy import text
+from app.helpers.database import engine
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def upgrade():
+    logger.info("Starting migration: Creating datadog_cost_breakdowns table")
+
+    try:
+        with engine.begin() as conn:
+            logger.info("Creating datadog_cost_breakdowns table...")
+            conn.execute(
+                text(
+                    """
+                    CREATE TABLE IF NOT EXISTS datadog_cost_breakdowns (
+                        id SERIAL PRIMARY KEY,
+                        user_id INTEGER NOT NULL REFERENCES users(id),
+                        identifier VARCHAR NOT NULL,
+                        month DATE NOT NULL,
+                        product_name VARCHAR NOT NULL,
+                        charge_type VARCHAR NOT NULL,
+                        cost FLOAT NOT NULL,
+                        created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+                        updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+                        CONSTRAINT uq_datadog_cost_breakdowns_user_identifier_month_dims
+                            UNIQUE (user_id, identifier, month, product_name, charge_type)
+                    )
+                    """
+                )
+            )
+
+            logger.info("Datadog cost breakdowns table created successfully")
+    except Exception as e:
+        logger.error(f"Migration failed: {str(e)}")
+        raise
+
+
+def downgrade():
+    logger.info("Starting downgrade: Dropping datadog_cost_breakdowns table")
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("DROP TABLE IF EXISTS datadog_cost_breakdowns"))
+            logger.info("Datadog cost breakdowns table dropped successfully")
+    except Exception as e:
+        logger.error(f"Downgrade failed: {str(e)}")
+        raise
+
+
+if __name__ == "__main__":
+    upgrade()
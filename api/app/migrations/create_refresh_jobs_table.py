@@ -0,0 +1,69 @@
+import logging
+from sqlalchemy import text
+from app.helpers.database import engine
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def upgrade():
+    logger.info("Starting migration: Creating refresh_jobs table")
+
+    try:
+        with engine.begin() as conn:
+            logger.info("Creating refresh_jobs table...")
+            conn.execute(
+                text(
+                    """
+                    CREATE TABLE IF NOT EXISTS refresh_jobs (
+                        id SERIAL PRIMARY KEY,
+                        run_id VARCHAR NOT NULL,
+                        user_id INTEGER NOT NULL REFERENCES users(id),
+                        vendor VARCHAR NOT NULL,
+                        identifier VARCHAR NOT NULL,
+                        status VARCHAR NOT NULL DEFAULT 'pending',
+                        attempts INTEGER NOT NULL DEFAULT 0,
+                        max_attempts INTEGER NOT NULL DEFAULT 3,
+                        run_after TIMESTAMP NOT NULL DEFAULT (NOW() AT TIME ZONE 'utc'),
+                        started_at TIMESTAMP,
+                        finished_at TIMESTAMP,
+                        duration_ms INTEGER,
+                        last_error TEXT,
+                        created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+                        updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+                    )
+                    """
+                )
+            )
+
+            # Create indexes
+            conn.execute(
+                text(
+                    """
+                    CREATE INDEX IF NOT EXISTS idx_refresh_jobs_run_id
+                    ON refresh_jobs(run_id);
+                    CREATE INDEX IF NOT EXISTS idx_refresh_jobs_status_run_after
+                    ON refresh_jobs(status, run_after);
+                    """
+                )
+            )
+
+            logger.info("Refresh jobs table created successfully")
+    except Exception as e:
+        logger.error(f"Migration failed: {str(e)}")
+        raise
+
+
+def downgrade():
+    logger.info("Starting downgrade: Dropping refresh_jobs table")
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("DROP TABLE IF EXISTS refresh_jobs"))
+            logger.info("Refresh jobs table dropped successfully")
+    except Exception as e:
+        logger.error(f"Downgrade failed: {str(e)}")
+        raise
+
+
+if __name__ == "__main__":
+    upgrade()
@@ -0,0 +1,72 @@
+import logging
+from sqlalchemy import text
+from app.helpers.database import engine
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def upgrade():
+    logger.info("Starting migration: Creating vendor_daily_costs table")
+
+    try:
+        with engine.begin() as conn:
+            logger.info("Creating vendor_daily_costs table...")
+            conn.execute(
+                text(
+                    """
+                    CREATE TABLE IF NOT EXISTS vendor_daily_costs (
+                        id SERIAL PRIMARY KEY,
+                        user_id INTEGER NOT NULL REFERENCES users(id),
+                        vendor VARCHAR NOT NULL,
+                        identifier VARCHAR NOT NULL,
+                        day DATE NOT NULL,
+                        cost FLOAT NOT NULL,
+                        created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+                        updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+                        CONSTRAINT uq_vendor_daily_costs_user_vendor_identifier_day
+                            UNIQUE (user_id, vendor, identifier, day)
+                    )
+                    """
+                )
+            )
+
+            logger.info("Adding daily coverage to vendor_sync_state...")
+            conn.execute(
+                text(
+                    """
+                    ALTER TABLE vendor_sync_state
+                    ADD COLUMN IF NOT EXISTS daily_covered_from DATE,
+                    ADD COLUMN IF NOT EXISTS daily_covered_to DATE
+                    """
+                )
+            )
+
+            logger.info("Vendor daily costs table created successfully")
+    except Exception as e:
+        logger.error(f"Migration failed: {str(e)}")
+        raise
+
+
+def downgrade():
+    logger.info("Starting downgrade: Dropping vendor_daily_costs table")
+    try:
+        with engine.begin() as conn:
+            conn.execute(
+                text(
+                    """
+                    ALTER TABLE vendor_sync_state
+                    DROP COLUMN IF EXISTS daily_covered_from,
+                    DROP COLUMN IF EXISTS daily_covered_to
+                    """
+                )
+            )
+            conn.execute(text("DROP TABLE IF EXISTS vendor_daily_costs"))
+            logger.info("Vendor daily costs table dropped successfully")
+    except Exception as e:
+        logger.error(f"Downgrade failed: {str(e)}")
+        raise
+
+
+if __name__ == "__main__":
+    upgrade()
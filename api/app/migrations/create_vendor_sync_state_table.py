@@ -0,0 +1,84 @@
+import logging
+from sqlalchemy import text
+from app.helpers.database import engine
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def upgrade():
+    logger.info("Starting migration: Creating vendor_sync_state table")
+
+    try:
+        with engine.begin() as conn:
+            logger.info("Creating vendor_sync_state table...")
+            conn.execute(
+                text(
+                    """
+                    CREATE TABLE IF NOT EXISTS vendor_sync_state (
+                        id SERIAL PRIMARY KEY,
+                        user_id INTEGER NOT NULL REFERENCES users(id),
+                        vendor VARCHAR NOT NULL,
+                        identifier VARCHAR NOT NULL,
+                        last_synced_at TIMESTAMP,
+                        covered_from DATE,
+                        covered_to DATE,
+                        last_error TEXT,
+                        last_error_at TIMESTAMP,
+                        created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+                        updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+                        CONSTRAINT uq_vendor_sync_state_user_vendor_identifier
+                            UNIQUE (user_id, vendor, identifier)
+                    )
+                    """
+                )
+            )
+
+            # Seed state for series synced before this table existed, so they
+            # are not all re-fetched in full on their next request. Months
+            # are parsed from MM-YYYY until vendor_metrics.month is a DATE.
+            month_type = conn.execute(
+                text(
+                    """
+                    SELECT data_type FROM information_schema.columns
+                    WHERE table_name = 'vendor_metrics' AND column_name = 'month'
+                    """
+                )
+            ).scalar()
+            month = "month" if month_type == "date" else "TO_DATE(month, 'MM-YYYY')"
+            logger.info("Backfilling vendor_sync_state from vendor_metrics...")
+            conn.execute(
+                text(
+                    f"""
+                    INSERT INTO vendor_sync_state
+                        (user_id, vendor, identifier, last_synced_at,
+                         covered_from, covered_to)
+                    SELECT user_id, vendor, identifier, MAX(updated_at),
+                           MIN({month}), MAX({month})
+                    FROM vendor_metrics
+                    WHERE user_id IS NOT NULL
+                    GROUP BY user_id, vendor, identifier
+                    ON CONFLICT (user_id, vendor, identifier) DO NOTHING
+                    """
+                )
+            )
+
+            logger.info("Vendor sync state table created successfully")
+    except Exception as e:
+        logger.error(f"Migration failed: {str(e)}")
+        raise
+
+
+def downgrade():
+    logger.info("Starting downgrade: Dropping vendor_sync_state table")
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("DROP TABLE IF EXISTS vendor_sync_state"))
+            logger.info("Vendor sync state table dropped successfully")
+    except Exception as e:
+        logger.error(f"Downgrade failed: {str(e)}")
+        raise
+
+
+if __name__ == "__main__":
+    upgrade()
@@ -1,4 +1,14 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, JSON
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    ForeignKey,
+    Date,
+    DateTime,
+    JSON,
+    LargeBinary,
+    Text,
+)
 from sqlalchemy.orm import relationship, declared_attr
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
@@ -88,7 +98,7 @@ class VendorMetrics(Base):
     user_id = Column(Integer, ForeignKey("users.id"))
     vendor = Column(String)  # "datadog" or "aws"
     identifier = Column(String)  # Configuration identifier
-    month = Column(String)  # Format: MM-YYYY
+    month = Column(Date)  # First day of the month; the API uses MM-YYYY
     cost = Column(sqlalchemy.Float)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -96,12 +106,182 @@ class VendorMetrics(Base):
     # Relationship to User model
     user = relationship("User", backref="vendor_metrics")
 
+    __table_args__ = (
+        # Covers per-series reads ordered by month
+        sqlalchemy.Index(
+            "uq_vendor_metrics_series_month",
+            "user_id",
+            "vendor",
+            "identifier",
+            "month",
+            unique=True,
+            postgresql_include=["cost"],
+        ),
+    )
+
+
+class VendorSyncState(Base):
+    """Where each vendor series stands: what has been fetched and when."""
+
+    __tablename__ = "vendor_sync_state"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    vendor = Column(String, nullable=False)  # "datadog" or "aws"
+    identifier = Column(String, nullable=False)  # Configuration identifier
+    last_synced_at = Column(DateTime)
+    covered_from = Column(Date)  # First month fetched, as its first day
+    covered_to = Column(Date)  # Last month fetched, as its first day
+    # Days held in vendor_daily_costs, when ingesting at daily granularity
+    daily_covered_from = Column(Date)
+    daily_covered_to = Column(Date)
+    last_error = Column(Text)
+    last_error_at = Column(DateTime)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        sqlalchemy.UniqueConstraint(
+            "user_id",
+            "vendor",
+            "identifier",
+            name="uq_vendor_sync_state_user_vendor_identifier",
+        ),
+    )
+
+
+class VendorDailyCost(Base):
+    """Daily cost of a series, rolled up into vendor_metrics by month."""
+
+    __tablename__ = "vendor_daily_costs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    vendor = Column(String, nullable=False)  # "datadog" or "aws"
+    identifier = Column(String, nullable=False)  # Configuration identifier
+    day = Column(Date, nullable=False)
+    cost = Column(sqlalchemy.Float, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
     __table_args__ = (
         sqlalchemy.UniqueConstraint(
             "user_id",
             "vendor",
             "identifier",
+            "day",
+            name="uq_vendor_daily_costs_user_vendor_identifier_day",
+        ),
+    )
+
+
+class RefreshJob(Base):
+    """One queued refresh of a vendor series, claimed by a queue worker."""
+
+    __tablename__ = "refresh_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    run_id = Column(String, nullable=False, index=True)  # Batch that queued it
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    vendor = Column(String, nullable=False)  # "datadog" or "aws"
+    identifier = Column(String, nullable=False)  # Configuration identifier
+    status = Column(String, nullable=False, default="pending")
+    # pending, running, succeeded or failed
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    run_after = Column(DateTime, nullable=False, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    duration_ms = Column(Integer)
+    last_error = Column(Text)
+    # Stable hash of the series; workers can be limited to a slice of it
+    shard_key = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        sqlalchemy.Index("idx_refresh_jobs_status_run_after", "status", "run_after"),
+        # At most one queued or running job per series
+        sqlalchemy.Index(
+            "uq_refresh_jobs_active_series",
+            "user_id",
+            "vendor",
+            "identifier",
+            unique=True,
+            postgresql_where=sqlalchemy.text("status IN ('pending', 'running')"),
+            sqlite_where=sqlalchemy.text("status IN ('pending', 'running')"),
+        ),
+    )
+
+
+class AWSCostBreakdown(Base):
+    """Monthly AWS cost per service, and per linked account when enabled."""
+
+    __tablename__ = "aws_cost_breakdowns"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    identifier = Column(String, nullable=False)  # Configuration identifier
+    month = Column(Date, nullable=False)  # First day of the month
+    service = Column(String, nullable=False)
+    linked_account = Column(String, nullable=False, default="")  # "" when not grouped
+    cost = Column(sqlalchemy.Float, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        # Also serves (user_id, identifier, month) range scans
+        sqlalchemy.UniqueConstraint(
+            "user_id",
+            "identifier",
+            "month",
+            "service",
+            "linked_account",
+            name="uq_aws_cost_breakdowns_user_identifier_month_dims",
+        ),
+    )
+
+
+class DatadogCostBreakdown(Base):
+    """Monthly Datadog cost per product and charge type."""
+
+    __tablename__ = "datadog_cost_breakdowns"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    identifier = Column(String, nullable=False)  # Configuration identifier
+    month = Column(Date, nullable=False)  # First day of the month
+    product_name = Column(String, nullable=False)
+    charge_type = Column(String, nullable=False)  # "committed", "on_demand", "total"
+    cost = Column(sqlalchemy.Float, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        # Also serves (user_id, identifier, month) range scans
+        sqlalchemy.UniqueConstraint(
+            "user_id",
+            "identifier",
             "month",
-            name="uq_vendor_metrics_user_vendor_identifier_month",
+            "product_name",
+            "charge_type",
+            name="uq_datadog_cost_breakdowns_user_identifier_month_dims",
         ),
     )
+
+
+class CustomerCredential(Base):
+    """A customer secret, envelope-encrypted with a per-secret data key."""
+
+    __tablename__ = "customer_credentials"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, index=True, nullable=False)
+    secret_type = Column(String)  # "datadog" or "aws"
+    ciphertext = Column(LargeBinary, nullable=False)
+    nonce = Column(LargeBinary, nullable=False)
+    wrapped_key = Column(LargeBinary, nullable=False)  # data key under master key
+    key_nonce = Column(LargeBinary, nullable=False)
+    master_key_id = Column(String, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
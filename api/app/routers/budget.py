@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.helpers.database import get_db
-from app.helpers.auth import get_authenticated_user
+from app.helpers.database import get_async_db, get_db
+from app.helpers.auth import get_current_user
 from app.models import User
 from app.routers.models import BudgetPlanCreate
 from app.services.budget_service import BudgetService
@@ -10,19 +11,10 @@ from app.services.budget_service import BudgetService
 router = APIRouter(prefix="/v1/budget-plans", tags=["budget"])
 
 
-def get_user(
-    auth_user: dict = Depends(get_authenticated_user), db: Session = Depends(get_db)
-) -> User:
-    user = db.query(User).filter(User.sub == auth_user["sub"]).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user
-
-
 @router.post("")
 async def create_budget_plan(
     plan: BudgetPlanCreate,
-    user: User = Depends(get_user),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """Create or update a budget plan"""
@@ -33,11 +25,13 @@ async def create_budget_plan(
 
 @router.get("")
 async def get_budget_plans(
-    vendor: str, user: User = Depends(get_user), db: Session = Depends(get_db)
+    vendor: str,
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Get all budget plans for a vendor"""
     service = BudgetService(db, user)
-    plans = service.get_budget_plans(vendor)
+    plans = await service.aget_budget_plans(vendor)
     return {"data": plans, "status": "success"}
 
 
@@ -45,7 +39,7 @@ async def get_budget_plans(
 async def update_budget_plan(
     plan_id: int,
     plan: BudgetPlanCreate,
-    user: User = Depends(get_user),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """Update an existing budget plan"""
@@ -55,7 +49,7 @@ async def update_budget_plan(
 
 @router.delete("/{plan_id}")
 async def delete_budget_plan(
-    plan_id: int, user: User = Depends(get_user), db: Session = Depends(get_db)
+    plan_id: int, user: User = Depends(get_current_user), db: Session = Depends(get_db)
 ):
     """Delete a budget plan"""
     service = BudgetService(db, user)
@@ -1,11 +1,13 @@
 import logging
 
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.models import User, DatadogAPIConfiguration, AWSAPIConfiguration
 from app.routers.models import APIConfigResponse
-from app.helpers.database import get_db
-from app.helpers.auth import get_authenticated_user
+from app.helpers.database import get_async_db, get_db
+from app.helpers.auth import get_current_user
 from app.services.configuration_service import ConfigurationService
 from pydantic import BaseModel
 
@@ -26,19 +28,10 @@ class AWSConfig(BaseModel):
     identifier: str = "Default Configuration"
 
 
-def get_user(
-    auth_user: dict = Depends(get_authenticated_user), db: Session = Depends(get_db)
-) -> User:
-    user = db.query(User).filter(User.sub == auth_user["sub"]).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user
-
-
 @router.post("/datadog")
 async def configure_datadog(
     config: DatadogConfig,
-    user: User = Depends(get_user),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ) -> APIConfigResponse:
     secrets_data = {
@@ -63,7 +56,7 @@ async def configure_datadog(
 @router.post("/aws")
 async def configure_aws(
     config: AWSConfig,
-    user: User = Depends(get_user),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ) -> APIConfigResponse:
     secrets_data = {
@@ -86,18 +79,16 @@ async def configure_aws(
 
 @router.get("/list")
 async def list_api_configurations(
-    user: User = Depends(get_user), db: Session = Depends(get_db)
+    user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)
 ):
-    datadog_configs = (
-        db.query(DatadogAPIConfiguration)
-        .filter(DatadogAPIConfiguration.user_id == user.id)
-        .all()
+    datadog_configs = await db.scalars(
+        select(DatadogAPIConfiguration).where(
+            DatadogAPIConfiguration.user_id == user.id
+        )
     )
 
-    aws_configs = (
-        db.query(AWSAPIConfiguration)
-        .filter(AWSAPIConfiguration.user_id == user.id)
-        .all()
+    aws_configs = await db.scalars(
+        select(AWSAPIConfiguration).where(AWSAPIConfiguration.user_id == user.id)
     )
 
     configurations = []
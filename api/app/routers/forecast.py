@@ -8,7 +8,7 @@ from sqlalchemy.orm import Session
 from app.models import User
 from app.models import DatadogAPIConfiguration, AWSAPIConfiguration
 from app.helpers.database import get_db
-from app.helpers.auth import get_authenticated_user
+from app.helpers.auth import get_current_user
 from app.services.forecast_service import ForecastService
 from app.services.datadog_service import DatadogService
 from app.services.aws_service import AWSService
@@ -26,21 +26,10 @@ async def get_vendor_forecast(
     identifier: str = Query(
         "Default Configuration", description="Configuration identifier"
     ),
-    auth_user: dict = Depends(get_authenticated_user),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     try:
-        user = db.query(User).filter(User.sub == auth_user["sub"]).first()
-        if not user:
-            return JSONResponse(
-                status_code=404,
-                content={
-                    "error": "User not found",
-                    "message": "Unable to find user record",
-                    "code": "USER_NOT_FOUND",
-                },
-            )
-
         vendor_name = vendor_name.lower()
         if vendor_name == "datadog":
             datadog_config = (
@@ -96,7 +85,7 @@ async def get_vendor_forecast(
                 },
             )
 
-        historical_data = service.get_monthly_costs()
+        historical_data = await service.get_monthly_costs()
         if isinstance(historical_data, JSONResponse):
             return historical_data
 
@@ -0,0 +1,41 @@
+from fastapi import APIRouter, Security
+
+from app.helpers.auth import (
+    claims_cache,
+    signing_key_cache,
+    user_id_cache,
+    verify_api_key,
+)
+from app.helpers.database import async_engine, pool_stats
+from app.helpers.jwks import jwks_cache
+from app.helpers.secrets_service import SecretsService
+from app.services.aws_clients import get_ce_clients
+from app.services.call_scheduler import get_call_scheduler
+from app.services.datadog_client import get_datadog_client
+from app.services.refresh_queue import get_refresh_worker
+from app.services.vendor_metrics_service import refresh_flights
+
+router = APIRouter(prefix="/v1/internal", tags=["internal"])
+
+
+@router.get("/stats")
+async def get_internal_stats(api_key: str = Security(verify_api_key)):
+    """
+    Report in-process cache and client counters. Requires the internal API key.
+    """
+    return {
+        "auth": {
+            "jwks": jwks_cache.stats(),
+            "signing_keys": signing_key_cache.stats(),
+            "claims": claims_cache.stats(),
+            "user_ids": user_id_cache.stats(),
+        },
+        "secrets": SecretsService().cache_stats(),
+        "datadog": get_datadog_client().stats(),
+        "aws": get_ce_clients().stats(),
+        "refreshes": refresh_flights.stats(),
+        "refresh_queue": get_refresh_worker().stats(),
+        "vendor_calls": get_call_scheduler().stats(),
+        "database": pool_stats(),
+        "database_async": pool_stats(async_engine.sync_engine),
+    }
@@ -1,9 +1,7 @@
 import logging
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends
 from app.models import User
-from app.helpers.database import get_db
-from app.helpers.auth import get_authenticated_user
+from app.helpers.auth import get_current_user
 from pydantic import BaseModel
 
 logger = logging.getLogger(__name__)
@@ -19,12 +17,6 @@ class UserProfile(BaseModel):
 
 
 @router.get("/v1/profile", response_model=UserProfile)
-async def get_user_profile(
-    auth_user: dict = Depends(get_authenticated_user), db: Session = Depends(get_db)
-) -> UserProfile:
+async def get_user_profile(user: User = Depends(get_current_user)) -> UserProfile:
     """Get the profile of the currently authenticated user"""
-    user = db.query(User).filter(User.sub == auth_user["sub"]).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
     return UserProfile(email=user.email, name=user.name, picture=user.picture)
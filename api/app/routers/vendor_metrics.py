@@ -1,65 +1,49 @@
 import logging
-from fastapi import APIRouter, Depends, HTTPException, Security
-from fastapi.security.api_key import APIKeyHeader
+from datetime import datetime, timedelta
+from typing import List
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Security
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.models import User
-from app.helpers.database import get_db
-from app.helpers.auth import get_authenticated_user
-from app.services.vendor_metrics_service import VendorMetricsService
-from app.helpers.secrets_service import SecretsService
-
-API_KEY_NAME = "X-API-Key"
-api_key_header = APIKeyHeader(name=API_KEY_NAME, auto_error=True)
-secrets = SecretsService()
+from app.helpers.config import Config
+from app.helpers.database import get_async_db, get_db
+from app.helpers.auth import get_current_user, verify_api_key
+from app.services.config_enumeration import CONFIG_MODELS
+from app.services.refresh_queue import enqueue_refresh_run, get_run_status
+from app.services.vendor_metrics_service import (
+    VendorMetricsService,
+    refresh_vendor_metrics_in_background,
+)
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/v1/vendors-metrics", tags=["vendors"])
 
 
-async def verify_api_key(api_key: str = Security(api_key_header)):
-    stored_api_key = secrets.get_secret("INTERNAL_API_KEY")
-    if not stored_api_key:
-        raise HTTPException(
-            status_code=500,
-            detail={"message": "API key not configured", "code": "API_KEY_ERROR"},
-        )
-    if api_key != stored_api_key:
-        raise HTTPException(
-            status_code=403,
-            detail={"message": "Invalid API key", "code": "INVALID_API_KEY"},
-        )
-    return api_key
-
-
-def get_user(
-    auth_user: dict = Depends(get_authenticated_user), db: Session = Depends(get_db)
-) -> User:
-    user = db.query(User).filter(User.sub == auth_user["sub"]).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user
-
-
 @router.get("/{vendor}")
 async def get_vendor_metrics(
     vendor: str,
+    background_tasks: BackgroundTasks,
     identifier: str = "Default Configuration",
-    user: User = Depends(get_user),
+    sync: bool = Query(False, description="Refresh from the vendor before answering"),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
+    async_db: AsyncSession = Depends(get_async_db),
 ):
+    """
+    Stored metrics for a vendor configuration, answered without waiting on
+    the vendor. Stale series are refreshed in the background; pass
+    `sync=true` to refresh before answering.
+    """
     try:
-        service = VendorMetricsService(user.id, db)
-        metrics = await service.get_and_store_vendor_metrics(vendor, identifier)
-
-        # Sort metrics by date
-        if isinstance(metrics, dict) and "data" in metrics:
-            metrics["data"] = sorted(
-                metrics["data"],
-                key=lambda x: (
-                    int(x["month"].split("-")[1]),  # Year
-                    int(x["month"].split("-")[0]),  # Month
-                ),
+        service = VendorMetricsService(user.id, db, async_db=async_db)
+        metrics = await service.get_vendor_metrics(vendor, identifier, force_sync=sync)
+        if metrics["refresh_pending"]:
+            background_tasks.add_task(
+                refresh_vendor_metrics_in_background,
+                user.id,
+                vendor.lower(),
+                identifier,
             )
 
         return metrics
@@ -78,13 +62,43 @@ async def get_vendor_metrics(
         )
 
 
+@router.get("/{vendor}/breakdown")
+async def get_vendor_cost_breakdown(
+    vendor: str,
+    identifier: str = "Default Configuration",
+    months: int = Query(12, ge=1, le=36),
+    limit: int = Query(10, ge=1, le=100),
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Top AWS services or Datadog products by cost, from stored data only.
+    """
+    try:
+        service = VendorMetricsService(user.id, db)
+        return service.get_cost_breakdown(vendor, identifier, months, limit)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "message": str(e),
+                "code": "INVALID_VENDOR",
+            },
+        )
+
+
 @router.post("/batch-update")
 async def batch_update_metrics(
+    vendor: List[str] | None = Query(None, description="Only refresh these vendors"),
+    max_age_hours: int | None = Query(
+        None, description="Only refresh series last synced more than this long ago"
+    ),
     db: Session = Depends(get_db),
     api_key: str = Security(verify_api_key),
 ):
     """
-    Update vendor metrics for all users and their configurations.
+    Queue a metrics refresh for all users and their configurations and
+    return its run id; queue workers carry it out.
     This endpoint is meant to be called by a cron job and requires an API key.
     """
     if not api_key:
@@ -92,11 +106,48 @@ async def batch_update_metrics(
             status_code=403,
             detail={"message": "Invalid API key", "code": "INVALID_API_KEY"},
         )
+    unknown = {v.lower() for v in vendor or []} - CONFIG_MODELS.keys()
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "message": f"Unsupported vendor: {', '.join(sorted(unknown))}",
+                "code": "INVALID_VENDOR",
+            },
+        )
+    synced_before = (
+        datetime.utcnow() - timedelta(hours=max_age_hours)
+        if max_age_hours is not None
+        else None
+    )
     try:
-        results = await VendorMetricsService.batch_update_all_vendor_metrics(db)
-        return {"message": "Batch update completed", "results": results}
+        run = enqueue_refresh_run(
+            db,
+            vendors=vendor,
+            synced_before=synced_before,
+            max_attempts=Config().RefreshJobMaxAttempts,
+        )
+        return {"message": "Batch update queued", **run}
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail={"message": str(e), "code": "BATCH_UPDATE_ERROR"},
         )
+
+
+@router.get("/batch-update/{run_id}")
+async def get_batch_update_status(
+    run_id: str,
+    db: Session = Depends(get_db),
+    api_key: str = Security(verify_api_key),
+):
+    """
+    Report the progress of a queued batch update. Requires an API key.
+    """
+    status = get_run_status(db, run_id)
+    if status is None:
+        raise HTTPException(
+            status_code=404,
+            detail={"message": "Batch update run not found", "code": "RUN_NOT_FOUND"},
+        )
+    return status
@@ -0,0 +1,110 @@
+"""Process-wide cache of boto3 Cost Explorer clients and the pool they run on."""
+
+import asyncio
+import functools
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
+
+import boto3
+
+from app.helpers.cache import LRUCache
+from app.helpers.config import Config
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Cost Explorer is only served from us-east-1
+CE_REGION = "us-east-1"
+
+
+def credential_fingerprint(access_key: str, secret_key: str) -> str:
+    return hashlib.sha256(f"{access_key}:{secret_key}".encode("utf-8")).hexdigest()
+
+
+class CostExplorerClients:
+    """
+    Reuses one Cost Explorer client per AWS configuration.
+
+    Entries are keyed by configuration id and store the fingerprint of the
+    credentials they were built with, so a rotated key builds a new client
+    even if nobody invalidated the old one. Client creation and API calls
+    run on a dedicated thread pool and never block the event loop.
+    """
+
+    def __init__(self, maxsize: int = 256, max_workers: int = 8):
+        self._clients: LRUCache[int, Tuple[str, Any]] = LRUCache(maxsize=maxsize)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="aws-ce"
+        )
+        self.max_workers = max_workers
+        self.created = 0
+
+    @classmethod
+    def from_config(cls, config: Optional[Config] = None) -> "CostExplorerClients":
+        config = config or Config()
+        return cls(
+            maxsize=config.AwsClientCacheSize, max_workers=config.AwsCeMaxWorkers
+        )
+
+    async def get(self, config_id: int, access_key: str, secret_key: str) -> Any:
+        """Return the cached client for `config_id`, building it if needed."""
+        fingerprint = credential_fingerprint(access_key, secret_key)
+        cached = self._clients.get(config_id)
+        if cached is not None and cached[0] == fingerprint:
+            return cached[1]
+
+        client = await self.run(_build_client, access_key, secret_key)
+        self._clients.set(config_id, (fingerprint, client))
+        self.created += 1
+        return client
+
+    def invalidate(self, config_id: int) -> None:
+        self._clients.pop(config_id)
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run a blocking boto3 call on the Cost Explorer pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(fn, *args, **kwargs)
+        )
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._clients.stats(),
+            "created": self.created,
+            "max_workers": self.max_workers,
+        }
+
+
+def _build_client(access_key: str, secret_key: str) -> Any:
+    # boto3's default session is not thread-safe; give each client its own
+    session = boto3.session.Session(
+        aws_access_key_id=access_key,
+        aws_secret_access_key=secret_key,
+        region_name=CE_REGION,
+    )
+    return session.client("ce")
+
+
+_ce_clients: Optional[CostExplorerClients] = None
+
+
+def get_ce_clients() -> CostExplorerClients:
+    """Return the process-wide Cost Explorer client cache."""
+    global _ce_clients
+    if _ce_clients is None:
+        _ce_clients = CostExplorerClients.from_config()
+    return _ce_clients
+
+
+def shutdown_ce_clients() -> None:
+    global _ce_clients
+    if _ce_clients is not None:
+        _ce_clients.shutdown()
+        _ce_clients = None
@@ -1,9 +1,16 @@
-from datetime import datetime, timedelta
-import boto3
+from datetime import date, datetime, timedelta
+import asyncio
 from botocore.exceptions import ClientError
-from ..helpers.secrets_service import SecretsService
+from typing import Any, AsyncIterator, Dict, Optional
+from app.helpers.credential_store import (
+    CustomerSecrets,
+    get_customer_secrets_store,
+)
 from sqlalchemy.orm import Session
+from app.helpers.config import Config
 from app.models import AWSAPIConfiguration
+from app.services.aws_clients import CostExplorerClients, get_ce_clients
+from app.services.call_scheduler import INTERACTIVE, CallScheduler, get_call_scheduler
 import logging
 
 logger = logging.getLogger(__name__)
@@ -11,55 +18,79 @@ logger = logging.getLogger(__name__)
 
 class AWSService:
     def __init__(
-        self, user_id: int, db: Session, identifier: str = "Default Configuration"
+        self,
+        user_id: int,
+        db: Session,
+        identifier: str = "Default Configuration",
+        secrets: Optional[CustomerSecrets] = None,
+        clients: Optional[CostExplorerClients] = None,
+        group_by_linked_account: Optional[bool] = None,
+        scheduler: Optional[CallScheduler] = None,
+        priority: int = INTERACTIVE,
     ):
         self.user_id = user_id
         self.db = db
         self.identifier = identifier
-        self.secrets = SecretsService()
-        self._init_client()
-
-    def _init_client(self):
-        config = (
+        self.secrets = secrets or get_customer_secrets_store(db)
+        self.clients = clients or get_ce_clients()
+        self.client = None
+        self.scheduler = scheduler or get_call_scheduler()
+        self.priority = priority
+        if group_by_linked_account is None:
+            group_by_linked_account = Config().AwsGroupByLinkedAccount
+        self.group_by_linked_account = group_by_linked_account
+        self.config = (
             self.db.query(AWSAPIConfiguration)
             .filter(AWSAPIConfiguration.user_id == self.user_id)
             .filter(AWSAPIConfiguration.identifier == self.identifier)
             .first()
         )
 
-        if not config:
+        if not self.config:
             raise Exception(
                 f"No AWS configuration found for this user with identifier {self.identifier}"
             )
 
-        access_key = self.secrets.get_customer_secret(config.aws_access_key_id)
-        secret_key = self.secrets.get_customer_secret(config.aws_secret_access_key)
+    async def _init_client(self):
+        if self.client is not None:
+            return
+
+        access_key, secret_key = await asyncio.gather(
+            self.secrets.aget_customer_secret(self.config.aws_access_key_id),
+            self.secrets.aget_customer_secret(self.config.aws_secret_access_key),
+        )
 
         if not access_key or not secret_key:
             raise Exception("AWS credentials not found")
 
         logger.info(f"AWS credentials found for user {self.user_id}")
 
-        self.client = boto3.client(
-            "ce",  # Cost Explorer service
-            aws_access_key_id=access_key,
-            aws_secret_access_key=secret_key,
-            region_name="us-east-1",  # Cost Explorer is available in us-east-1
-        )
+        self.client = await self.clients.get(self.config.id, access_key, secret_key)
 
-    def get_monthly_costs(
+    async def get_monthly_costs(
         self, start_date: str | None = None, end_date: str | None = None
     ):
         """
         Get monthly costs from AWS Cost Explorer
         start_date and end_date format: YYYY-MM
+        Returns monthly totals under "data" and per-service (and linked
+        account) costs under "breakdown".
         """
         try:
+            await self._init_client()
+
             # Convert end_date
             if end_date:
                 # Convert MM-YYYY to YYYY-MM-01
                 month, year = end_date.split("-")
                 end_date_dt = datetime.strptime(f"{year}-{month}-01", "%Y-%m-%d")
+                # CE treats End as exclusive; include the whole end month, but
+                # never ask for more than a day past today
+                end_date_dt = min(
+                    (end_date_dt + timedelta(days=32)).replace(day=1),
+                    datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+                    + timedelta(days=1),
+                )
             else:
                 end_date_dt = datetime.now()
 
@@ -72,29 +103,88 @@ class AWSService:
                 start_date_dt = end_date_dt - timedelta(days=365)
 
             logger.info(f"Fetching AWS costs for {start_date_dt} to {end_date_dt}")
-            response = self.client.get_cost_and_usage(
-                TimePeriod={
+            group_by = [{"Type": "DIMENSION", "Key": "SERVICE"}]
+            if self.group_by_linked_account:
+                group_by.append({"Type": "DIMENSION", "Key": "LINKED_ACCOUNT"})
+            request = {
+                "TimePeriod": {
                     "Start": start_date_dt.strftime("%Y-%m-%d"),
                     "End": end_date_dt.strftime("%Y-%m-%d"),
                 },
-                Granularity="MONTHLY",
-                Metrics=["UnblendedCost"],
-            )
+                "Granularity": "MONTHLY",
+                "Metrics": ["UnblendedCost"],
+                "GroupBy": group_by,
+            }
 
-            cost_data = []
-            for result in response["ResultsByTime"]:
-                month = datetime.strptime(
-                    result["TimePeriod"]["Start"], "%Y-%m-%d"
-                ).strftime("%m-%Y")
-                cost = float(result["Total"]["UnblendedCost"]["Amount"])
-                cost_data.append(
-                    {
-                        "month": month,
-                        "cost": round(cost, 2),
-                    }
-                )
+            # Grouped results carry no Total, so monthly totals are summed
+            # from the groups instead of paying for another CE request
+            totals: Dict[str, float] = {}
+            breakdown = []
+            # A month's groups can span several pages
+            async for response in self._cost_and_usage_pages(request):
+                for result in response["ResultsByTime"]:
+                    month = datetime.strptime(
+                        result["TimePeriod"]["Start"], "%Y-%m-%d"
+                    ).strftime("%m-%Y")
+                    totals.setdefault(month, 0.0)
+                    for group in result.get("Groups", []):
+                        keys = group["Keys"]
+                        cost = float(group["Metrics"]["UnblendedCost"]["Amount"])
+                        totals[month] += cost
+                        breakdown.append(
+                            {
+                                "month": month,
+                                "service": keys[0],
+                                "linked_account": keys[1] if len(keys) > 1 else "",
+                                "cost": cost,
+                            }
+                        )
+
+            cost_data = [
+                {"month": month, "cost": round(cost, 2)}
+                for month, cost in totals.items()
+            ]
+
+            return {"data": cost_data, "breakdown": breakdown}
+
+        except ClientError as e:
+            logger.error(f"AWS API error: {str(e)}")
+            raise Exception(f"Failed to retrieve AWS costs: {str(e)}")
+        except Exception as e:
+            logger.error(f"Error fetching AWS costs: {str(e)}")
+            raise Exception(f"Failed to retrieve AWS costs: {str(e)}")
+
+    async def get_daily_costs(self, start_day: date, end_day: date) -> Dict[str, Any]:
+        """
+        Get daily cost totals from AWS Cost Explorer, start_day through
+        end_day inclusive. Returns {"data": [{"day": date, "cost": float}]}.
+        """
+        try:
+            await self._init_client()
 
-            return {"data": cost_data}
+            logger.info(f"Fetching daily AWS costs for {start_day} to {end_day}")
+            request = {
+                "TimePeriod": {
+                    "Start": start_day.strftime("%Y-%m-%d"),
+                    # CE treats End as exclusive
+                    "End": (end_day + timedelta(days=1)).strftime("%Y-%m-%d"),
+                },
+                "Granularity": "DAILY",
+                "Metrics": ["UnblendedCost"],
+            }
+            daily_costs = []
+            async for response in self._cost_and_usage_pages(request):
+                for result in response["ResultsByTime"]:
+                    daily_costs.append(
+                        {
+                            "day": datetime.strptime(
+                                result["TimePeriod"]["Start"], "%Y-%m-%d"
+                            ).date(),
+                            "cost": float(result["Total"]["UnblendedCost"]["Amount"]),
+                        }
+                    )
+
+            return {"data": daily_costs}
 
         except ClientError as e:
             logger.error(f"AWS API error: {str(e)}")
@@ -102,3 +192,17 @@ class AWSService:
         except Exception as e:
             logger.error(f"Error fetching AWS costs: {str(e)}")
             raise Exception(f"Failed to retrieve AWS costs: {str(e)}")
+
+    async def _cost_and_usage_pages(
+        self, request: Dict[str, Any]
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield every page of a get_cost_and_usage request."""
+        request = dict(request)
+        while True:
+            # Each page is a billed CE request
+            await self.scheduler.acquire("aws", str(self.config.id), self.priority)
+            response = await self.clients.run(self.client.get_cost_and_usage, **request)
+            yield response
+            if not response.get("NextPageToken"):
+                return
+            request["NextPageToken"] = response["NextPageToken"]
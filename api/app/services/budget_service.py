@@ -1,4 +1,6 @@
-from typing import List, Optional
+from typing import List, Optional, Union
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
 from datetime import datetime
@@ -8,7 +10,7 @@ from app.routers.models import BudgetPlanCreate
 
 
 class BudgetService:
-    def __init__(self, db: Session, user: User):
+    def __init__(self, db: Union[Session, AsyncSession], user: User):
         self.db = db
         self.user = user
 
@@ -65,16 +67,23 @@ class BudgetService:
             self.db.rollback()
             raise HTTPException(status_code=500, detail=str(e))
 
-    def get_budget_plans(self, vendor: Optional[str] = None) -> List[BudgetPlan]:
-        """Get all budget plans for the user, optionally filtered by vendor"""
-        query = self.db.query(BudgetPlan).filter(BudgetPlan.user_id == self.user.id)
+    def _budget_plans_query(self, vendor: Optional[str]) -> Select:
+        query = select(BudgetPlan).where(BudgetPlan.user_id == self.user.id)
 
         if vendor:
             if vendor.lower() not in ["datadog", "aws"]:
                 raise HTTPException(status_code=400, detail=f"Invalid vendor: {vendor}")
-            query = query.filter(BudgetPlan.vendor == vendor.lower())
+            query = query.where(BudgetPlan.vendor == vendor.lower())
+
+        return query
+
+    def get_budget_plans(self, vendor: Optional[str] = None) -> List[BudgetPlan]:
+        """Get all budget plans for the user, optionally filtered by vendor"""
+        return list(self.db.scalars(self._budget_plans_query(vendor)))
 
-        return query.all()
+    async def aget_budget_plans(self, vendor: Optional[str] = None) -> List[BudgetPlan]:
+        """get_budget_plans for a service built on an AsyncSession"""
+        return list(await self.db.scalars(self._budget_plans_query(vendor)))
 
     def update_budget_plan(
         self, plan_id: int, plan_data: BudgetPlanCreate
@@ -0,0 +1,217 @@
+"""Token-bucket metering of outbound vendor cost API calls."""
+
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Any, Callable, Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+from app.helpers.config import Config
+
+# Lower values are served first
+INTERACTIVE = 0
+BATCH = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BATCH: "batch"}
+
+
+class RateLimit(NamedTuple):
+    rate: float  # Tokens added per second; 0 disables the bucket
+    burst: float  # Bucket capacity
+
+
+class TokenBucket:
+    def __init__(self, limit: RateLimit, now: float):
+        self.rate = limit.rate
+        self.burst = max(limit.burst, 1.0)
+        self.tokens = self.burst
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until a token is available, 0 if one is available now."""
+        if self.rate <= 0:
+            return 0.0
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        if self.rate > 0:
+            self.tokens -= 1
+
+    def is_full(self, now: float) -> bool:
+        """Whether the bucket has refilled, so a fresh one would behave the same."""
+        return self.rate <= 0 or (
+            self.tokens + (now - self.updated) * self.rate >= self.burst
+        )
+
+
+class _WaitStats:
+    def __init__(self):
+        self.calls = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, wait: float) -> None:
+        self.calls += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "avg_wait_ms": (
+                round(self.total_wait / self.calls * 1000) if self.calls else 0
+            ),
+            "max_wait_ms": round(self.max_wait * 1000),
+        }
+
+
+class CallScheduler:
+    """
+    Paces calls to each vendor through two token buckets: one shared by the
+    whole vendor and one per credential (Datadog organisation, AWS account).
+
+    Callers wait in a per-vendor queue ordered by priority, then arrival, so
+    interactive refreshes go ahead of batch ones. A caller only waits behind
+    earlier callers that could take the vendor token themselves: one whose
+    own credential is exhausted does not hold up other credentials. Time
+    spent queued is recorded per vendor and priority.
+
+    Credential buckets that have refilled are dropped every `sweep_interval`
+    seconds and recreated on the credential's next call, so the map only
+    holds credentials that called recently.
+    """
+
+    def __init__(
+        self,
+        limits: Mapping[str, Tuple[RateLimit, RateLimit]],
+        poll_interval: float = 0.05,
+        clock: Callable[[], float] = time.monotonic,
+        sweep_interval: float = 60.0,
+    ):
+        # vendor -> (vendor-wide limit, per-credential limit)
+        self.limits = dict(limits)
+        self.poll_interval = poll_interval
+        self.clock = clock
+        self.sweep_interval = sweep_interval
+        self._swept_at = clock()
+        self._vendor_buckets: Dict[str, TokenBucket] = {}
+        self._credential_buckets: Dict[Tuple[str, str], TokenBucket] = {}
+        self._queues: Dict[str, List[Tuple[int, int, str]]] = {}
+        self._tickets = itertools.count()
+        self._waits: Dict[Tuple[str, int], _WaitStats] = {}
+
+    @classmethod
+    def from_config(cls, config: Optional[Config] = None) -> "CallScheduler":
+        config = config or Config()
+        return cls(
+            {
+                vendor: (
+                    RateLimit(limits["rate"], limits["burst"]),
+                    RateLimit(limits["credential_rate"], limits["credential_burst"]),
+                )
+                for vendor, limits in config.VendorRateLimits.items()
+            }
+        )
+
+    async def acquire(
+        self, vendor: str, credential: str, priority: int = INTERACTIVE
+    ) -> float:
+        """Wait for a call slot; returns the seconds spent waiting."""
+        if vendor not in self.limits:
+            return 0.0
+        queue = self._queues.setdefault(vendor, [])
+        ticket = (priority, next(self._tickets), credential)
+        heapq.heappush(queue, ticket)
+        started = self.clock()
+        try:
+            while True:
+                wait = self._try_take(vendor, ticket)
+                if wait == 0:
+                    break
+                await asyncio.sleep(wait)
+        finally:
+            queue.remove(ticket)
+            heapq.heapify(queue)
+
+        now = self.clock()
+        waited = now - started
+        self._waits.setdefault((vendor, priority), _WaitStats()).record(waited)
+        if now - self._swept_at >= self.sweep_interval:
+            self._evict_full_buckets(now)
+        return waited
+
+    def _try_take(self, vendor: str, ticket: Tuple[int, int, str]) -> float:
+        """Take both tokens for `ticket` if it is its turn, else how long to wait."""
+        now = self.clock()
+        credential = ticket[2]
+        own = self._credential_bucket(vendor, credential, now)
+        wait = own.wait_time(now)
+        if wait:
+            return wait
+        for ahead in self._queues[vendor]:
+            if ahead >= ticket:
+                continue
+            if ahead[2] == credential:
+                return self.poll_interval
+            if not self._credential_bucket(vendor, ahead[2], now).wait_time(now):
+                return self.poll_interval
+        shared = self._vendor_bucket(vendor, now)
+        wait = shared.wait_time(now)
+        if wait:
+            return wait
+        shared.take()
+        own.take()
+        return 0.0
+
+    def _vendor_bucket(self, vendor: str, now: float) -> TokenBucket:
+        bucket = self._vendor_buckets.get(vendor)
+        if bucket is None:
+            bucket = self._vendor_buckets[vendor] = TokenBucket(
+                self.limits[vendor][0], now
+            )
+        return bucket
+
+    def _credential_bucket(
+        self, vendor: str, credential: str, now: float
+    ) -> TokenBucket:
+        bucket = self._credential_buckets.get((vendor, credential))
+        if bucket is None:
+            bucket = self._credential_buckets[(vendor, credential)] = TokenBucket(
+                self.limits[vendor][1], now
+            )
+        return bucket
+
+    def _evict_full_buckets(self, now: float) -> None:
+        self._swept_at = now
+        self._credential_buckets = {
+            key: bucket
+            for key, bucket in self._credential_buckets.items()
+            if not bucket.is_full(now)
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            vendor: {
+                "waiting": len(self._queues.get(vendor, [])),
+                "credentials": sum(
+                    1 for key in self._credential_buckets if key[0] == vendor
+                ),
+                **{
+                    name: self._waits.get((vendor, priority), _WaitStats()).as_dict()
+                    for priority, name in PRIORITY_NAMES.items()
+                },
+            }
+            for vendor in self.limits
+        }
+
+
+_call_scheduler: Optional[CallScheduler] = None
+
+
+def get_call_scheduler() -> CallScheduler:
+    """Return the process-wide scheduler, creating it on first use."""
+    global _call_scheduler
+    if _call_scheduler is None:
+        _call_scheduler = CallScheduler.from_config()
+    return _call_scheduler
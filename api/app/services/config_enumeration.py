@@ -0,0 +1,75 @@
+"""Set-based enumeration of vendor configurations for the batch refresh."""
+
+from datetime import datetime
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+from sqlalchemy import and_, literal, or_, select, union_all
+from sqlalchemy.orm import Session
+
+from app.models import AWSAPIConfiguration, DatadogAPIConfiguration, VendorSyncState
+
+CONFIG_MODELS = {
+    "aws": AWSAPIConfiguration,
+    "datadog": DatadogAPIConfiguration,
+}
+
+
+class WorkItem(NamedTuple):
+    user_id: int
+    vendor: str
+    identifier: str
+
+
+def iter_vendor_configs(
+    db: Session,
+    vendors: Optional[Iterable[str]] = None,
+    synced_before: Optional[datetime] = None,
+    batch_size: int = 500,
+) -> Iterator[WorkItem]:
+    """
+    Stream every (user_id, vendor, identifier) configuration with one query.
+
+    `vendors` restricts the vendors enumerated, and `synced_before` keeps only
+    series last synced before that time (or never).
+    Rows are fetched `batch_size` at a time, so memory stays flat however many
+    configurations exist. Do not commit on `db` while iterating: that closes
+    the server-side cursor.
+    """
+    selected = [vendor.lower() for vendor in vendors] if vendors else CONFIG_MODELS
+    unknown = set(selected) - CONFIG_MODELS.keys()
+    if unknown:
+        raise ValueError(f"Unsupported vendor: {', '.join(sorted(unknown))}")
+
+    configs = union_all(
+        *(
+            select(
+                model.user_id.label("user_id"),
+                literal(vendor).label("vendor"),
+                model.identifier.label("identifier"),
+            ).where(model.user_id.is_not(None))
+            for vendor, model in CONFIG_MODELS.items()
+            if vendor in selected
+        )
+    ).subquery("configs")
+
+    stmt = select(configs.c.user_id, configs.c.vendor, configs.c.identifier)
+
+    if synced_before is not None:
+        stmt = stmt.outerjoin(
+            VendorSyncState,
+            and_(
+                VendorSyncState.user_id == configs.c.user_id,
+                VendorSyncState.vendor == configs.c.vendor,
+                VendorSyncState.identifier == configs.c.identifier,
+            ),
+        ).where(
+            or_(
+                VendorSyncState.last_synced_at.is_(None),
+                VendorSyncState.last_synced_at < synced_before,
+            )
+        )
+
+    stmt = stmt.order_by(configs.c.user_id, configs.c.vendor, configs.c.identifier)
+
+    for row in db.execute(stmt.execution_options(yield_per=batch_size)):
+        yield WorkItem(row.user_id, row.vendor, row.identifier)
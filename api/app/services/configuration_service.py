@@ -1,14 +1,15 @@
 from sqlalchemy.orm import Session
 from app.models import User, DatadogAPIConfiguration, AWSAPIConfiguration
 from fastapi import HTTPException
-from app.helpers.secrets_service import SecretsService
+from app.helpers.credential_store import get_customer_secrets_store
+from app.services.aws_clients import get_ce_clients
 
 
 class ConfigurationService:
     def __init__(self, db: Session, user: User):
         self.db = db
         self.user = user
-        self.secrets = SecretsService()
+        self.secrets = get_customer_secrets_store(db)
 
     def _configure_datadog(
         self, secrets_data: dict, identifier: str = "Default Configuration"
@@ -82,6 +83,7 @@ class ConfigurationService:
             existing_config.aws_access_key_id = access_key
             existing_config.aws_secret_access_key = secret_key
             self.db.commit()
+            get_ce_clients().invalidate(existing_config.id)
             return existing_config.id, "AWS configuration updated successfully"
         else:
             self.db.add(secret)
@@ -0,0 +1,212 @@
+"""Process-wide async HTTP client for the Datadog API."""
+
+import asyncio
+import hashlib
+import logging
+import random
+import time
+from typing import Any, Dict, Mapping, Optional
+
+import httpx
+
+from app.helpers.config import Config
+from app.services.call_scheduler import INTERACTIVE, CallScheduler, get_call_scheduler
+
+logger = logging.getLogger(__name__)
+
+DATADOG_API_URL = "https://api.datadoghq.com"
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def _rate_limit_key(headers: Mapping[str, str]) -> str:
+    # Datadog rate limits apply per organisation, i.e. per API key
+    api_key = str(headers.get("DD-API-KEY", ""))
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+
+def _header_float(response: httpx.Response, name: str) -> Optional[float]:
+    try:
+        return float(response.headers[name])
+    except (KeyError, ValueError):
+        return None
+
+
+class DatadogClient:
+    """
+    One pooled `httpx.AsyncClient` shared by every Datadog refresh.
+
+    Connections are kept alive between requests, so concurrent refreshes do
+    not each pay a TLS handshake. Timeouts, 429s and 5xx responses are
+    retried up to `max_retries` times with full-jitter exponential backoff.
+    A 429 waits for Datadog's X-RateLimit-Reset instead. When a response
+    reports X-RateLimit-Remaining of 0, later requests for the same API key
+    wait for the reset before they are sent. Every attempt first takes a
+    slot from the call scheduler, keyed by the same API key.
+    """
+
+    def __init__(
+        self,
+        base_url: str = DATADOG_API_URL,
+        timeout: float = 30.0,
+        connect_timeout: float = 5.0,
+        max_connections: int = 20,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        max_rate_limit_wait: float = 60.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        scheduler: Optional[CallScheduler] = None,
+    ):
+        self.base_url = base_url
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=30.0,
+        )
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_rate_limit_wait = max_rate_limit_wait
+        self._transport = transport
+        self.scheduler = scheduler or get_call_scheduler()
+        self._client: Optional[httpx.AsyncClient] = None
+        # rate limit key -> monotonic time the current window resets
+        self._reset_at: Dict[str, float] = {}
+        self.requests = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.errors = 0
+
+    @classmethod
+    def from_config(cls, config: Optional[Config] = None) -> "DatadogClient":
+        config = config or Config()
+        return cls(
+            timeout=config.DatadogTimeout,
+            connect_timeout=config.DatadogConnectTimeout,
+            max_connections=config.DatadogMaxConnections,
+            max_retries=config.DatadogMaxRetries,
+            backoff_base=config.DatadogRetryBackoff,
+            backoff_max=config.DatadogRetryMaxBackoff,
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=self.limits,
+                transport=self._transport,
+            )
+        return self._client
+
+    async def get(
+        self,
+        path: str,
+        headers: Mapping[str, str],
+        params: Optional[Mapping[str, Any]] = None,
+        priority: int = INTERACTIVE,
+    ) -> httpx.Response:
+        """
+        GET `path`, retrying transient failures. Once retries are exhausted,
+        the last response is returned, or the last transport error is raised.
+        """
+        key = _rate_limit_key(headers)
+        attempt = 0
+        while True:
+            await self._wait_for_rate_limit(key)
+            await self.scheduler.acquire("datadog", key, priority)
+            self.requests += 1
+            try:
+                response = await self.client.get(path, headers=headers, params=params)
+            except httpx.TransportError as e:
+                if attempt >= self.max_retries:
+                    self.errors += 1
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning(
+                    f"Datadog request to {path} failed ({e!r}), "
+                    f"retrying in {delay:.2f}s"
+                )
+            else:
+                self._record_rate_limit(key, response)
+                if (
+                    response.status_code not in RETRY_STATUSES
+                    or attempt >= self.max_retries
+                ):
+                    if response.status_code >= 400:
+                        self.errors += 1
+                    return response
+                delay = self._retry_delay(attempt, response)
+                logger.warning(
+                    f"Datadog request to {path} returned {response.status_code}, "
+                    f"retrying in {delay:.2f}s"
+                )
+
+            self.retries += 1
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+
+    def _retry_delay(self, attempt: int, response: httpx.Response) -> float:
+        if response.status_code == 429:
+            self.rate_limited += 1
+            reset = _header_float(response, "X-RateLimit-Reset")
+            if reset is not None:
+                # A little jitter so callers sharing a key do not retry in lockstep
+                return min(reset, self.max_rate_limit_wait) + random.uniform(0, 1)
+        return self._backoff(attempt)
+
+    def _record_rate_limit(self, key: str, response: httpx.Response) -> None:
+        remaining = _header_float(response, "X-RateLimit-Remaining")
+        reset = _header_float(response, "X-RateLimit-Reset")
+        if remaining is not None and remaining <= 0 and reset is not None:
+            self._reset_at[key] = time.monotonic() + reset
+        else:
+            self._reset_at.pop(key, None)
+
+    async def _wait_for_rate_limit(self, key: str) -> None:
+        reset_at = self._reset_at.get(key)
+        if reset_at is None:
+            return
+        wait = reset_at - time.monotonic()
+        if wait > 0:
+            logger.info(f"Datadog rate limit exhausted, waiting {wait:.2f}s")
+            await asyncio.sleep(min(wait, self.max_rate_limit_wait))
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "errors": self.errors,
+            "rate_limited_keys": sum(
+                1 for reset_at in self._reset_at.values() if reset_at > time.monotonic()
+            ),
+        }
+
+
+_datadog_client: Optional[DatadogClient] = None
+
+
+def get_datadog_client() -> DatadogClient:
+    """Return the process-wide Datadog client, creating it on first use."""
+    global _datadog_client
+    if _datadog_client is None:
+        _datadog_client = DatadogClient.from_config()
+    return _datadog_client
+
+
+async def close_datadog_client() -> None:
+    global _datadog_client
+    if _datadog_client is not None:
+        await _datadog_client.aclose()
+        _datadog_client = None
@@ -1,39 +1,72 @@
 """DataDog service module for handling DataDog API interactions."""
 
+import asyncio
 import logging
-from datetime import datetime, timedelta
-from typing import Dict, Any
-from app.helpers.secrets_service import SecretsService
+from datetime import date, datetime, timedelta
+from typing import Dict, Any, Optional, Tuple
+from app.helpers.credential_store import (
+    CustomerSecrets,
+    get_customer_secrets_store,
+)
 from sqlalchemy.orm import Session
-import requests
 from app.models import DatadogAPIConfiguration
+from app.services.call_scheduler import INTERACTIVE
+from app.services.datadog_client import DatadogClient, get_datadog_client
 
 logger = logging.getLogger(__name__)
 
 
 class DatadogService:
     def __init__(
-        self, user_id: int, db: Session, identifier: str = "Default Configuration"
+        self,
+        user_id: int,
+        db: Session,
+        identifier: str = "Default Configuration",
+        secrets: Optional[CustomerSecrets] = None,
+        client: Optional[DatadogClient] = None,
+        priority: int = INTERACTIVE,
     ):
-        config = (
+        self.user_id = user_id
+        self.identifier = identifier
+        self.config = (
             db.query(DatadogAPIConfiguration)
             .filter(DatadogAPIConfiguration.user_id == user_id)
             .filter(DatadogAPIConfiguration.identifier == identifier)
             .first()
         )
-        secrets = SecretsService()
-        self.app_key = secrets.get_customer_secret(config.app_key)
-        self.api_key = secrets.get_customer_secret(config.api_key)
-        self.base_url = "https://api.datadoghq.com/api/v1"
+        self.secrets = secrets or get_customer_secrets_store(db)
+        self.app_key: str | dict | None = None
+        self.api_key: str | dict | None = None
+        self.client = client or get_datadog_client()
+        self.priority = priority
 
-    def get_monthly_costs(
+    async def _load_credentials(self):
+        if self.app_key and self.api_key:
+            return
+
+        if not self.config:
+            raise Exception(
+                "No Datadog configuration found for this user "
+                f"with identifier {self.identifier}"
+            )
+
+        self.app_key, self.api_key = await asyncio.gather(
+            self.secrets.aget_customer_secret(self.config.app_key),
+            self.secrets.aget_customer_secret(self.config.api_key),
+        )
+
+    async def get_monthly_costs(
         self, start_date: str | None = None, end_date: str | None = None
     ) -> Dict[str, Any]:
         """
         Get monthly costs from Datadog API
         start_date and end_date format: MM-YYYY
+        Returns monthly totals under "data" and per-product charges under
+        "breakdown".
         """
         try:
+            await self._load_credentials()
+
             # Handle end_date
             if end_date:
                 # Convert MM-YYYY to YYYY-MM
@@ -56,33 +89,55 @@ class DatadogService:
                 "DD-APPLICATION-KEY": self.app_key,
             }
 
-            response = requests.get(
-                "https://api.datadoghq.com/api/v2/usage/historical_cost",
+            response = await self.client.get(
+                "/api/v2/usage/historical_cost",
                 headers=headers,
                 params={"start_month": start_date, "end_month": end_date},
+                priority=self.priority,
             )
 
             logger.info(f"Datadog API Response - Status: {response.status_code}")
 
             if response.status_code == 200:
                 data = response.json()
-                monthly_costs = []
+                # month -> cost and (month, product_name, charge_type) -> cost,
+                # both summed across orgs
+                monthly_costs: Dict[str, float] = {}
+                charges: Dict[Tuple[str, str, str], float] = {}
                 if "data" in data and isinstance(data["data"], list):
                     for entry in data["data"]:
-                        date = datetime.strptime(
+                        entry_date = datetime.strptime(
                             entry["attributes"]["date"], "%Y-%m-%dT%H:%M:%SZ"
                         )
-                        monthly_costs.append(
-                            {
-                                "month": date.strftime(
-                                    "%m-%Y"
-                                ),  # Convert back to MM-YYYY for consistency
-                                "cost": round(
-                                    float(entry["attributes"]["total_cost"]), 2
-                                ),
-                            }
+                        # MM-YYYY for consistency
+                        month = entry_date.strftime("%m-%Y")
+                        monthly_costs[month] = monthly_costs.get(month, 0.0) + float(
+                            entry["attributes"]["total_cost"]
                         )
-                return {"data": monthly_costs}
+                        for charge in entry["attributes"].get("charges") or []:
+                            key = (
+                                month,
+                                charge["product_name"],
+                                charge["charge_type"],
+                            )
+                            charges[key] = charges.get(key, 0.0) + float(
+                                charge.get("cost") or 0
+                            )
+                return {
+                    "data": [
+                        {"month": month, "cost": round(cost, 2)}
+                        for month, cost in monthly_costs.items()
+                    ],
+                    "breakdown": [
+                        {
+                            "month": month,
+                            "product_name": product_name,
+                            "charge_type": charge_type,
+                            "cost": cost,
+                        }
+                        for (month, product_name, charge_type), cost in charges.items()
+                    ],
+                }
             else:
                 error_msg = (
                     response.json()
@@ -95,3 +150,51 @@ class DatadogService:
         except Exception as e:
             logger.error(f"Error fetching Datadog costs: {str(e)}")
             raise Exception(f"Failed to retrieve Datadog costs: {str(e)}")
+
+    async def get_daily_costs(self, start_day: date, end_day: date) -> Dict[str, Any]:
+        """
+        Get daily estimated costs from Datadog, start_day through end_day
+        inclusive. Estimates cover the current and previous month only.
+        Returns {"data": [{"day": date, "cost": float}]}.
+        """
+        try:
+            await self._load_credentials()
+
+            headers = {
+                "DD-API-KEY": self.api_key,
+                "DD-APPLICATION-KEY": self.app_key,
+            }
+
+            response = await self.client.get(
+                "/api/v2/usage/estimated_cost",
+                headers=headers,
+                params={
+                    "start_date": start_day.strftime("%Y-%m-%d"),
+                    "end_date": end_day.strftime("%Y-%m-%d"),
+                },
+                priority=self.priority,
+            )
+
+            logger.info(f"Datadog API Response - Status: {response.status_code}")
+
+            if response.status_code != 200:
+                error_msg = (
+                    response.json()
+                    if response.content
+                    else "No error details available"
+                )
+                logger.error(f"Datadog API error: {error_msg}")
+                raise Exception(f"Failed to retrieve Datadog costs: {error_msg}")
+
+            # Summed across orgs
+            daily: Dict[date, float] = {}
+            for entry in response.json().get("data") or []:
+                day = datetime.strptime(entry["attributes"]["date"][:10], "%Y-%m-%d")
+                daily[day.date()] = daily.get(day.date(), 0.0) + float(
+                    entry["attributes"]["total_cost"] or 0
+                )
+            return {"data": [{"day": day, "cost": cost} for day, cost in daily.items()]}
+
+        except Exception as e:
+            logger.error(f"Error fetching Datadog costs: {str(e)}")
+            raise Exception(f"Failed to retrieve Datadog costs: {str(e)}")
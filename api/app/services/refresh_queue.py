@@ -0,0 +1,448 @@
+"""
+Durable queue of vendor metric refreshes, stored in the refresh_jobs table.
+
+The batch endpoint enqueues one job per configuration and returns at once.
+Workers claim jobs with FOR UPDATE SKIP LOCKED, so any number of worker
+coroutines, processes or pods can drain the queue without taking the same
+job twice. Failed jobs are retried with backoff up to `max_attempts`, and
+jobs left running by a worker that died are reclaimed once their lease
+expires. Run workers outside the API with `python -m app.services.refresh_queue`.
+
+A series has at most one pending or running job, so overlapping batch runs
+only queue what is not already queued. Workers can be given a shard
+(`shard_index` of `shard_count`) to drain a disjoint slice of the series.
+"""
+
+import asyncio
+import contextlib
+import itertools
+import logging
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import and_, case, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.helpers.config import Config
+from app.helpers.advisory_lock import advisory_key
+from app.helpers.database import SessionLocal, dialect_insert
+from app.helpers.secrets_service import SecretsService, SecretSnapshot
+from app.models import RefreshJob
+from app.services.call_scheduler import BATCH
+from app.services.config_enumeration import iter_vendor_configs
+from app.services.vendor_metrics_service import VendorMetricsService
+
+logger = logging.getLogger(__name__)
+
+ENQUEUE_BATCH_SIZE = 1000
+# A running job whose worker has not finished it by then is claimed again
+LEASE = timedelta(minutes=15)
+RETRY_BACKOFF = timedelta(seconds=30)
+MAX_ERROR_LENGTH = 2000
+SHARD_SPACE = 2**31
+ACTIVE_STATUSES = ("pending", "running")
+
+
+@dataclass
+class ClaimedJob:
+    id: int
+    user_id: int
+    vendor: str
+    identifier: str
+    attempts: int
+    max_attempts: int
+
+
+def shard_key(user_id: int, vendor: str, identifier: str) -> int:
+    """Stable non-negative hash of a series, used to split jobs into shards."""
+    return advisory_key(user_id, vendor, identifier) % SHARD_SPACE
+
+
+def enqueue_refresh_run(
+    db: Session,
+    vendors: Optional[List[str]] = None,
+    synced_before: Optional[datetime] = None,
+    max_attempts: int = 3,
+) -> Dict[str, Any]:
+    """
+    Queue a refresh of every matching configuration under a new run id.
+    Series that already have a pending or running job are skipped.
+    """
+    run_id = uuid.uuid4().hex
+    now = datetime.utcnow()
+    # Stream the configurations and commit once at the end: committing while
+    # iterating would close the enumeration cursor
+    work_items = iter_vendor_configs(db, vendors=vendors, synced_before=synced_before)
+    total = enqueued = 0
+    while batch := list(itertools.islice(work_items, ENQUEUE_BATCH_SIZE)):
+        total += len(batch)
+        stmt = dialect_insert(db, RefreshJob).values(
+            [
+                {
+                    "run_id": run_id,
+                    "user_id": user_id,
+                    "vendor": vendor,
+                    "identifier": identifier,
+                    "status": "pending",
+                    "attempts": 0,
+                    "max_attempts": max_attempts,
+                    "run_after": now,
+                    "created_at": now,
+                    "updated_at": now,
+                    "shard_key": shard_key(user_id, vendor, identifier),
+                }
+                for user_id, vendor, identifier in batch
+            ]
+        )
+        inserted = db.execute(
+            stmt.on_conflict_do_nothing(
+                index_elements=[
+                    RefreshJob.user_id,
+                    RefreshJob.vendor,
+                    RefreshJob.identifier,
+                ],
+                index_where=RefreshJob.status.in_(ACTIVE_STATUSES),
+            ).returning(RefreshJob.id)
+        ).all()
+        enqueued += len(inserted)
+    db.commit()
+    skipped = total - enqueued
+    logger.info(
+        f"Queued {enqueued} refresh jobs for run {run_id}, "
+        f"{skipped} series already queued"
+    )
+    return {"run_id": run_id, "enqueued": enqueued, "skipped": skipped}
+
+
+def claim_jobs(
+    db: Session, limit: int = 1, shard_index: int = 0, shard_count: int = 1
+) -> List[ClaimedJob]:
+    """
+    Atomically mark up to `limit` due jobs as running and return them.
+    Rows other workers have locked are skipped rather than waited on.
+    With `shard_count` above 1, only jobs in shard `shard_index` are claimed.
+    """
+    now = datetime.utcnow()
+    due = select(RefreshJob.id).where(
+        or_(
+            and_(RefreshJob.status == "pending", RefreshJob.run_after <= now),
+            and_(
+                RefreshJob.status == "running",
+                RefreshJob.started_at < now - LEASE,
+            ),
+        )
+    )
+    if shard_count > 1:
+        due = due.where(RefreshJob.shard_key % shard_count == shard_index)
+    due = due.order_by(RefreshJob.id).limit(limit).with_for_update(skip_locked=True)
+    claimed = db.execute(
+        update(RefreshJob)
+        .where(RefreshJob.id.in_(due.scalar_subquery()))
+        .values(
+            status="running",
+            attempts=RefreshJob.attempts + 1,
+            started_at=now,
+            finished_at=None,
+            updated_at=now,
+        )
+        .returning(
+            RefreshJob.id,
+            RefreshJob.user_id,
+            RefreshJob.vendor,
+            RefreshJob.identifier,
+            RefreshJob.attempts,
+            RefreshJob.max_attempts,
+        )
+        .execution_options(synchronize_session=False)
+    ).all()
+    db.commit()
+    return [ClaimedJob(*row) for row in claimed]
+
+
+def complete_job(
+    db: Session, job: ClaimedJob, started: datetime, error: Optional[str] = None
+) -> str:
+    """
+    Record a job's outcome; failures are retried until attempts run out.
+
+    Returns the job's new status, or "lost" if its lease expired and another
+    worker claimed it since: that worker's attempt owns the row now.
+    """
+    now = datetime.utcnow()
+    values: Dict[str, Any] = {
+        "finished_at": now,
+        "duration_ms": int((now - started).total_seconds() * 1000),
+        "updated_at": now,
+        "last_error": error[:MAX_ERROR_LENGTH] if error else None,
+    }
+    if error is None:
+        values["status"] = "succeeded"
+    elif job.attempts < job.max_attempts:
+        values["status"] = "pending"
+        values["run_after"] = now + RETRY_BACKOFF * 2 ** (job.attempts - 1)
+    else:
+        values["status"] = "failed"
+    result = db.execute(
+        update(RefreshJob)
+        .where(
+            RefreshJob.id == job.id,
+            RefreshJob.status == "running",
+            # Each claim bumps attempts, so this is still our claim
+            RefreshJob.attempts == job.attempts,
+        )
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    if result.rowcount == 0:
+        return "lost"
+    return values["status"]
+
+
+def _prefetch_customer_secrets() -> Optional[SecretSnapshot]:
+    """
+    Fetch every customer secret once instead of two calls per job.
+    The database backend reads through each job's session instead.
+    """
+    if Config().SecretsBackend != "infisical":
+        return None
+    try:
+        secrets = SecretsService().snapshot_customer_secrets()
+        logger.info(f"Loaded {len(secrets)} customer secrets for refresh jobs")
+        return secrets
+    except Exception as e:
+        logger.warning(
+            f"Could not prefetch customer secrets, fetching per job: {str(e)}"
+        )
+        return None
+
+
+def get_run_status(db: Session, run_id: str) -> Optional[Dict[str, Any]]:
+    """Progress of a run, or None if no jobs were queued under `run_id`."""
+    row = db.execute(
+        select(
+            func.count().label("total"),
+            *(
+                func.sum(case((RefreshJob.status == status, 1), else_=0)).label(status)
+                for status in ("pending", "running", "succeeded", "failed")
+            ),
+            func.sum(RefreshJob.attempts).label("attempts"),
+            func.avg(RefreshJob.duration_ms).label("avg_duration_ms"),
+            func.max(RefreshJob.duration_ms).label("max_duration_ms"),
+            func.min(RefreshJob.created_at).label("created_at"),
+            func.min(RefreshJob.started_at).label("started_at"),
+            func.max(RefreshJob.finished_at).label("finished_at"),
+        ).where(RefreshJob.run_id == run_id)
+    ).one()
+    if not row.total:
+        return None
+
+    errors = db.execute(
+        select(
+            RefreshJob.user_id,
+            RefreshJob.vendor,
+            RefreshJob.identifier,
+            RefreshJob.attempts,
+            RefreshJob.last_error,
+        )
+        .where(RefreshJob.run_id == run_id, RefreshJob.status == "failed")
+        .order_by(RefreshJob.id)
+        .limit(20)
+    ).all()
+
+    done = row.succeeded + row.failed
+    return {
+        "run_id": run_id,
+        "status": "completed" if done == row.total else "in_progress",
+        "total": row.total,
+        "pending": row.pending,
+        "running": row.running,
+        "succeeded": row.succeeded,
+        "failed": row.failed,
+        "attempts": row.attempts,
+        "avg_duration_ms": (
+            round(float(row.avg_duration_ms)) if row.avg_duration_ms else None
+        ),
+        "max_duration_ms": row.max_duration_ms,
+        "created_at": row.created_at.isoformat() if row.created_at else None,
+        "started_at": row.started_at.isoformat() if row.started_at else None,
+        "finished_at": (
+            row.finished_at.isoformat() if row.finished_at and done else None
+        ),
+        "errors": [dict(error._mapping) for error in errors],
+    }
+
+
+class RefreshWorker:
+    """
+    Drains the refresh queue, claiming up to `concurrency` jobs at a time.
+
+    Each claimed batch shares one snapshot of customer secrets, and every
+    job runs through VendorMetricsService on its own session;
+    `vendor_concurrency` caps how many jobs per vendor run at once. A worker
+    given a shard only claims that shard's jobs, so every shard index needs
+    a running worker.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 16,
+        vendor_concurrency: Optional[Dict[str, int]] = None,
+        poll_interval: float = 5.0,
+        session_factory: Callable[[], Session] = SessionLocal,
+        shard_index: int = 0,
+        shard_count: int = 1,
+    ):
+        if shard_count < 1 or not 0 <= shard_index < shard_count:
+            raise ValueError(
+                f"Invalid refresh worker shard {shard_index} of {shard_count}"
+            )
+        self.shard_index = shard_index
+        self.shard_count = shard_count
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.session_factory = session_factory
+        self._vendor_limits = {
+            vendor: asyncio.Semaphore(max(limit, 1))
+            for vendor, limit in (vendor_concurrency or {}).items()
+        }
+        self._task: Optional[asyncio.Task] = None
+        self.processed = 0
+        self.failed = 0
+
+    @classmethod
+    def from_config(cls, config: Optional[Config] = None) -> "RefreshWorker":
+        config = config or Config()
+        return cls(
+            concurrency=config.BatchUpdateConcurrency,
+            vendor_concurrency=config.BatchUpdateVendorConcurrency,
+            poll_interval=config.RefreshWorkerPollInterval,
+            shard_index=config.RefreshWorkerShardIndex,
+            shard_count=config.RefreshWorkerShardCount,
+        )
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def run_once(self) -> int:
+        """Claim up to `concurrency` due jobs and run them; returns how many."""
+        db = self.session_factory()
+        try:
+            jobs = claim_jobs(
+                db,
+                limit=self.concurrency,
+                shard_index=self.shard_index,
+                shard_count=self.shard_count,
+            )
+        finally:
+            db.close()
+        if not jobs:
+            return 0
+        # A single job fetches its own two secrets more cheaply
+        secrets = None
+        if len(jobs) > 1:
+            secrets = await asyncio.to_thread(_prefetch_customer_secrets)
+        await asyncio.gather(*(self._process(job, secrets) for job in jobs))
+        return len(jobs)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                if not await self.run_once():
+                    await asyncio.sleep(self.poll_interval)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Refresh worker error: {str(e)}")
+                await asyncio.sleep(self.poll_interval)
+
+    async def _process(
+        self, job: ClaimedJob, secrets: Optional[SecretSnapshot]
+    ) -> None:
+        db = self.session_factory()
+        try:
+            await self._refresh(db, job, secrets)
+        finally:
+            db.close()
+
+    async def _refresh(
+        self, db: Session, job: ClaimedJob, secrets: Optional[SecretSnapshot]
+    ) -> None:
+        started = datetime.utcnow()
+        error = None
+        try:
+            async with self._vendor_limits.get(job.vendor) or contextlib.nullcontext():
+                await VendorMetricsService(
+                    job.user_id, db, secrets=secrets, priority=BATCH
+                ).refresh_vendor_metrics(job.vendor, job.identifier)
+        except Exception as e:
+            db.rollback()
+            error = str(e)
+
+        status = complete_job(db, job, started, error)
+        if status == "lost":
+            logger.warning(
+                f"Refresh job {job.id} ({job.vendor}, user {job.user_id}, "
+                f"config {job.identifier}) lost its lease during attempt "
+                f"{job.attempts}; its outcome was not recorded"
+            )
+            return
+        self.processed += 1
+        if error:
+            self.failed += 1
+            logger.error(
+                f"Refresh job {job.id} ({job.vendor}, user {job.user_id}, "
+                f"config {job.identifier}) attempt {job.attempts} failed, "
+                f"now {status}: {error}"
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None,
+            "concurrency": self.concurrency,
+            "shard": f"{self.shard_index}/{self.shard_count}",
+            "processed": self.processed,
+            "failed": self.failed,
+        }
+
+
+_worker: Optional[RefreshWorker] = None
+
+
+def get_refresh_worker() -> RefreshWorker:
+    """The process-wide worker, created on first use."""
+    global _worker
+    if _worker is None:
+        _worker = RefreshWorker.from_config()
+    return _worker
+
+
+async def stop_refresh_worker() -> None:
+    global _worker
+    if _worker is not None:
+        await _worker.stop()
+        _worker = None
+
+
+async def _main() -> None:
+    worker = get_refresh_worker()
+    worker.start()
+    logger.info(f"Refresh worker started, running up to {worker.concurrency} jobs")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await stop_refresh_worker()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main())
@@ -0,0 +1,188 @@
+"""Per-series sync state used to plan vendor metric refreshes."""
+
+from datetime import date, datetime, timedelta
+from typing import Optional, Tuple
+
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.helpers.database import dialect_insert
+from app.models import VendorSyncState
+
+# How far back a series is kept filled
+REFRESH_WINDOW = timedelta(days=365)
+# How old the current month's figures may get before they are fetched again
+CURRENT_MONTH_MAX_AGE = timedelta(days=1)
+# Daily figures keep changing for a few days; refetch that many past days
+DAILY_SETTLE_PERIOD = timedelta(days=3)
+
+MonthRange = Tuple[date, date]
+DayRange = Tuple[date, date]
+
+
+def previous_month(month: date) -> date:
+    return (month - timedelta(days=1)).replace(day=1)
+
+
+def next_month(month: date) -> date:
+    return (month + timedelta(days=32)).replace(day=1)
+
+
+def _sync_state_query(user_id: int, vendor: str, identifier: str) -> Select:
+    return select(VendorSyncState).where(
+        VendorSyncState.user_id == user_id,
+        VendorSyncState.vendor == vendor,
+        VendorSyncState.identifier == identifier,
+    )
+
+
+def get_sync_state(
+    db: Session, user_id: int, vendor: str, identifier: str
+) -> Optional[VendorSyncState]:
+    return db.scalars(_sync_state_query(user_id, vendor, identifier)).first()
+
+
+async def aget_sync_state(
+    db: AsyncSession, user_id: int, vendor: str, identifier: str
+) -> Optional[VendorSyncState]:
+    return (await db.scalars(_sync_state_query(user_id, vendor, identifier))).first()
+
+
+def plan_refresh(
+    state: Optional[VendorSyncState], now: datetime, force: bool = False
+) -> Optional[MonthRange]:
+    """
+    Return the (first, last) month to fetch, or None if the series is up to
+    date. Months are first-of-month dates and the range is inclusive.
+
+    The whole window is fetched on first sync. After that, only months
+    outside the covered range are fetched, plus the current month once its
+    figures are older than CURRENT_MONTH_MAX_AGE, or at once with `force`.
+    Whenever the current month
+    is fetched, the month before it is fetched as well, because its final
+    figures can still change early in the month.
+    """
+    window_start = (now - REFRESH_WINDOW).date().replace(day=1)
+    current = now.date().replace(day=1)
+    if state is None or state.covered_from is None or state.covered_to is None:
+        return window_start, current
+
+    missing = []
+    if state.covered_from > window_start:
+        missing += [window_start, previous_month(state.covered_from)]
+    if state.covered_to < current:
+        missing += [next_month(state.covered_to), current]
+    elif (
+        force
+        or state.last_synced_at is None
+        or now - state.last_synced_at > CURRENT_MONTH_MAX_AGE
+    ):
+        missing.append(current)
+
+    if not missing:
+        return None
+    start, end = min(missing), max(missing)
+    if end == current and start > window_start:
+        start = previous_month(start)
+    return start, end
+
+
+def daily_horizon(now: datetime) -> date:
+    """
+    First day ingested at daily granularity: the start of the previous
+    month, whose figures can still change. Older months are fetched monthly.
+    """
+    return previous_month(now.date().replace(day=1))
+
+
+def plan_daily_refresh(state: Optional[VendorSyncState], now: datetime) -> DayRange:
+    """
+    Return the (first, last) day to fetch, inclusive. Only the days since
+    the last daily sync are fetched, less DAILY_SETTLE_PERIOD; the horizon
+    is fetched in full when the stored days do not reach back to it.
+    """
+    horizon = daily_horizon(now)
+    today = now.date()
+    if (
+        state is None
+        or state.daily_covered_from is None
+        or state.daily_covered_to is None
+        or state.daily_covered_from > horizon
+    ):
+        return horizon, today
+    return max(horizon, state.daily_covered_to - DAILY_SETTLE_PERIOD), today
+
+
+def record_sync_success(
+    db: Session,
+    user_id: int,
+    vendor: str,
+    identifier: str,
+    state: Optional[VendorSyncState],
+    fetched: MonthRange,
+    now: datetime,
+    fetched_days: Optional[DayRange] = None,
+) -> None:
+    """
+    Extend the covered range by `fetched`, and the daily range by
+    `fetched_days` if given, and clear the last error.
+    """
+    covered_from, covered_to = fetched
+    if state is not None and state.covered_from is not None:
+        covered_from = min(covered_from, state.covered_from)
+    if state is not None and state.covered_to is not None:
+        covered_to = max(covered_to, state.covered_to)
+    daily = {}
+    if fetched_days is not None:
+        first_day, last_day = fetched_days
+        if state is not None and state.daily_covered_from is not None:
+            first_day = min(first_day, state.daily_covered_from)
+        daily = {"daily_covered_from": first_day, "daily_covered_to": last_day}
+    _upsert_state(
+        db,
+        user_id,
+        vendor,
+        identifier,
+        last_synced_at=now,
+        covered_from=covered_from,
+        covered_to=covered_to,
+        last_error=None,
+        last_error_at=None,
+        **daily,
+    )
+
+
+def record_sync_error(
+    db: Session,
+    user_id: int,
+    vendor: str,
+    identifier: str,
+    error: str,
+    now: datetime,
+) -> None:
+    _upsert_state(db, user_id, vendor, identifier, last_error=error, last_error_at=now)
+
+
+def _upsert_state(
+    db: Session, user_id: int, vendor: str, identifier: str, **values
+) -> None:
+    now = datetime.utcnow()
+    stmt = dialect_insert(db, VendorSyncState).values(
+        user_id=user_id,
+        vendor=vendor,
+        identifier=identifier,
+        created_at=now,
+        updated_at=now,
+        **values,
+    )
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[
+                VendorSyncState.user_id,
+                VendorSyncState.vendor,
+                VendorSyncState.identifier,
+            ],
+            set_={**values, "updated_at": now},
+        )
+    )
@@ -1,193 +1,320 @@
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
-from app.models import VendorMetrics, User, DatadogAPIConfiguration, AWSAPIConfiguration
+from sqlalchemy import (
+    Boolean,
+    Select,
+    delete,
+    func,
+    literal_column,
+    select,
+    tuple_,
+)
+from app.models import (
+    AWSCostBreakdown,
+    DatadogCostBreakdown,
+    VendorDailyCost,
+    VendorMetrics,
+)
 from app.services.aws_service import AWSService
+from app.services.call_scheduler import INTERACTIVE
 from app.services.datadog_service import DatadogService
-from typing import List, Dict
-from datetime import datetime, timedelta
+from app.services.sync_state import (
+    aget_sync_state,
+    daily_horizon,
+    get_sync_state,
+    plan_daily_refresh,
+    plan_refresh,
+    previous_month,
+    record_sync_error,
+    record_sync_success,
+)
+from app.helpers.advisory_lock import advisory_key, advisory_xact_lock
+from app.helpers.config import Config
+from app.helpers.credential_store import CustomerSecrets
+from app.helpers.database import SessionLocal, dialect_insert
+from app.helpers.single_flight import SingleFlight
+from typing import Callable, Dict, Optional, Set
+from datetime import date, datetime, timedelta
 import logging
 
 logger = logging.getLogger(__name__)
 
+VENDOR_LABELS = {"aws": "AWS", "datadog": "Datadog"}
+BREAKDOWN_MODELS = {"aws": AWSCostBreakdown, "datadog": DatadogCostBreakdown}
+# Columns that, with the series and month, identify a breakdown row
+BREAKDOWN_DIMENSIONS = {
+    "aws": ("service", "linked_account"),
+    "datadog": ("product_name", "charge_type"),
+}
+
+# (user_id, vendor, identifier, force) -> the refresh in flight for that series.
+# Forced refreshes fly separately, so one never gets a plain refresh's result
+# back when that refresh planned nothing to fetch
+refresh_flights: SingleFlight[tuple, Optional[Dict[str, int]]] = SingleFlight()
+
 
 class VendorMetricsService:
-    def __init__(self, user_id: int, db: Session):
+    def __init__(
+        self,
+        user_id: int,
+        db: Session,
+        secrets: Optional[CustomerSecrets] = None,
+        priority: int = INTERACTIVE,
+        async_db: Optional[AsyncSession] = None,
+    ):
         self.user_id = user_id
         self.db = db
+        # Serves reads of stored metrics without blocking the event loop;
+        # refreshes still write through `db`
+        self.async_db = async_db
+        self.secrets = secrets
+        # Scheduling priority of the vendor API calls this service makes
+        self.priority = priority
 
-    @classmethod
-    async def batch_update_all_vendor_metrics(cls, db: Session) -> Dict[str, List[str]]:
-        """Update metrics for all users and their configurations"""
-        results: Dict[str, List[str]] = {"success": [], "failed": []}
-
-        try:
-            # Get all users with their configurations
-            users = db.query(User).all()
-
-            for user in users:
-                service = cls(user.id, db)
-
-                # Update AWS metrics for each configuration
-                aws_configs = (
-                    db.query(AWSAPIConfiguration)
-                    .filter(AWSAPIConfiguration.user_id == user.id)
-                    .all()
-                )
-
-                for config in aws_configs:
-                    try:
-                        await service.get_and_store_vendor_metrics(
-                            "aws", config.identifier
-                        )
-                        msg = f"AWS metrics updated for user {user.id}, config {config.identifier}"
-                        results["success"].append(msg)
-                    except Exception as e:
-                        error_msg = (
-                            f"Failed to update AWS metrics for user {user.id}, "
-                            f"config {config.identifier}: {str(e)}"
-                        )
-                        logger.error(error_msg)
-                        results["failed"].append(error_msg)
-
-                # Update Datadog metrics for each configuration
-                datadog_configs = (
-                    db.query(DatadogAPIConfiguration)
-                    .filter(DatadogAPIConfiguration.user_id == user.id)
-                    .all()
-                )
-
-                for config in datadog_configs:
-                    try:
-                        await service.get_and_store_vendor_metrics(
-                            "datadog", config.identifier
-                        )
-                        msg = (
-                            f"Datadog metrics updated for user {user.id}, "
-                            f"config {config.identifier}"
-                        )
-                        results["success"].append(msg)
-                    except Exception as e:
-                        error_msg = (
-                            f"Failed to update Datadog metrics for user {user.id}, "
-                            f"config {config.identifier}: {str(e)}"
-                        )
-                        logger.error(error_msg)
-                        results["failed"].append(error_msg)
+    async def get_vendor_metrics(
+        self,
+        vendor: str,
+        identifier: str = "Default Configuration",
+        force_sync: bool = False,
+    ) -> Dict:
+        """
+        Answer from stored metrics, with their freshness. Series that have
+        never synced, or `force_sync`, are refreshed before answering;
+        otherwise `refresh_pending` tells the caller to refresh them in the
+        background.
+        """
+        vendor = vendor.lower()
+        if vendor not in VENDOR_LABELS:
+            raise ValueError(f"Unsupported vendor: {vendor}")
 
-        except Exception as e:
-            error_msg = f"Batch update failed: {str(e)}"
-            logger.error(error_msg)
-            results["failed"].append(error_msg)
+        if self.async_db is None:
+            state = get_sync_state(self.db, self.user_id, vendor, identifier)
+        else:
+            state = await aget_sync_state(
+                self.async_db, self.user_id, vendor, identifier
+            )
+        if force_sync or state is None or state.last_synced_at is None:
+            if self.async_db is not None:
+                # Release the read connection while the vendor is called
+                await self.async_db.commit()
+            metrics = await self.get_and_store_vendor_metrics(
+                vendor, identifier, force=force_sync
+            )
+            state = get_sync_state(self.db, self.user_id, vendor, identifier)
+            refresh_pending = False
+        else:
+            if self.async_db is None:
+                metrics = self.get_stored_vendor_metrics(vendor, identifier)
+            else:
+                metrics = await self.aget_stored_vendor_metrics(vendor, identifier)
+            refresh_pending = plan_refresh(state, datetime.utcnow()) is not None
 
-        return results
+        return {
+            **metrics,
+            "last_synced_at": (
+                state.last_synced_at.isoformat()
+                if state and state.last_synced_at
+                else None
+            ),
+            "last_error": state.last_error if state else None,
+            "refresh_pending": refresh_pending,
+        }
 
     async def get_and_store_vendor_metrics(
-        self, vendor: str, identifier: str = "Default Configuration"
+        self,
+        vendor: str,
+        identifier: str = "Default Configuration",
+        force: bool = False,
     ):
         """Get vendor metrics and store them in the database"""
+        vendor = vendor.lower()
+        if vendor not in VENDOR_LABELS:
+            raise ValueError(f"Unsupported vendor: {vendor}")
+
         try:
-            # Get stored metrics
-            stored_metrics = (
-                self.db.query(VendorMetrics)
-                .filter(
-                    and_(
-                        VendorMetrics.user_id == self.user_id,
-                        VendorMetrics.vendor == vendor.lower(),
-                        VendorMetrics.identifier == identifier,
-                    )
-                )
-                .order_by(VendorMetrics.month)
-                .all()
-            )
+            await self.refresh_vendor_metrics(vendor, identifier, force=force)
+            return self.get_stored_vendor_metrics(vendor, identifier)
+        except ValueError:
+            raise
+        except Exception as e:
+            raise Exception(f"Failed to get and store {vendor} metrics: {str(e)}")
+
+    async def refresh_vendor_metrics(
+        self, vendor: str, identifier: str, force: bool = False
+    ) -> Optional[Dict[str, int]]:
+        """
+        Fetch and store the months the series' sync state says are missing.
+        Returns the stored row counts, or None if nothing needed fetching.
+
+        Concurrent refreshes of one series in this process share a single
+        run. With REFRESH_LOCK_MODE=advisory, a Postgres advisory lock also
+        keeps other workers from refreshing it at the same time; whoever
+        gets the lock second re-plans and usually finds nothing to fetch.
+        """
+        key = (self.user_id, vendor, identifier, force)
+        counts = await refresh_flights.do(
+            key, lambda: self._refresh_on_own_session(vendor, identifier, force)
+        )
+        # The refresh committed through another session
+        self.db.expire_all()
+        return counts
 
-            # Calculate date range for last 11 months
-            end_date = datetime.now()
-            start_date = end_date - timedelta(days=365)
-
-            # Find missing months
-            existing_months = {metric.month for metric in stored_metrics}
-            required_months = set()
-            current_date = start_date
-            while current_date <= end_date:
-                month_str = current_date.strftime("%m-%Y")
-                required_months.add(month_str)
-                current_date = (
-                    current_date.replace(day=1) + timedelta(days=32)
-                ).replace(day=1)
-
-            missing_months = required_months - existing_months
-
-            # Check if current month's data needs refresh
-            current_month = end_date.strftime("%m-%Y")
-            current_month_metric = next(
-                (m for m in stored_metrics if m.month == current_month), None
+    async def _refresh_on_own_session(
+        self, vendor: str, identifier: str, force: bool
+    ) -> Optional[Dict[str, int]]:
+        """
+        Run a shared refresh on a session of its own: the caller that
+        started it may be cancelled, and its request session closed, while
+        the other callers are still waiting on it.
+        """
+        db = Session(bind=self.db.get_bind(), autoflush=False)
+        try:
+            service = VendorMetricsService(
+                self.user_id, db, secrets=self.secrets, priority=self.priority
             )
+            return await service._refresh_with_lock(vendor, identifier, force)
+        finally:
+            db.close()
 
-            if current_month_metric and (
-                datetime.utcnow() - current_month_metric.updated_at
-            ) > timedelta(days=1):
-                # If current month data is older than 1 day, add it to missing months
-                missing_months.add(current_month)
+    async def _refresh_with_lock(
+        self, vendor: str, identifier: str, force: bool
+    ) -> Optional[Dict[str, int]]:
+        config = Config()
+        engine = self.db.get_bind()
+        if config.RefreshLockMode != "advisory" or engine.dialect.name != "postgresql":
+            return await self._refresh_vendor_metrics(vendor, identifier, force)
 
-            if missing_months:
-                # Get costs for missing months
-                earliest_missing = min(
-                    missing_months, key=lambda x: datetime.strptime(x, "%m-%Y")
-                )
-                latest_missing = max(
-                    missing_months, key=lambda x: datetime.strptime(x, "%m-%Y")
+        key = advisory_key("vendor-refresh", self.user_id, vendor, identifier)
+        async with advisory_xact_lock(
+            engine, key, timeout=config.RefreshLockTimeout
+        ) as acquired:
+            if not acquired:
+                logger.info(
+                    f"Skipping {vendor} refresh for user {self.user_id}, "
+                    f"config {identifier}: another worker holds the lock"
                 )
+                return None
+            return await self._refresh_vendor_metrics(vendor, identifier, force)
 
-                # If current month needs refresh, also get previous month to ensure complete data
-                if current_month in missing_months:
-                    earliest_date = datetime.strptime(earliest_missing, "%m-%Y")
+    async def _refresh_vendor_metrics(
+        self, vendor: str, identifier: str, force: bool
+    ) -> Optional[Dict[str, int]]:
+        # Plan from the series' sync state instead of scanning its rows
+        now = datetime.utcnow()
+        state = get_sync_state(self.db, self.user_id, vendor, identifier)
+        fetch = plan_refresh(state, now, force=force)
+        if not fetch:
+            return None
 
-                    if (earliest_date - start_date).days > 0:
-                        earliest_missing = (
-                            earliest_date - timedelta(days=32)
-                        ).strftime("%m-%Y")
-                    else:
-                        earliest_missing = earliest_date.strftime("%m-%Y")
+        start, end = fetch
+        # In daily mode, months from the daily horizon on are rolled up from
+        # daily costs and only older months are fetched monthly. Their
+        # breakdown rows are left as they are: fetching it would cost the
+        # monthly call daily mode exists to avoid
+        horizon = None
+        if Config().CostIngestionMode == "daily":
+            horizon = daily_horizon(now)
+        monthly_end = end if horizon is None else min(end, previous_month(horizon))
+        days = None
+        if horizon is not None and end >= horizon:
+            days = plan_daily_refresh(state, now)
 
-                costs = self._get_vendor_costs(
+        costs: Dict[str, list] = {"data": []}
+        try:
+            if start <= monthly_end:
+                costs = await self._get_vendor_costs(
                     vendor,
                     identifier,
-                    start_date=earliest_missing,
-                    end_date=latest_missing,
+                    start_date=start.strftime("%m-%Y"),
+                    end_date=monthly_end.strftime("%m-%Y"),
                 )
-
-                # Store new metrics
-                self._store_metrics(vendor, identifier, costs["data"])
-
-            # Return all metrics (stored + new)
-            all_metrics = (
-                self.db.query(VendorMetrics)
-                .filter(
-                    and_(
-                        VendorMetrics.user_id == self.user_id,
-                        VendorMetrics.vendor == vendor.lower(),
-                        VendorMetrics.identifier == identifier,
-                    )
+            if days:
+                daily_costs = await self._get_vendor_daily_costs(
+                    vendor, identifier, *days
                 )
-                .order_by(VendorMetrics.month)
-                .all()
+        except Exception as e:
+            self._record_sync_error(vendor, identifier, str(e), now)
+            raise
+
+        # Store new metrics
+        if "breakdown" in costs:
+            self._store_breakdown(
+                vendor,
+                identifier,
+                {item["month"] for item in costs["data"]},
+                costs["breakdown"],
+            )
+        cost_data = costs["data"]
+        if days:
+            self._store_daily_costs(vendor, identifier, daily_costs["data"])
+            cost_data = cost_data + self._roll_up_daily_costs(
+                vendor, identifier, days[0]
             )
+        record_sync_success(
+            self.db,
+            self.user_id,
+            vendor,
+            identifier,
+            state,
+            fetch,
+            now,
+            fetched_days=days,
+        )
+        counts = self._store_metrics(vendor, identifier, cost_data)
+        logger.info(
+            f"Stored {vendor} metrics for user {self.user_id}, "
+            f"config {identifier}: {counts}"
+        )
+        return counts
 
-            return {
-                "data": [
-                    {"month": metric.month, "cost": float(metric.cost)}
-                    for metric in all_metrics
-                    if datetime.strptime(metric.month, "%m-%Y").year
-                    > datetime.now().year - 2
-                ]
-            }
+    def _stored_metrics_query(self, vendor: str, identifier: str) -> Select:
+        # This year and last, oldest first
+        since = date(datetime.now().year - 1, 1, 1)
+        return (
+            select(VendorMetrics.month, VendorMetrics.cost)
+            .where(
+                VendorMetrics.user_id == self.user_id,
+                VendorMetrics.vendor == vendor,
+                VendorMetrics.identifier == identifier,
+                VendorMetrics.month >= since,
+            )
+            .order_by(VendorMetrics.month)
+        )
 
-        except ValueError:
-            raise
+    @staticmethod
+    def _format_stored_metrics(rows) -> Dict:
+        return {
+            "data": [
+                {"month": month.strftime("%m-%Y"), "cost": float(cost)}
+                for month, cost in rows
+            ]
+        }
+
+    def get_stored_vendor_metrics(self, vendor: str, identifier: str) -> Dict:
+        rows = self.db.execute(self._stored_metrics_query(vendor, identifier))
+        return self._format_stored_metrics(rows)
+
+    async def aget_stored_vendor_metrics(self, vendor: str, identifier: str) -> Dict:
+        rows = await self.async_db.execute(
+            self._stored_metrics_query(vendor, identifier)
+        )
+        return self._format_stored_metrics(rows)
+
+    def _record_sync_error(
+        self, vendor: str, identifier: str, error: str, now: datetime
+    ) -> None:
+        try:
+            self.db.rollback()
+            record_sync_error(self.db, self.user_id, vendor, identifier, error, now)
+            self.db.commit()
         except Exception as e:
-            raise Exception(f"Failed to get and store {vendor} metrics: {str(e)}")
+            self.db.rollback()
+            logger.error(
+                f"Failed to record sync error for user {self.user_id}, "
+                f"config {identifier}: {str(e)}"
+            )
 
-    def _get_vendor_costs(
+    async def _get_vendor_costs(
         self,
         vendor: str,
         identifier: str,
@@ -195,44 +322,275 @@ class VendorMetricsService:
         end_date: str | None = None,
     ):
         """Get costs from the appropriate vendor service"""
+        service = self._vendor_service(vendor, identifier)
+        return await service.get_monthly_costs(start_date, end_date)
+
+    async def _get_vendor_daily_costs(
+        self, vendor: str, identifier: str, start_day: date, end_day: date
+    ):
+        """Get daily costs from the appropriate vendor service"""
+        service = self._vendor_service(vendor, identifier)
+        return await service.get_daily_costs(start_day, end_day)
+
+    def _vendor_service(self, vendor: str, identifier: str):
         if vendor.lower() == "datadog":
-            service = DatadogService(self.user_id, self.db, identifier)
-            return service.get_monthly_costs(start_date, end_date)
+            return DatadogService(
+                self.user_id,
+                self.db,
+                identifier,
+                secrets=self.secrets,
+                priority=self.priority,
+            )
         elif vendor.lower() == "aws":
-            service = AWSService(self.user_id, self.db, identifier)
-            return service.get_monthly_costs(start_date, end_date)
+            return AWSService(
+                self.user_id,
+                self.db,
+                identifier,
+                secrets=self.secrets,
+                priority=self.priority,
+            )
         else:
             raise ValueError(f"Unsupported vendor: {vendor}")
 
-    def _store_metrics(self, vendor: str, identifier: str, cost_data: list):
-        """Store metrics in the database"""
-        for cost_item in cost_data:
-            # Check if metric already exists
-            existing_metric = (
-                self.db.query(VendorMetrics)
-                .filter(
-                    and_(
-                        VendorMetrics.user_id == self.user_id,
-                        VendorMetrics.vendor == vendor.lower(),
-                        VendorMetrics.identifier == identifier,
-                        VendorMetrics.month == cost_item["month"],
-                    )
+    def _store_daily_costs(self, vendor: str, identifier: str, daily: list) -> None:
+        """
+        Upsert daily costs. Committed together with the monthly totals by
+        _store_metrics.
+        """
+        costs = {item["day"]: item["cost"] for item in daily}
+        if not costs:
+            return
+        now = datetime.utcnow()
+        stmt = dialect_insert(self.db, VendorDailyCost).values(
+            [
+                {
+                    "user_id": self.user_id,
+                    "vendor": vendor.lower(),
+                    "identifier": identifier,
+                    "day": day,
+                    "cost": cost,
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                for day, cost in costs.items()
+            ]
+        )
+        self.db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[
+                    VendorDailyCost.user_id,
+                    VendorDailyCost.vendor,
+                    VendorDailyCost.identifier,
+                    VendorDailyCost.day,
+                ],
+                set_={"cost": stmt.excluded.cost, "updated_at": now},
+                where=VendorDailyCost.cost.is_distinct_from(stmt.excluded.cost),
+            )
+        )
+
+    def _roll_up_daily_costs(self, vendor: str, identifier: str, since: date) -> list:
+        """Monthly totals from the stored daily costs, from the month of `since`."""
+        totals: Dict[str, float] = {}
+        for day, cost in self.db.execute(
+            select(VendorDailyCost.day, VendorDailyCost.cost).where(
+                VendorDailyCost.user_id == self.user_id,
+                VendorDailyCost.vendor == vendor.lower(),
+                VendorDailyCost.identifier == identifier,
+                VendorDailyCost.day >= since.replace(day=1),
+            )
+        ):
+            month = day.strftime("%m-%Y")
+            totals[month] = totals.get(month, 0.0) + cost
+        return [
+            {"month": month, "cost": round(cost, 2)} for month, cost in totals.items()
+        ]
+
+    def _store_breakdown(
+        self, vendor: str, identifier: str, months: Set[str], breakdown: list
+    ) -> None:
+        """
+        Upsert the vendor's breakdown rows for the fetched months and delete
+        the ones no longer reported. Committed together with the monthly
+        totals by _store_metrics.
+        """
+        vendor = vendor.lower()
+        model = BREAKDOWN_MODELS[vendor]
+        if not months:
+            return
+        dimensions = [getattr(model, name) for name in BREAKDOWN_DIMENSIONS[vendor]]
+        now = datetime.utcnow()
+        rows = [
+            {
+                **item,
+                "user_id": self.user_id,
+                "identifier": identifier,
+                "month": datetime.strptime(item["month"], "%m-%Y").date(),
+                "created_at": now,
+                "updated_at": now,
+            }
+            for item in breakdown
+        ]
+
+        reported: Dict[date, list] = {
+            datetime.strptime(month, "%m-%Y").date(): [] for month in months
+        }
+        for row in rows:
+            reported.setdefault(row["month"], []).append(
+                tuple(row[column.key] for column in dimensions)
+            )
+        for month, keys in reported.items():
+            self.db.execute(
+                delete(model).where(
+                    model.user_id == self.user_id,
+                    model.identifier == identifier,
+                    model.month == month,
+                    tuple_(*dimensions).not_in(keys),
                 )
-                .first()
             )
 
-            if existing_metric:
-                # Update existing metric
-                existing_metric.cost = cost_item["cost"]
-            else:
-                # Create new metric
-                metric = VendorMetrics(
-                    user_id=self.user_id,
-                    vendor=vendor.lower(),
-                    identifier=identifier,
-                    month=cost_item["month"],
-                    cost=cost_item["cost"],
+        if rows:
+            # Upsert rather than delete-and-insert, so concurrent refreshes of
+            # the series cannot both insert the same row
+            stmt = dialect_insert(self.db, model).values(rows)
+            self.db.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=[
+                        model.user_id,
+                        model.identifier,
+                        model.month,
+                        *dimensions,
+                    ],
+                    set_={"cost": stmt.excluded.cost, "updated_at": now},
+                    where=model.cost.is_distinct_from(stmt.excluded.cost),
                 )
-                self.db.add(metric)
+            )
+
+    def get_cost_breakdown(
+        self, vendor: str, identifier: str, months: int = 12, limit: int = 10
+    ) -> Dict[str, list]:
+        """
+        Top services (AWS) or products (Datadog) by cost over the last
+        `months` months, answered from the stored breakdown.
+
+        With COST_INGESTION_MODE=daily the breakdown is not maintained for
+        the current and previous month, so it can lag their monthly totals.
+        """
+        vendor = vendor.lower()
+        if vendor not in BREAKDOWN_MODELS:
+            raise ValueError(f"Unsupported vendor: {vendor}")
+        model = BREAKDOWN_MODELS[vendor]
+        name = model.service if vendor == "aws" else model.product_name
+
+        this_month = datetime.utcnow().date().replace(day=1)
+        start = this_month
+        for _ in range(months - 1):
+            start = (start - timedelta(days=1)).replace(day=1)
 
+        total = func.sum(model.cost).label("cost")
+        stmt = (
+            select(name.label("name"), total)
+            .where(
+                model.user_id == self.user_id,
+                model.identifier == identifier,
+                model.month >= start,
+            )
+            .group_by(name)
+            .order_by(total.desc())
+            .limit(limit)
+        )
+        if vendor == "datadog":
+            # Committed and on-demand charges are also summed into "total"
+            stmt = stmt.where(model.charge_type == "total")
+
+        return {
+            "data": [
+                {"name": row.name, "cost": round(row.cost, 2)}
+                for row in self.db.execute(stmt)
+            ]
+        }
+
+    def _store_metrics(
+        self, vendor: str, identifier: str, cost_data: list
+    ) -> Dict[str, int]:
+        """
+        Upsert monthly costs in one statement and commit.
+        Returns how many months were inserted, updated and left unchanged.
+        """
+        # ON CONFLICT may only touch a row once per statement; the last value wins
+        costs = {
+            datetime.strptime(item["month"], "%m-%Y").date(): item["cost"]
+            for item in cost_data
+        }
+        counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+        if not costs:
+            return counts
+
+        now = datetime.utcnow()
+        stmt = dialect_insert(self.db, VendorMetrics).values(
+            [
+                {
+                    "user_id": self.user_id,
+                    "vendor": vendor.lower(),
+                    "identifier": identifier,
+                    "month": month,
+                    "cost": cost,
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                for month, cost in costs.items()
+            ]
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[
+                VendorMetrics.user_id,
+                VendorMetrics.vendor,
+                VendorMetrics.identifier,
+                VendorMetrics.month,
+            ],
+            set_={"cost": stmt.excluded.cost, "updated_at": now},
+            where=VendorMetrics.cost.is_distinct_from(stmt.excluded.cost),
+        )
+
+        if self.db.get_bind().dialect.name == "postgresql":
+            # xmax is only zero on a row version created by a plain insert
+            inserted = literal_column("xmax = 0", Boolean)
+            for was_inserted in self.db.execute(stmt.returning(inserted)).scalars():
+                counts["inserted" if was_inserted else "updated"] += 1
+        else:
+            # SQLite has no xmax: inserted rows are the ones stamped with `now`
+            # as their creation time
+            written = self.db.execute(
+                stmt.returning(VendorMetrics.created_at)
+            ).scalars()
+            for created_at in written:
+                counts["inserted" if created_at == now else "updated"] += 1
+
+        counts["unchanged"] = len(costs) - counts["inserted"] - counts["updated"]
         self.db.commit()
+        return counts
+
+
+async def refresh_vendor_metrics_in_background(
+    user_id: int,
+    vendor: str,
+    identifier: str,
+    session_factory: Callable[[], Session] = SessionLocal,
+    priority: int = INTERACTIVE,
+) -> None:
+    """
+    Refresh one series on its own session, after the response was sent. A
+    user is waiting on the dashboard for it, so its vendor calls go ahead of
+    batch refreshes by default.
+    """
+    db = session_factory()
+    try:
+        await VendorMetricsService(
+            user_id, db, priority=priority
+        ).refresh_vendor_metrics(vendor, identifier)
+    except Exception as e:
+        logger.error(
+            f"Background refresh of {vendor} metrics failed for user {user_id}, "
+            f"config {identifier}: {str(e)}"
+        )
+    finally:
+        db.close()
@@ -1,10 +1,12 @@
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from unittest.mock import patch, MagicMock
 from app.models import Base, User
-from app.helpers.database import get_db
+from app.helpers.database import get_async_db, get_db
 from app.helpers.auth import get_authenticated_user
 from app.helpers.secrets import Secrets
 
@@ -14,6 +16,9 @@ engine = create_engine(
     SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Each TestClient request runs on a fresh event loop, so connections are not pooled
+async_engine = create_async_engine("sqlite+aiosqlite:///./test.db", poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
 
 
 def override_get_db():
@@ -24,6 +29,11 @@ def override_get_db():
         db.close()
 
 
+async def override_get_async_db():
+    async with TestingAsyncSessionLocal() as db:
+        yield db
+
+
 @pytest.fixture(scope="module", autouse=True)
 def mock_migrations():
     with patch("app.migrations.run_all.run_migrations"):
@@ -43,6 +53,7 @@ def test_client():
 
         Base.metadata.create_all(bind=engine)
         app.dependency_overrides[get_db] = override_get_db
+        app.dependency_overrides[get_async_db] = override_get_async_db
         app.dependency_overrides[get_authenticated_user] = lambda: {
             "sub": "test-user-123"
         }
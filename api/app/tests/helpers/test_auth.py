@@ -0,0 +1,134 @@
+import base64
+import time
+from unittest.mock import patch
+
+import httpx
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import HTTPException
+from jose import jwt
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.helpers import auth
+from app.helpers.auth import (
+    get_current_user,
+    get_signing_key,
+    signing_key_cache,
+    user_id_cache,
+)
+from app.helpers.jwks import JWKSCache
+from app.helpers.database import async_database_url
+from app.models import Base, User
+
+
+@pytest.fixture
+def db(tmp_path):
+    url = f"sqlite:///{tmp_path / 'auth.db'}"
+    Base.metadata.create_all(bind=create_engine(url))
+    engine = create_async_engine(async_database_url(url), poolclass=NullPool)
+    user_id_cache.clear()
+    yield AsyncSession(engine, expire_on_commit=False)
+    user_id_cache.clear()
+
+
+class FakeSecrets:
+    Auth0Domain = "test.auth0.com"
+
+    @classmethod
+    async def aload(cls):
+        return cls()
+
+
+def rsa_jwk(kid):
+    numbers = (
+        rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        .public_key()
+        .public_numbers()
+    )
+
+    def b64(value):
+        raw = value.to_bytes((value.bit_length() + 7) // 8, "big")
+        return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+    return {"kid": kid, "kty": "RSA", "n": b64(numbers.n), "e": b64(numbers.e)}
+
+
+class TestSigningKeyCache:
+    @pytest.mark.asyncio
+    async def test_rotated_out_key_stops_validating(self):
+        """
+        GIVEN a signing key parsed from a JWKS cached for 60 seconds
+        WHEN Auth0 drops the key and the JWKS is due for a refresh
+        THEN tokens signed with it are rejected instead of served from cache
+        """
+        key_sets = [[rsa_jwk("old")], []]
+
+        async def handler(request):
+            keys = key_sets.pop(0) if len(key_sets) > 1 else key_sets[0]
+            return httpx.Response(
+                200, json={"keys": keys}, headers={"cache-control": "max-age=60"}
+            )
+
+        token = jwt.encode({}, "secret", headers={"kid": "old"})
+        signing_key_cache.clear()
+        real_monotonic = time.monotonic
+        with patch.object(auth, "Secrets", FakeSecrets), patch.object(
+            auth, "jwks_cache", JWKSCache(transport=httpx.MockTransport(handler))
+        ):
+            assert await get_signing_key(token) is not None
+
+            with patch("time.monotonic", side_effect=lambda: real_monotonic() + 61):
+                with pytest.raises(HTTPException) as error:
+                    await get_signing_key(token)
+
+        signing_key_cache.clear()
+        assert error.value.status_code == 401
+
+
+class TestGetCurrentUser:
+    @pytest.mark.asyncio
+    async def test_creates_user_on_first_login(self, db):
+        """
+        GIVEN a sub with no user row
+        WHEN get_current_user resolves it
+        THEN the user should be inserted and its id cached
+        """
+        user = await get_current_user({"sub": "auth0|new"}, db)
+
+        assert user.sub == "auth0|new"
+        assert user_id_cache.get("auth0|new") == user.id
+
+    @pytest.mark.asyncio
+    async def test_existing_user_is_not_duplicated(self, db):
+        """
+        GIVEN a user row created by another worker
+        WHEN get_current_user resolves the same sub with a cold cache
+        THEN it should return the existing row instead of inserting
+        """
+        db.add(User(sub="auth0|existing"))
+        await db.commit()
+
+        first = await get_current_user({"sub": "auth0|existing"}, db)
+        user_id_cache.clear()
+        second = await get_current_user({"sub": "auth0|existing"}, db)
+
+        assert first.id == second.id
+        assert await db.scalar(select(func.count(User.id))) == 1
+        await db.close()
+
+    @pytest.mark.asyncio
+    async def test_cached_user_stays_readable_after_session_closes(self, db):
+        """
+        GIVEN a user whose id is already cached
+        WHEN get_current_user loads it and the request's session closes
+        THEN its columns can still be read by routers on the sync session
+        """
+        await get_current_user({"sub": "auth0|cached"}, db)
+        await db.close()
+
+        user = await get_current_user({"sub": "auth0|cached"}, db)
+        await db.close()
+
+        assert user.sub == "auth0|cached"
@@ -0,0 +1,39 @@
+import time
+
+from app.helpers.cache import LRUCache
+
+
+class TestLRUCache:
+    def test_evicts_least_recently_used(self):
+        """
+        GIVEN a full cache
+        WHEN a new key is set
+        THEN the least recently read key should be evicted
+        """
+        cache: LRUCache[str, int] = LRUCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+
+        cache.set("c", 3)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.stats()["evictions"] == 1
+
+    def test_expired_entries_are_misses(self):
+        """
+        GIVEN an entry stored with a TTL
+        WHEN it is read after the TTL has passed
+        THEN it should be treated as a miss and dropped
+        """
+        cache: LRUCache[str, int] = LRUCache()
+        cache.set("a", 1, ttl=0.01)
+        cache.set("b", 2)
+
+        time.sleep(0.02)
+
+        assert cache.get("a") is None
+        assert cache.get("b") == 2
+        assert "a" not in cache
+        assert cache.stats()["hit_ratio"] == 0.5
@@ -0,0 +1,75 @@
+import os
+
+import pytest
+from cryptography.exceptions import InvalidTag
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.helpers.credential_store import DatabaseCredentialStore
+from app.models import Base, CustomerCredential
+
+
+@pytest.fixture
+def db():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def store(db):
+    return DatabaseCredentialStore(db, master_key=os.urandom(32))
+
+
+class TestDatabaseCredentialStore:
+    def test_round_trip(self, db, store):
+        """
+        GIVEN a customer secret written to the database store
+        WHEN it is read back
+        THEN the plaintext is returned and never stored in the clear
+        """
+        store.create_customer_secret("user_1_datadog_api_key", "dd-api", "datadog")
+        store.create_customer_secret("user_1_aws", {"id": "AKIA"}, "aws")
+        db.commit()
+
+        assert store.get_customer_secret("user_1_datadog_api_key") == "dd-api"
+        assert store.get_customer_secret("user_1_aws") == {"id": "AKIA"}
+        assert store.get_customer_secret("missing") is None
+        stored = db.query(CustomerCredential).all()
+        assert all(b"dd-api" not in row.ciphertext for row in stored)
+
+    def test_update_replaces_value(self, db, store):
+        """
+        GIVEN an existing customer secret
+        WHEN it is written again
+        THEN the row is updated in place with the new value
+        """
+        store.create_customer_secret("user_1_key", "old", "datadog")
+        store.create_customer_secret("user_1_key", "new", "datadog")
+        db.commit()
+
+        assert db.query(CustomerCredential).count() == 1
+        assert store.get_customer_secrets(["user_1_key"]) == {"user_1_key": "new"}
+
+    def test_ciphertext_is_bound_to_secret_name(self, db, store):
+        """
+        GIVEN two stored secrets
+        WHEN one row's ciphertext is copied onto the other
+        THEN decryption fails instead of returning the wrong secret
+        """
+        store.create_customer_secret("user_1_key", "one", "datadog")
+        store.create_customer_secret("user_2_key", "two", "datadog")
+        first, second = db.query(CustomerCredential).order_by(CustomerCredential.id)
+        second.ciphertext, second.nonce = first.ciphertext, first.nonce
+        second.wrapped_key, second.key_nonce = first.wrapped_key, first.key_nonce
+        db.commit()
+
+        with pytest.raises(InvalidTag):
+            store.get_customer_secret("user_2_key")
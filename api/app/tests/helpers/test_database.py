@@ -0,0 +1,140 @@
+from unittest.mock import Mock
+
+import pytest
+from sqlalchemy import create_engine, event, exc
+
+from app.helpers.database import (
+    InstrumentedAsyncQueuePool,
+    InstrumentedQueuePool,
+    async_database_url,
+    create_async_db_engine,
+    create_db_engine,
+)
+
+
+def db_config(**overrides):
+    values = {
+        "DatabasePoolSize": 4,
+        "DatabaseMaxOverflow": 2,
+        "DatabasePoolTimeout": 5.0,
+        "DatabasePoolPrePing": True,
+        "DatabasePoolRecycle": 600,
+        "DatabaseStatementTimeout": 15000,
+        "DatabaseEcho": False,
+        "DatabasePgBouncer": False,
+    }
+    values.update(overrides)
+    return Mock(**values)
+
+
+class Connecting(Exception):
+    pass
+
+
+def connect_params(engine):
+    """The keyword arguments the engine passes to the driver's connect()."""
+    captured = {}
+
+    @event.listens_for(engine, "do_connect")
+    def capture(dialect, conn_rec, cargs, cparams):
+        captured.update(cparams)
+        raise Connecting()
+
+    with pytest.raises(Connecting):
+        engine.connect()
+    return captured
+
+
+class TestInstrumentedQueuePool:
+    def test_records_checkouts_and_timeouts(self):
+        """
+        GIVEN a pool of one connection with no overflow
+        WHEN the connection is checked out and a second checkout is attempted
+        THEN the second checkout times out and both are counted
+        AND utilisation reports the pool as full
+        """
+        engine = create_engine(
+            "sqlite://",
+            poolclass=InstrumentedQueuePool,
+            pool_size=1,
+            max_overflow=0,
+            pool_timeout=0.01,
+        )
+
+        with engine.connect():
+            with pytest.raises(exc.TimeoutError):
+                engine.connect()
+            stats = engine.pool.stats()
+
+        assert stats["checkouts"] == 2
+        assert stats["timeouts"] == 1
+        assert stats["utilisation"] == 1.0
+        assert stats["max_wait_ms"] >= 10
+
+
+class TestCreateDbEngine:
+    def test_applies_pool_settings_and_statement_timeout(self):
+        engine = create_db_engine("postgresql://user:pw@db/app", db_config())
+
+        assert isinstance(engine.pool, InstrumentedQueuePool)
+        assert engine.pool.size() == 4
+        assert engine.pool.capacity == 6
+        assert engine.pool._pre_ping is True
+        assert engine.pool._recycle == 600
+        assert engine.echo is False
+        assert connect_params(engine)["options"] == "-c statement_timeout=15000"
+
+    def test_pgbouncer_mode_sets_timeout_per_transaction(self):
+        """
+        GIVEN PgBouncer mode
+        WHEN the engine is built
+        THEN no startup options are sent, since PgBouncer would reject them
+        AND the statement timeout is set when each transaction begins
+        """
+        engine = create_db_engine(
+            "postgresql://user:pw@db/app", db_config(DatabasePgBouncer=True)
+        )
+
+        assert "options" not in connect_params(engine)
+        assert engine.dispatch.begin
+
+
+class TestCreateAsyncDbEngine:
+    def test_uses_asyncio_drivers(self):
+        assert (
+            async_database_url("postgresql://user:pw@db/app")
+            == "postgresql+asyncpg://user:pw@db/app"
+        )
+        assert (
+            async_database_url("postgresql+psycopg2://user:pw@db/app")
+            == "postgresql+asyncpg://user:pw@db/app"
+        )
+        assert (
+            async_database_url("sqlite:///./test.db") == "sqlite+aiosqlite:///./test.db"
+        )
+
+    def test_applies_pool_settings_and_statement_timeout(self):
+        engine = create_async_db_engine("postgresql://user:pw@db/app", db_config())
+
+        assert engine.url.drivername == "postgresql+asyncpg"
+        assert isinstance(engine.pool, InstrumentedAsyncQueuePool)
+        assert engine.pool.size() == 4
+        assert engine.pool.capacity == 6
+        assert engine.pool._pre_ping is True
+        _, params = engine.dialect.create_connect_args(engine.url)
+        assert "prepared_statement_cache_size" not in params
+        assert not engine.sync_engine.dispatch.begin
+
+    def test_pgbouncer_mode_disables_statement_caches(self):
+        """
+        GIVEN PgBouncer mode
+        WHEN the async engine is built
+        THEN asyncpg's prepared statement caches are turned off
+        AND the statement timeout is set when each transaction begins
+        """
+        engine = create_async_db_engine(
+            "postgresql://user:pw@db/app", db_config(DatabasePgBouncer=True)
+        )
+
+        assert engine.url.query["prepared_statement_cache_size"] == "0"
+        assert engine.sync_engine.dispatch.begin
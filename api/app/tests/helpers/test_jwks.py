@@ -0,0 +1,109 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.helpers.jwks import JWKSCache, ttl_from_cache_control
+
+JWKS_URI = "https://test.auth0.com/.well-known/jwks.json"
+
+
+def make_transport(calls, keys, cache_control="public, max-age=600"):
+    async def handler(request):
+        calls.append(request.url)
+        await asyncio.sleep(0)
+        return httpx.Response(
+            200,
+            json={"keys": [{"kid": kid, "kty": "RSA"} for kid in keys]},
+            headers={"cache-control": cache_control},
+        )
+
+    return httpx.MockTransport(handler)
+
+
+class TestJWKSCache:
+    def test_ttl_from_cache_control(self):
+        assert ttl_from_cache_control("public, max-age=86400", 3600) == 86400
+        assert ttl_from_cache_control(None, 3600) == 3600
+        assert ttl_from_cache_control("max-age=1", 3600) == 60
+
+    @pytest.mark.asyncio
+    async def test_get_serves_from_cache(self):
+        """
+        GIVEN an empty JWKS cache
+        WHEN the JWKS is requested twice
+        THEN Auth0 should be called once and the second call counted as a hit
+        """
+        calls: list = []
+        cache = JWKSCache(transport=make_transport(calls, ["a"]))
+
+        await cache.get(JWKS_URI)
+        jwks = await cache.get(JWKS_URI)
+
+        assert jwks["keys"][0]["kid"] == "a"
+        assert len(calls) == 1
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_share_one_fetch(self):
+        """
+        GIVEN an empty JWKS cache
+        WHEN a burst of requests miss the cache at once
+        THEN only one fetch should go out
+        """
+        calls: list = []
+        cache = JWKSCache(transport=make_transport(calls, ["a"]))
+
+        await asyncio.gather(*(cache.get(JWKS_URI) for _ in range(20)))
+
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_unknown_kid_refreshes_once(self):
+        """
+        GIVEN a cached JWKS that does not contain the token's kid
+        WHEN several requests ask for that kid
+        THEN the JWKS should be refreshed exactly once
+        """
+        calls: list = []
+        cache = JWKSCache(
+            transport=make_transport(calls, ["a"]), min_forced_refresh_interval=30
+        )
+        await cache.get(JWKS_URI)
+        cache._fetched_at -= 60
+
+        results = await asyncio.gather(
+            *(cache.get_key(JWKS_URI, "rotated") for _ in range(5))
+        )
+
+        assert results == [None] * 5
+        assert len(calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_failed_refresh_backs_off_with_cached_keys(self):
+        """
+        GIVEN a cached JWKS that has expired and an Auth0 outage
+        WHEN several requests need the JWKS one after another
+        THEN one refresh is attempted and the cached keys are served
+        AND the next attempt waits for the backoff
+        """
+        calls: list = []
+        responses = [httpx.Response(200, json={"keys": [{"kid": "a"}]})]
+
+        async def handler(request):
+            calls.append(request.url)
+            if responses:
+                return responses.pop()
+            raise httpx.ConnectTimeout("Auth0 unavailable")
+
+        cache = JWKSCache(transport=httpx.MockTransport(handler), failure_backoff=30)
+        await cache.get(JWKS_URI)
+        cache._expires_at = 0.0
+
+        results = [await cache.get(JWKS_URI) for _ in range(3)]
+
+        assert [jwks["keys"][0]["kid"] for jwks in results] == ["a"] * 3
+        assert len(calls) == 2
+        assert cache.stats()["fetch_errors"] == 1
+        assert 0 < cache.expires_in() <= 30
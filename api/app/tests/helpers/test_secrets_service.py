@@ -0,0 +1,213 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+import pytest
+from infisicalapi_client.exceptions import NotFoundException
+
+from app.helpers.secrets_cache import SecretCache
+from app.helpers.secrets_service import SecretsService, SecretSnapshot
+
+
+@pytest.fixture
+def secrets_service():
+    service = object.__new__(SecretsService)
+    service._client = MagicMock()
+    service._project_id = "project"
+    service._env = "dev"
+    service._cache = SecretCache(ttl=300, negative_ttl=30, max_stale=3600)
+    service._executor = ThreadPoolExecutor(max_workers=2)
+    yield service
+    service._executor.shutdown()
+
+
+def secret_response(value):
+    response = MagicMock()
+    response.to_dict.return_value = {"secret": {"secretValue": value}}
+    return response
+
+
+class TestSecretsServiceCache:
+    def test_get_secret_is_cached(self, secrets_service):
+        """
+        GIVEN a secret stored in Infisical
+        WHEN it is read twice
+        THEN Infisical should only be called once
+        """
+        get_by_name = secrets_service._client.secrets.get_secret_by_name
+        get_by_name.return_value = secret_response("value")
+
+        assert secrets_service.get_secret("APP_SECRET_KEY") == "value"
+        assert secrets_service.get_secret("APP_SECRET_KEY") == "value"
+
+        get_by_name.assert_called_once()
+        stats = secrets_service.cache_stats()
+        assert stats["hits"] == 1
+        assert stats["fetches"] == 1
+
+    def test_misses_are_negatively_cached(self, secrets_service):
+        """
+        GIVEN a secret that does not exist
+        WHEN it is read twice
+        THEN the default is returned and the miss is not looked up again
+        """
+        get_by_name = secrets_service._client.secrets.get_secret_by_name
+        get_by_name.side_effect = NotFoundException()
+
+        assert secrets_service.get_secret("MISSING", "fallback") == "fallback"
+        assert secrets_service.get_secret("MISSING", "fallback") == "fallback"
+
+        get_by_name.assert_called_once()
+        assert secrets_service.cache_stats()["negative_hits"] == 1
+
+    def test_fetch_errors_are_not_cached_as_misses(self, secrets_service):
+        """
+        GIVEN an Infisical outage
+        WHEN a secret that is not cached is read
+        THEN the default is returned without caching the secret as missing
+        AND the next read fetches it again
+        """
+        get_by_name = secrets_service._client.secrets.get_secret_by_name
+        get_by_name.side_effect = [Exception("timeout"), secret_response("value")]
+
+        assert secrets_service.get_secret("AUTH0_DOMAIN", "fallback") == "fallback"
+        assert secrets_service.get_secret("AUTH0_DOMAIN", "fallback") == "value"
+        assert get_by_name.call_count == 2
+
+    def test_create_customer_secret_invalidates_entry(self, secrets_service):
+        """
+        GIVEN a cached customer secret
+        WHEN the secret is written again
+        THEN the next read should go back to Infisical
+        """
+        get_by_name = secrets_service._client.secrets.get_secret_by_name
+        get_by_name.side_effect = [secret_response("old"), secret_response("new")]
+
+        assert secrets_service.get_customer_secret("user_1_key") == "old"
+        secrets_service.create_customer_secret("user_1_key", "new", "datadog")
+
+        assert secrets_service.get_customer_secret("user_1_key") == "new"
+
+    @pytest.mark.asyncio
+    async def test_aget_customer_secret_shares_cache(self, secrets_service):
+        """
+        GIVEN a customer secret fetched through the async API
+        WHEN it is read again through the sync API
+        THEN the second read should be served from the cache
+        """
+        get_by_name = secrets_service._client.secrets.get_secret_by_name
+        get_by_name.return_value = secret_response('{"key": "value"}')
+
+        assert await secrets_service.aget_customer_secret("user_1_key") == {
+            "key": "value"
+        }
+        assert secrets_service.get_customer_secret("user_1_key") == {"key": "value"}
+
+        get_by_name.assert_called_once()
+
+
+def expire(service, key):
+    service._cache.peek(key).expires_at -= 301
+
+
+class TestSecretsServiceRefresh:
+    def test_stale_value_served_while_refreshing(self, secrets_service):
+        """
+        GIVEN a cached secret whose TTL has passed
+        WHEN it is read
+        THEN the stale value is returned at once and refreshed in the background
+        """
+        get_by_name = secrets_service._client.secrets.get_secret_by_name
+        get_by_name.side_effect = [secret_response("old"), secret_response("new")]
+        secrets_service.get_secret("AUTH0_DOMAIN")
+        expire(secrets_service, ("/", "AUTH0_DOMAIN", "dev"))
+
+        assert secrets_service.get_secret("AUTH0_DOMAIN") == "old"
+        secrets_service._executor.shutdown(wait=True)
+
+        assert secrets_service.get_secret("AUTH0_DOMAIN") == "new"
+        assert secrets_service.cache_stats()["stale_hits"] == 1
+
+    def test_failed_refresh_keeps_cached_value(self, secrets_service):
+        """
+        GIVEN a cached secret and an Infisical outage
+        WHEN the secret is refreshed
+        THEN the cached value keeps being served
+        """
+        get_by_name = secrets_service._client.secrets.get_secret_by_name
+        get_by_name.side_effect = [secret_response("old"), Exception("timeout")]
+        secrets_service.get_secret("AUTH0_DOMAIN")
+        key = ("/", "AUTH0_DOMAIN", "dev")
+        expire(secrets_service, key)
+
+        secrets_service._cache.begin_refresh(key)
+        secrets_service.refresh_secret(key)
+
+        assert secrets_service.get_secret("AUTH0_DOMAIN") == "old"
+
+    @pytest.mark.asyncio
+    async def test_refresh_due_skips_idle_customer_secrets(self, secrets_service):
+        """
+        GIVEN an app secret, a recently used customer secret and an idle one
+        WHEN the refresher runs
+        THEN only the app secret and the recently used secret are refreshed
+        """
+        get_by_name = secrets_service._client.secrets.get_secret_by_name
+        get_by_name.return_value = secret_response("value")
+        secrets_service.get_secret("AUTH0_DOMAIN")
+        secrets_service.get_customer_secret("user_1_key")
+        secrets_service.get_customer_secret("user_2_key")
+        for key in [
+            ("/", "AUTH0_DOMAIN", "dev"),
+            ("/customer-secrets", "user_1_key", "dev"),
+            ("/customer-secrets", "user_2_key", "dev"),
+        ]:
+            expire(secrets_service, key)
+        secrets_service._cache.peek(
+            ("/customer-secrets", "user_2_key", "dev")
+        ).last_used -= 1000
+
+        refreshed = await secrets_service.arefresh_due(
+            refresh_ahead=60, recent_window=900
+        )
+
+        assert refreshed == 2
+        assert get_by_name.call_count == 5
+
+
+class TestCustomerSecretSnapshot:
+    def test_snapshot_lists_once_and_primes_cache(self, secrets_service):
+        """
+        GIVEN customer secrets stored under /customer-secrets
+        WHEN a snapshot is taken
+        THEN all secrets come from one list call and later reads hit the cache
+        """
+        listing = MagicMock()
+        listing.to_dict.return_value = {
+            "secrets": [
+                {"secretKey": "user_1_api_key", "secretValue": "api"},
+                {"secretKey": "user_1_app_key", "secretValue": '{"k": "v"}'},
+            ]
+        }
+        secrets_service._client.secrets.list_secrets.return_value = listing
+
+        snapshot = secrets_service.snapshot_customer_secrets()
+
+        assert len(snapshot) == 2
+        assert snapshot.get_customer_secret("user_1_api_key") == "api"
+        assert snapshot.get_customer_secret("user_1_app_key") == {"k": "v"}
+        assert secrets_service.get_customer_secret("user_1_api_key") == "api"
+        secrets_service._client.secrets.get_secret_by_name.assert_not_called()
+
+    def test_snapshot_falls_back_for_unknown_secrets(self, secrets_service):
+        """
+        GIVEN a snapshot taken before a secret was created
+        WHEN that secret is read through the snapshot
+        THEN it should be fetched through the fallback service
+        """
+        get_by_name = secrets_service._client.secrets.get_secret_by_name
+        get_by_name.return_value = secret_response("late")
+
+        snapshot = SecretSnapshot({}, fallback=secrets_service)
+
+        assert snapshot.get_customer_secret("user_2_api_key") == "late"
+        assert SecretSnapshot({}).get_customer_secret("user_2_api_key") is None
@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+
+from app.helpers.single_flight import SingleFlight
+
+
+class TestSingleFlight:
+    @pytest.mark.asyncio
+    async def test_concurrent_callers_share_one_call(self):
+        """
+        GIVEN several callers asking for the same key at once
+        WHEN the call is slow
+        THEN it runs once and every caller gets its result
+        """
+        flights = SingleFlight()
+        calls = 0
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "value"
+
+        results = await asyncio.gather(*(flights.do("key", fetch) for _ in range(5)))
+
+        assert results == ["value"] * 5
+        assert calls == 1
+        assert flights.stats() == {"calls": 5, "shared": 4, "in_flight": 0}
+
+    @pytest.mark.asyncio
+    async def test_errors_are_shared_and_not_cached(self):
+        flights = SingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0)
+            raise RuntimeError("boom")
+
+        results = await asyncio.gather(
+            flights.do("key", fail), flights.do("key", fail), return_exceptions=True
+        )
+
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert not flights.in_flight("key")
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_does_not_cancel_shared_call(self):
+        flights = SingleFlight()
+        release = asyncio.Event()
+
+        async def fetch():
+            await release.wait()
+            return "value"
+
+        leader = asyncio.create_task(flights.do("key", fetch))
+        follower = asyncio.create_task(flights.do("key", fetch))
+        await asyncio.sleep(0)
+        leader.cancel()
+        release.set()
+
+        assert await follower == "value"
@@ -0,0 +1,62 @@
+import threading
+from unittest.mock import Mock, patch
+
+import pytest
+
+from app.services.aws_clients import CostExplorerClients
+
+
+@pytest.fixture
+def clients():
+    clients = CostExplorerClients(maxsize=2, max_workers=2)
+    with patch(
+        "app.services.aws_clients._build_client", side_effect=lambda *_: Mock()
+    ) as build:
+        clients.build = build
+        yield clients
+    clients.shutdown()
+
+
+class TestCostExplorerClients:
+    @pytest.mark.asyncio
+    async def test_reuses_client_for_same_credentials(self, clients):
+        """
+        GIVEN a client built for a configuration
+        WHEN the same configuration asks again with the same credentials
+        THEN the cached client is returned without building a new one
+        """
+        first = await clients.get(1, "AKIA", "secret")
+        second = await clients.get(1, "AKIA", "secret")
+
+        assert first is second
+        assert clients.build.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_rebuilds_when_credentials_change(self, clients):
+        first = await clients.get(1, "AKIA", "secret")
+        second = await clients.get(1, "AKIA", "rotated")
+
+        assert first is not second
+        assert await clients.get(1, "AKIA", "rotated") is second
+
+    @pytest.mark.asyncio
+    async def test_invalidate_and_eviction(self, clients):
+        """
+        GIVEN cached clients
+        WHEN a configuration is invalidated or the cache overflows
+        THEN the affected clients are rebuilt on next use
+        """
+        first = await clients.get(1, "AKIA", "secret")
+        clients.invalidate(1)
+        assert await clients.get(1, "AKIA", "secret") is not first
+
+        await clients.get(2, "AKIA", "secret")
+        await clients.get(3, "AKIA", "secret")
+        assert clients.stats()["evictions"] == 1
+        assert clients.stats()["created"] == 4
+
+    @pytest.mark.asyncio
+    async def test_run_uses_dedicated_pool(self, clients):
+        thread_name = await clients.run(lambda: threading.current_thread().name)
+
+        assert thread_name.startswith("aws-ce")
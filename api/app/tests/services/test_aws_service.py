@@ -0,0 +1,143 @@
+from datetime import date
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from app.services.aws_service import AWSService
+from app.services.call_scheduler import CallScheduler
+
+
+def ce_group(service, amount, account=None):
+    keys = [service] if account is None else [service, account]
+    return {"Keys": keys, "Metrics": {"UnblendedCost": {"Amount": str(amount)}}}
+
+
+def ce_page(groups_by_month, token=None):
+    page = {
+        "ResultsByTime": [
+            {"TimePeriod": {"Start": start}, "Groups": groups}
+            for start, groups in groups_by_month.items()
+        ]
+    }
+    if token:
+        page["NextPageToken"] = token
+    return page
+
+
+@pytest.fixture
+def ce_client():
+    return Mock()
+
+
+@pytest.fixture
+def make_service(ce_client):
+    def make(group_by_linked_account=False):
+        db = Mock()
+        db.query.return_value.filter.return_value.filter.return_value.first.return_value = Mock(
+            id=7, aws_access_key_id="access-id", aws_secret_access_key="secret-id"
+        )
+        secrets = Mock()
+        secrets.aget_customer_secret = AsyncMock(side_effect=["AKIA", "secret"])
+        clients = Mock()
+        clients.get = AsyncMock(return_value=ce_client)
+        clients.run = AsyncMock(side_effect=lambda fn, **kwargs: fn(**kwargs))
+        return AWSService(
+            1,
+            db,
+            "prod",
+            secrets=secrets,
+            clients=clients,
+            group_by_linked_account=group_by_linked_account,
+            scheduler=CallScheduler({}),
+        )
+
+    return make
+
+
+class TestAWSService:
+    @pytest.mark.asyncio
+    async def test_get_monthly_costs_follows_pages(self, make_service, ce_client):
+        """
+        GIVEN Cost Explorer spreads a month's service groups over two pages
+        WHEN monthly costs are requested
+        THEN every page is fetched and totals are summed from the groups
+        """
+        # GIVEN
+        ce_client.get_cost_and_usage.side_effect = [
+            ce_page(
+                {
+                    "2024-01-01": [ce_group("Amazon EC2", 10.004)],
+                    "2024-02-01": [ce_group("Amazon EC2", 20)],
+                },
+                token="page-2",
+            ),
+            ce_page({"2024-02-01": [ce_group("Amazon S3", 5.5)]}),
+        ]
+        service = make_service()
+
+        # WHEN
+        result = await service.get_monthly_costs("01-2024", "03-2024")
+
+        # THEN
+        assert result["data"] == [
+            {"month": "01-2024", "cost": 10.0},
+            {"month": "02-2024", "cost": 25.5},
+        ]
+        assert len(result["breakdown"]) == 3
+        first, second = ce_client.get_cost_and_usage.call_args_list
+        assert "NextPageToken" not in first.kwargs
+        assert second.kwargs["NextPageToken"] == "page-2"
+        assert first.kwargs["GroupBy"] == [{"Type": "DIMENSION", "Key": "SERVICE"}]
+
+    @pytest.mark.asyncio
+    async def test_get_monthly_costs_by_linked_account(self, make_service, ce_client):
+        ce_client.get_cost_and_usage.return_value = ce_page(
+            {"2024-01-01": [ce_group("Amazon EC2", 3, account="111122223333")]}
+        )
+        service = make_service(group_by_linked_account=True)
+
+        result = await service.get_monthly_costs("01-2024", "02-2024")
+
+        assert result["breakdown"] == [
+            {
+                "month": "01-2024",
+                "service": "Amazon EC2",
+                "linked_account": "111122223333",
+                "cost": 3.0,
+            }
+        ]
+        group_by = ce_client.get_cost_and_usage.call_args.kwargs["GroupBy"]
+        assert [g["Key"] for g in group_by] == ["SERVICE", "LINKED_ACCOUNT"]
+
+    @pytest.mark.asyncio
+    async def test_get_daily_costs(self, make_service, ce_client):
+        """
+        GIVEN Cost Explorer returns daily totals
+        WHEN daily costs are requested for June 1st to 2nd
+        THEN one DAILY request ending on June 3rd (exclusive) is made
+        AND each day's total is returned
+        """
+        ce_client.get_cost_and_usage.return_value = {
+            "ResultsByTime": [
+                {
+                    "TimePeriod": {"Start": day},
+                    "Total": {"UnblendedCost": {"Amount": amount}},
+                }
+                for day, amount in (("2024-06-01", "1.5"), ("2024-06-02", "2.25"))
+            ]
+        }
+
+        result = await make_service().get_daily_costs(
+            date(2024, 6, 1), date(2024, 6, 2)
+        )
+
+        assert result == {
+            "data": [
+                {"day": date(2024, 6, 1), "cost": 1.5},
+                {"day": date(2024, 6, 2), "cost": 2.25},
+            ]
+        }
+        request = ce_client.get_cost_and_usage.call_args.kwargs
+        assert request["Granularity"] == "DAILY"
+        assert request["TimePeriod"] == {"Start": "2024-06-01", "End": "2024-06-03"}
+        assert "GroupBy" not in request
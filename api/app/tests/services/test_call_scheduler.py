@@ -0,0 +1,118 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from app.services.call_scheduler import BATCH, INTERACTIVE, CallScheduler, RateLimit
+
+UNLIMITED = RateLimit(0, 1)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self._sleep = asyncio.sleep
+
+    def __call__(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        wake_at = self.now + seconds
+        await self._sleep(0)
+        self.now = max(self.now, wake_at)
+
+
+@pytest.fixture
+def clock():
+    clock = FakeClock()
+    with patch("app.services.call_scheduler.asyncio.sleep", new=clock.sleep):
+        yield clock
+
+
+class TestCallScheduler:
+    @pytest.mark.asyncio
+    async def test_paces_calls_after_burst(self, clock):
+        """
+        GIVEN a vendor limited to 10 calls per second with a burst of 2
+        WHEN four calls are made back to back
+        THEN the first two go out at once and the rest a tenth of a second apart
+        """
+        scheduler = CallScheduler(
+            {"datadog": (RateLimit(10, 2), UNLIMITED)}, clock=clock
+        )
+
+        waits = [await scheduler.acquire("datadog", "org") for _ in range(4)]
+
+        assert waits[:2] == [0, 0]
+        assert waits[2] == pytest.approx(0.1)
+        assert waits[3] == pytest.approx(0.1)
+        assert clock.now == pytest.approx(0.2)
+
+    @pytest.mark.asyncio
+    async def test_interactive_calls_go_before_batch(self, clock):
+        """
+        GIVEN an exhausted vendor bucket with batch calls already waiting
+        WHEN an interactive call arrives
+        THEN it is served before the waiting batch calls
+        """
+        scheduler = CallScheduler({"aws": (RateLimit(1, 1), UNLIMITED)}, clock=clock)
+        await scheduler.acquire("aws", "1")
+        served = []
+
+        async def call(name, priority):
+            await scheduler.acquire("aws", name, priority)
+            served.append(name)
+
+        batch = [asyncio.create_task(call(f"batch-{i}", BATCH)) for i in range(2)]
+        await asyncio.sleep(0)
+        await call("interactive", INTERACTIVE)
+        await asyncio.gather(*batch)
+
+        assert served == ["interactive", "batch-0", "batch-1"]
+        stats = scheduler.stats()["aws"]
+        assert stats["interactive"]["calls"] == 2
+        assert stats["batch"]["calls"] == 2
+        assert stats["batch"]["max_wait_ms"] >= 2000
+        assert stats["waiting"] == 0
+
+    @pytest.mark.asyncio
+    async def test_exhausted_credential_does_not_block_others(self, clock):
+        scheduler = CallScheduler(
+            {"datadog": (UNLIMITED, RateLimit(1, 1))}, clock=clock
+        )
+        await scheduler.acquire("datadog", "org-a")
+
+        waiting = asyncio.create_task(scheduler.acquire("datadog", "org-a"))
+        await asyncio.sleep(0)
+        other = await scheduler.acquire("datadog", "org-b")
+
+        assert other == 0
+        assert await waiting == pytest.approx(1.0)
+
+    @pytest.mark.asyncio
+    async def test_unknown_vendor_is_not_limited(self):
+        scheduler = CallScheduler({})
+
+        assert await scheduler.acquire("gcp", "project") == 0
+
+    @pytest.mark.asyncio
+    async def test_refilled_credential_buckets_are_evicted(self, clock):
+        """
+        GIVEN calls from many credentials, one of which is still rate limited
+        WHEN a call is made after the sweep interval
+        THEN only the buckets that have not refilled are kept
+        """
+        scheduler = CallScheduler(
+            {"aws": (UNLIMITED, RateLimit(0.01, 1))}, clock=clock, sweep_interval=60
+        )
+        for account in range(100):
+            await scheduler.acquire("aws", str(account))
+        assert scheduler.stats()["aws"]["credentials"] == 100
+
+        clock.now = 30.0
+        await scheduler.acquire("aws", "busy")
+        clock.now = 100.0
+        await scheduler.acquire("aws", "0")
+
+        assert scheduler.stats()["aws"]["credentials"] == 2
+        assert await scheduler.acquire("aws", "busy") == pytest.approx(30.0)
@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.models import (
+    AWSAPIConfiguration,
+    Base,
+    DatadogAPIConfiguration,
+    User,
+    VendorSyncState,
+)
+from app.services.config_enumeration import WorkItem, iter_vendor_configs
+
+
+@pytest.fixture
+def db():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    session.add_all([User(id=1, sub="one"), User(id=2, sub="two")])
+    session.add_all(
+        [
+            AWSAPIConfiguration(user_id=1, identifier="prod"),
+            DatadogAPIConfiguration(user_id=1, identifier="main"),
+            DatadogAPIConfiguration(user_id=2, identifier="main"),
+            VendorSyncState(
+                user_id=1,
+                vendor="aws",
+                identifier="prod",
+                last_synced_at=datetime.utcnow(),
+            ),
+            VendorSyncState(
+                user_id=2,
+                vendor="datadog",
+                identifier="main",
+                last_synced_at=datetime.utcnow() - timedelta(days=3),
+            ),
+        ]
+    )
+    session.commit()
+    yield session
+    session.close()
+
+
+class TestIterVendorConfigs:
+    def test_enumerates_all_configs(self, db):
+        """
+        GIVEN AWS and Datadog configurations for several users
+        WHEN configurations are enumerated
+        THEN every (user, vendor, identifier) is returned once, in order
+        """
+        assert list(iter_vendor_configs(db, batch_size=1)) == [
+            WorkItem(1, "aws", "prod"),
+            WorkItem(1, "datadog", "main"),
+            WorkItem(2, "datadog", "main"),
+        ]
+
+    def test_filters_by_vendor(self, db):
+        assert list(iter_vendor_configs(db, vendors=["AWS"])) == [
+            WorkItem(1, "aws", "prod")
+        ]
+
+    def test_filters_by_last_sync(self, db):
+        """
+        GIVEN one series synced now, one synced days ago and one never synced
+        WHEN enumerating series last synced more than a day ago
+        THEN only the stale and never-synced series are returned
+        """
+        items = iter_vendor_configs(
+            db, synced_before=datetime.utcnow() - timedelta(days=1)
+        )
+
+        assert list(items) == [
+            WorkItem(1, "datadog", "main"),
+            WorkItem(2, "datadog", "main"),
+        ]
+
+    def test_rejects_unknown_vendor(self, db):
+        with pytest.raises(ValueError, match="Unsupported vendor: gcp"):
+            list(iter_vendor_configs(db, vendors=["gcp"]))
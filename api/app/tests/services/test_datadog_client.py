@@ -0,0 +1,232 @@
+from unittest.mock import AsyncMock, Mock, patch
+
+import httpx
+import pytest
+
+from app.services.call_scheduler import CallScheduler
+from app.services.datadog_client import DatadogClient
+from app.services.datadog_service import DatadogService
+
+HEADERS = {"DD-API-KEY": "api-key", "DD-APPLICATION-KEY": "app-key"}
+
+
+def make_client(responses, **kwargs):
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    client = DatadogClient(
+        transport=httpx.MockTransport(handler), scheduler=CallScheduler({}), **kwargs
+    )
+    return client, requests
+
+
+@pytest.fixture
+def sleep():
+    with patch("app.services.datadog_client.asyncio.sleep", new=AsyncMock()) as mock:
+        yield mock
+
+
+class TestDatadogClient:
+    @pytest.mark.asyncio
+    async def test_retries_server_errors(self, sleep):
+        """
+        GIVEN Datadog returns a 503 and then a 200
+        WHEN a request is made
+        THEN it is retried after a bounded backoff and the 200 is returned
+        """
+        client, requests = make_client(
+            [httpx.Response(503), httpx.Response(200, json={"data": []})],
+            backoff_base=1.0,
+        )
+
+        response = await client.get("/api/v2/usage/historical_cost", HEADERS)
+
+        assert response.status_code == 200
+        assert len(requests) == 2
+        assert 0 <= sleep.await_args.args[0] <= 1.0
+        assert client.stats()["retries"] == 1
+
+    @pytest.mark.asyncio
+    async def test_waits_for_rate_limit_reset_on_429(self, sleep):
+        client, requests = make_client(
+            [
+                httpx.Response(429, headers={"X-RateLimit-Reset": "7"}),
+                httpx.Response(200, json={}),
+            ]
+        )
+
+        response = await client.get("/path", HEADERS)
+
+        assert response.status_code == 200
+        assert 7 <= sleep.await_args.args[0] <= 8
+        assert client.stats()["rate_limited"] == 1
+
+    @pytest.mark.asyncio
+    async def test_exhausted_rate_limit_delays_next_request(self, sleep):
+        """
+        GIVEN a response reporting no requests left in the rate limit window
+        WHEN the same API key makes another request
+        THEN it waits for the window to reset before sending it
+        """
+        exhausted = {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "5"}
+        client, requests = make_client(
+            [httpx.Response(200, headers=exhausted), httpx.Response(200)]
+        )
+
+        await client.get("/path", HEADERS)
+        sleep.assert_not_awaited()
+        await client.get("/path", HEADERS)
+
+        assert 4 < sleep.await_args.args[0] <= 5
+        assert len(requests) == 2
+
+    @pytest.mark.asyncio
+    async def test_gives_up_after_max_retries(self, sleep):
+        client, requests = make_client(
+            [httpx.Response(500) for _ in range(3)], max_retries=2
+        )
+
+        response = await client.get("/path", HEADERS)
+
+        assert response.status_code == 500
+        assert len(requests) == 3
+        assert client.stats()["errors"] == 1
+
+    @pytest.mark.asyncio
+    async def test_raises_transport_errors_after_retries(self, sleep):
+        client, requests = make_client(
+            [httpx.ConnectTimeout("timed out") for _ in range(2)], max_retries=1
+        )
+
+        with pytest.raises(httpx.ConnectTimeout):
+            await client.get("/path", HEADERS)
+        assert len(requests) == 2
+
+
+class TestDatadogService:
+    @pytest.mark.asyncio
+    async def test_get_monthly_costs_uses_shared_client(self):
+        """
+        GIVEN a Datadog configuration and a pooled client
+        WHEN monthly costs are requested
+        THEN the historical cost endpoint is called with the customer's keys
+        AND per-product charges are returned alongside the totals
+        """
+        # GIVEN
+        db = Mock()
+        db.query.return_value.filter.return_value.filter.return_value.first.return_value = Mock(
+            app_key="app-secret-id", api_key="api-secret-id"
+        )
+        secrets = Mock()
+        secrets.aget_customer_secret = AsyncMock(side_effect=["app-key", "api-key"])
+        client, requests = make_client(
+            [
+                httpx.Response(
+                    200,
+                    json={
+                        "data": [
+                            {
+                                "attributes": {
+                                    "date": "2024-01-01T00:00:00Z",
+                                    "total_cost": "123.456",
+                                    "charges": [
+                                        {
+                                            "product_name": "infra_hosts",
+                                            "charge_type": "total",
+                                            "cost": 100.0,
+                                        },
+                                        {
+                                            "product_name": "logs",
+                                            "charge_type": "total",
+                                            "cost": 23.456,
+                                        },
+                                    ],
+                                }
+                            }
+                        ]
+                    },
+                )
+            ]
+        )
+        service = DatadogService(1, db, "main", secrets=secrets, client=client)
+
+        # WHEN
+        result = await service.get_monthly_costs("01-2024", "02-2024")
+
+        # THEN
+        assert result["data"] == [{"month": "01-2024", "cost": 123.46}]
+        assert result["breakdown"] == [
+            {
+                "month": "01-2024",
+                "product_name": "infra_hosts",
+                "charge_type": "total",
+                "cost": 100.0,
+            },
+            {
+                "month": "01-2024",
+                "product_name": "logs",
+                "charge_type": "total",
+                "cost": 23.456,
+            },
+        ]
+        assert requests[0].url.path == "/api/v2/usage/historical_cost"
+        assert requests[0].url.params["start_month"] == "2024-01"
+        assert requests[0].headers["DD-API-KEY"] == "api-key"
+        await client.aclose()
+
+    @pytest.mark.asyncio
+    async def test_get_monthly_costs_sums_orgs(self):
+        """
+        GIVEN a parent organisation with two child orgs billed in the same month
+        WHEN monthly costs are requested
+        THEN one total is returned for the month, summed across the orgs
+        AND it matches the sum of the breakdown
+        """
+        # GIVEN
+        db = Mock()
+        db.query.return_value.filter.return_value.filter.return_value.first.return_value = Mock(
+            app_key="app-secret-id", api_key="api-secret-id"
+        )
+        secrets = Mock()
+        secrets.aget_customer_secret = AsyncMock(side_effect=["app-key", "api-key"])
+        client, _ = make_client(
+            [
+                httpx.Response(
+                    200,
+                    json={
+                        "data": [
+                            {
+                                "attributes": {
+                                    "date": "2024-01-01T00:00:00Z",
+                                    "org_name": org,
+                                    "total_cost": cost,
+                                    "charges": [
+                                        {
+                                            "product_name": "logs",
+                                            "charge_type": "total",
+                                            "cost": cost,
+                                        }
+                                    ],
+                                }
+                            }
+                            for org, cost in (("a", 10.0), ("b", 5.5))
+                        ]
+                    },
+                )
+            ]
+        )
+        service = DatadogService(1, db, "main", secrets=secrets, client=client)
+
+        # WHEN
+        result = await service.get_monthly_costs("01-2024", "01-2024")
+
+        # THEN
+        assert result["data"] == [{"month": "01-2024", "cost": 15.5}]
+        assert sum(row["cost"] for row in result["breakdown"]) == 15.5
+        await client.aclose()
@@ -0,0 +1,298 @@
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from sqlalchemy import create_engine, select, update
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.models import (
+    AWSAPIConfiguration,
+    Base,
+    DatadogAPIConfiguration,
+    RefreshJob,
+    User,
+)
+from app.services.refresh_queue import (
+    RefreshWorker,
+    claim_jobs,
+    complete_job,
+    enqueue_refresh_run,
+    get_run_status,
+)
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    session = factory()
+    session.add_all([User(id=1, sub="one"), User(id=2, sub="two")])
+    session.add_all(
+        [
+            AWSAPIConfiguration(user_id=1, identifier="prod"),
+            DatadogAPIConfiguration(user_id=2, identifier="main"),
+        ]
+    )
+    session.commit()
+    session.close()
+    return factory
+
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory()
+    yield session
+    session.close()
+
+
+class TestRefreshQueue:
+    def test_enqueue_creates_pending_jobs_under_run_id(self, db):
+        """
+        GIVEN two vendor configurations
+        WHEN a refresh run is enqueued
+        THEN one pending job per configuration is stored under the run id
+        """
+        run = enqueue_refresh_run(db, max_attempts=2)
+
+        jobs = db.scalars(select(RefreshJob).order_by(RefreshJob.id)).all()
+        assert (run["enqueued"], run["skipped"]) == (2, 0)
+        assert [(j.user_id, j.vendor, j.identifier) for j in jobs] == [
+            (1, "aws", "prod"),
+            (2, "datadog", "main"),
+        ]
+        assert {j.run_id for j in jobs} == {run["run_id"]}
+        assert {(j.status, j.attempts, j.max_attempts) for j in jobs} == {
+            ("pending", 0, 2)
+        }
+
+    def test_enqueue_streams_configurations_in_batches(self, db):
+        """
+        GIVEN more configurations than fit in one insert batch
+        WHEN a refresh run is enqueued
+        THEN every configuration is queued across several inserts
+        """
+        for user_id in range(3, 8):
+            db.add(User(id=user_id, sub=f"user-{user_id}"))
+            db.add(AWSAPIConfiguration(user_id=user_id, identifier="prod"))
+        db.commit()
+
+        with patch("app.services.refresh_queue.ENQUEUE_BATCH_SIZE", 2):
+            run = enqueue_refresh_run(db)
+
+        assert (run["enqueued"], run["skipped"]) == (7, 0)
+        assert len(db.scalars(select(RefreshJob)).all()) == 7
+
+    def test_overlapping_run_skips_active_series(self, db):
+        """
+        GIVEN a run whose AWS job is running and Datadog job has succeeded
+        WHEN another batch run is enqueued
+        THEN only the Datadog series is queued again
+        """
+        enqueue_refresh_run(db)
+        aws, datadog = claim_jobs(db, limit=2)
+        complete_job(db, datadog, datetime.utcnow())
+
+        run = enqueue_refresh_run(db)
+
+        assert (run["enqueued"], run["skipped"]) == (1, 1)
+        queued = db.scalars(
+            select(RefreshJob.vendor).where(RefreshJob.run_id == run["run_id"])
+        ).all()
+        assert queued == ["datadog"]
+
+    def test_shards_split_jobs_disjointly(self, db):
+        for user_id in range(3, 23):
+            db.add(User(id=user_id, sub=f"user-{user_id}"))
+            db.add(AWSAPIConfiguration(user_id=user_id, identifier="prod"))
+        db.commit()
+        run = enqueue_refresh_run(db)
+
+        claimed = [
+            {job.id for job in claim_jobs(db, limit=100, shard_index=i, shard_count=3)}
+            for i in range(3)
+        ]
+
+        assert all(claimed)
+        assert sum(len(ids) for ids in claimed) == run["enqueued"] == 22
+        assert len(set().union(*claimed)) == 22
+
+    def test_claimed_jobs_are_not_claimed_again(self, db):
+        enqueue_refresh_run(db)
+
+        first = claim_jobs(db, limit=1)
+        second = claim_jobs(db, limit=5)
+
+        assert [job.vendor for job in first] == ["aws"]
+        assert first[0].attempts == 1
+        assert [job.vendor for job in second] == ["datadog"]
+        assert claim_jobs(db) == []
+
+    def test_expired_lease_is_reclaimed(self, db):
+        enqueue_refresh_run(db)
+        claim_jobs(db, limit=2)
+        db.execute(
+            update(RefreshJob)
+            .where(RefreshJob.vendor == "aws")
+            .values(started_at=datetime.utcnow() - timedelta(hours=1))
+        )
+        db.commit()
+
+        reclaimed = claim_jobs(db, limit=2)
+
+        assert [(job.vendor, job.attempts) for job in reclaimed] == [("aws", 2)]
+
+    def test_completion_after_lost_lease_is_ignored(self, db):
+        """
+        GIVEN a job whose lease expired and was claimed by a second worker
+        WHEN the first worker finishes it
+        THEN the second worker's claim is left alone
+        AND only the second worker's outcome is recorded
+        """
+        enqueue_refresh_run(db, vendors=["aws"])
+        stale = claim_jobs(db)[0]
+        db.execute(
+            update(RefreshJob).values(started_at=datetime.utcnow() - timedelta(hours=1))
+        )
+        db.commit()
+        current = claim_jobs(db)[0]
+
+        assert complete_job(db, stale, datetime.utcnow(), "timed out") == "lost"
+        stored = db.scalars(select(RefreshJob)).one()
+        assert (stored.status, stored.attempts) == ("running", 2)
+        assert stored.last_error is None
+
+        assert complete_job(db, current, datetime.utcnow()) == "succeeded"
+
+    def test_failed_job_is_retried_until_attempts_run_out(self, db):
+        """
+        GIVEN a job allowed two attempts
+        WHEN both attempts fail
+        THEN it is first put back with a backoff and then marked failed
+        """
+        enqueue_refresh_run(db, vendors=["aws"], max_attempts=2)
+
+        job = claim_jobs(db)[0]
+        assert complete_job(db, job, datetime.utcnow(), "boom") == "pending"
+        assert claim_jobs(db) == []  # backing off
+
+        db.execute(update(RefreshJob).values(run_after=datetime.utcnow()))
+        db.commit()
+        job = claim_jobs(db)[0]
+        assert complete_job(db, job, datetime.utcnow(), "boom again") == "failed"
+
+        stored = db.scalars(select(RefreshJob)).one()
+        assert (stored.status, stored.attempts) == ("failed", 2)
+        assert stored.last_error == "boom again"
+        assert stored.duration_ms is not None
+
+    def test_run_status_counts_jobs(self, db):
+        run = enqueue_refresh_run(db, max_attempts=1)
+        aws, datadog = claim_jobs(db, limit=2)
+        complete_job(db, aws, datetime.utcnow())
+        complete_job(db, datadog, datetime.utcnow(), "rate limited")
+
+        status = get_run_status(db, run["run_id"])
+
+        assert status["status"] == "completed"
+        assert (status["total"], status["succeeded"], status["failed"]) == (2, 1, 1)
+        assert status["pending"] == status["running"] == 0
+        assert status["errors"] == [
+            {
+                "user_id": 2,
+                "vendor": "datadog",
+                "identifier": "main",
+                "attempts": 1,
+                "last_error": "rate limited",
+            }
+        ]
+        assert get_run_status(db, "unknown") is None
+
+
+class TestRefreshWorker:
+    @pytest.mark.asyncio
+    async def test_run_once_refreshes_claimed_job(self, db, session_factory):
+        """
+        GIVEN a queued refresh run
+        WHEN a worker runs one job
+        THEN the series is refreshed through the vendor metrics service
+        AND the stored series is not read back
+        AND the job is recorded as succeeded
+        """
+        # GIVEN
+        run = enqueue_refresh_run(db, vendors=["aws"])
+        worker = RefreshWorker(session_factory=session_factory)
+
+        # WHEN
+        with patch(
+            "app.services.refresh_queue.VendorMetricsService.refresh_vendor_metrics",
+            new=AsyncMock(return_value=None),
+        ) as refresh, patch(
+            "app.services.refresh_queue.VendorMetricsService.get_stored_vendor_metrics"
+        ) as read:
+            assert await worker.run_once() == 1
+            assert await worker.run_once() == 0
+
+        # THEN
+        refresh.assert_awaited_once_with("aws", "prod")
+        read.assert_not_called()
+        assert get_run_status(db, run["run_id"])["succeeded"] == 1
+        assert worker.stats()["processed"] == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_refresh_is_requeued(self, db, session_factory):
+        enqueue_refresh_run(db, vendors=["aws"])
+        worker = RefreshWorker(session_factory=session_factory)
+
+        with patch(
+            "app.services.refresh_queue.VendorMetricsService.refresh_vendor_metrics",
+            new=AsyncMock(side_effect=Exception("AWS unavailable")),
+        ):
+            await worker.run_once()
+
+        job = db.scalars(select(RefreshJob)).one()
+        assert (job.status, job.attempts) == ("pending", 1)
+        assert job.last_error == "AWS unavailable"
+        assert worker.stats()["failed"] == 1
+
+    @pytest.mark.asyncio
+    async def test_claimed_batch_shares_one_secrets_snapshot(self, db, session_factory):
+        """
+        GIVEN two queued jobs
+        WHEN a worker runs a claimed batch
+        THEN customer secrets are fetched once and passed to both refreshes
+        AND each job runs on its own session
+        """
+        # GIVEN
+        enqueue_refresh_run(db)
+        worker = RefreshWorker(session_factory=session_factory)
+        snapshot = object()
+        services = []
+
+        async def refresh(service, vendor, identifier):
+            services.append(service)
+
+        # WHEN
+        with patch(
+            "app.services.refresh_queue._prefetch_customer_secrets",
+            return_value=snapshot,
+        ) as prefetch, patch(
+            "app.services.refresh_queue.VendorMetricsService.refresh_vendor_metrics",
+            new=refresh,
+        ):
+            assert await worker.run_once() == 2
+
+        # THEN
+        prefetch.assert_called_once()
+        assert [service.secrets for service in services] == [snapshot, snapshot]
+        assert services[0].db is not services[1].db
+        assert worker.stats()["processed"] == 2
+
+    def test_rejects_invalid_shard(self):
+        with pytest.raises(ValueError, match="shard 2 of 2"):
+            RefreshWorker(shard_index=2, shard_count=2)
@@ -0,0 +1,77 @@
+from datetime import date, datetime, timedelta
+
+from app.models import VendorSyncState
+from app.services.sync_state import plan_daily_refresh, plan_refresh
+
+NOW = datetime(2024, 6, 15, 12, 0)
+
+
+def state(covered_from, covered_to, last_synced_at=NOW - timedelta(hours=1)):
+    return VendorSyncState(
+        covered_from=covered_from,
+        covered_to=covered_to,
+        last_synced_at=last_synced_at,
+    )
+
+
+class TestPlanRefresh:
+    def test_first_sync_fetches_whole_window(self):
+        assert plan_refresh(None, NOW) == (date(2023, 6, 1), date(2024, 6, 1))
+
+    def test_fresh_series_is_skipped(self):
+        """
+        GIVEN a series covering the whole window, synced an hour ago
+        WHEN a refresh is planned
+        THEN nothing is fetched
+        """
+        assert plan_refresh(state(date(2023, 6, 1), date(2024, 6, 1)), NOW) is None
+
+    def test_stale_current_month_refetches_previous_month_too(self):
+        stale = state(
+            date(2023, 6, 1), date(2024, 6, 1), last_synced_at=NOW - timedelta(days=2)
+        )
+
+        assert plan_refresh(stale, NOW) == (date(2024, 5, 1), date(2024, 6, 1))
+
+    def test_new_month_fetches_from_last_covered_month(self):
+        """
+        GIVEN a series last covered through April
+        WHEN a refresh is planned in June
+        THEN April (to settle its figures) through June is fetched
+        """
+        assert plan_refresh(state(date(2023, 6, 1), date(2024, 4, 1)), NOW) == (
+            date(2024, 4, 1),
+            date(2024, 6, 1),
+        )
+
+    def test_gap_at_window_start_is_filled(self):
+        assert plan_refresh(state(date(2023, 9, 1), date(2024, 6, 1)), NOW) == (
+            date(2023, 6, 1),
+            date(2023, 8, 1),
+        )
+
+
+def daily_state(daily_covered_from, daily_covered_to):
+    return VendorSyncState(
+        daily_covered_from=daily_covered_from, daily_covered_to=daily_covered_to
+    )
+
+
+class TestPlanDailyRefresh:
+    def test_first_daily_sync_starts_at_previous_month(self):
+        assert plan_daily_refresh(None, NOW) == (date(2024, 5, 1), date(2024, 6, 15))
+
+    def test_fetches_days_since_last_sync_with_settle_period(self):
+        """
+        GIVEN daily costs stored from May 1st through June 14th
+        WHEN a daily refresh is planned on June 15th
+        THEN only June 11th onwards is fetched
+        """
+        state = daily_state(date(2024, 5, 1), date(2024, 6, 14))
+
+        assert plan_daily_refresh(state, NOW) == (date(2024, 6, 11), date(2024, 6, 15))
+
+    def test_incomplete_coverage_is_fetched_from_the_horizon(self):
+        state = daily_state(date(2024, 5, 20), date(2024, 6, 14))
+
+        assert plan_daily_refresh(state, NOW) == (date(2024, 5, 1), date(2024, 6, 15))
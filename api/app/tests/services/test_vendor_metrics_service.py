@@ -1,7 +1,26 @@
+import asyncio
+from datetime import date, datetime, timedelta
+
 import pytest
 from unittest.mock import Mock, patch, AsyncMock
-from app.services.vendor_metrics_service import VendorMetricsService
-from app.models import VendorMetrics, User, AWSAPIConfiguration, DatadogAPIConfiguration
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool, StaticPool
+from app.helpers.database import async_database_url
+from app.services.call_scheduler import INTERACTIVE
+from app.services.vendor_metrics_service import (
+    VendorMetricsService,
+    refresh_vendor_metrics_in_background,
+)
+from app.models import (
+    AWSCostBreakdown,
+    Base,
+    User,
+    VendorDailyCost,
+    VendorMetrics,
+    VendorSyncState,
+)
 
 
 @pytest.fixture
@@ -9,36 +28,60 @@ def mock_db():
     db = Mock()
     # Setup query.all() to return an empty list by default
     db.query.return_value.all.return_value = []
+    db.query.return_value.filter.return_value.order_by.return_value.all.return_value = (
+        []
+    )
+    db.execute.return_value.scalars.return_value = []
+    db.execute.return_value.__iter__ = Mock(side_effect=lambda: iter([]))
+    db.scalars.return_value.first.return_value = None  # No sync state yet
     return db
 
 
 @pytest.fixture
-def mock_user():
-    user = Mock(spec=User)
-    user.id = 1
-    return user
+def sqlite_db():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    session.add(User(id=1, sub="user"))
+    session.commit()
+    yield session
+    session.close()
 
 
 @pytest.fixture
-def mock_aws_config():
-    config = Mock(spec=AWSAPIConfiguration)
-    config.identifier = "test-aws"
-    return config
+def file_dbs(tmp_path):
+    """A sync and an async session on the same database file."""
+    url = f"sqlite:///{tmp_path / 'metrics.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    session.add(User(id=1, sub="user"))
+    session.commit()
+    async_engine = create_async_engine(async_database_url(url), poolclass=NullPool)
+    yield session, AsyncSession(async_engine, expire_on_commit=False)
+    session.close()
 
 
 @pytest.fixture
-def mock_datadog_config():
-    config = Mock(spec=DatadogAPIConfiguration)
-    config.identifier = "test-datadog"
-    return config
+def mock_user():
+    user = Mock(spec=User)
+    user.id = 1
+    return user
 
 
 @pytest.fixture
-def mock_costs_response():
+def recent_costs_response():
+    # Older months are filtered out of get_and_store_vendor_metrics results
+    this_month = datetime.now().replace(day=1)
+    last_month = (this_month - timedelta(days=1)).replace(day=1)
     return {
         "data": [
-            {"month": "01-2024", "cost": 100.0},
-            {"month": "02-2024", "cost": 200.0},
+            {"month": last_month.strftime("%m-%Y"), "cost": 100.0},
+            {"month": this_month.strftime("%m-%Y"), "cost": 200.0},
         ]
     }
 
@@ -46,7 +89,7 @@ def mock_costs_response():
 class TestVendorMetricsService:
     @pytest.mark.asyncio
     async def test_get_and_store_vendor_metrics_aws_success(
-        self, mock_db, mock_user, mock_costs_response
+        self, sqlite_db, recent_costs_response
     ):
         """
         GIVEN a VendorMetricsService instance and AWS vendor
@@ -54,8 +97,7 @@ class TestVendorMetricsService:
         THEN it should fetch costs and store them in the database
         """
         # GIVEN
-        service = VendorMetricsService(mock_user.id, mock_db)
-        mock_db.query.return_value.filter.return_value.first.return_value = None
+        service = VendorMetricsService(1, sqlite_db)
 
         with patch(
             "app.services.vendor_metrics_service.AWSService",
@@ -63,7 +105,7 @@ class TestVendorMetricsService:
         ) as mock_aws_service:
             mock_aws_instance = Mock()
             mock_aws_instance.get_monthly_costs = AsyncMock(
-                return_value=mock_costs_response
+                return_value=recent_costs_response
             )
             mock_aws_service.return_value = mock_aws_instance
 
@@ -71,13 +113,12 @@ class TestVendorMetricsService:
             result = await service.get_and_store_vendor_metrics("aws", "test-config")
 
             # THEN
-            assert result == mock_costs_response
-            assert mock_db.add.call_count == 2  # Two months of data
-            mock_db.commit.assert_called_once()
+            assert result == recent_costs_response
+            assert sqlite_db.query(VendorMetrics).count() == 2  # Two months of data
 
     @pytest.mark.asyncio
     async def test_get_and_store_vendor_metrics_datadog_success(
-        self, mock_db, mock_user, mock_costs_response
+        self, sqlite_db, recent_costs_response
     ):
         """
         GIVEN a VendorMetricsService instance and Datadog vendor
@@ -85,8 +126,7 @@ class TestVendorMetricsService:
         THEN it should fetch costs and store them in the database
         """
         # GIVEN
-        service = VendorMetricsService(mock_user.id, mock_db)
-        mock_db.query.return_value.filter.return_value.first.return_value = None
+        service = VendorMetricsService(1, sqlite_db)
 
         with patch(
             "app.services.vendor_metrics_service.DatadogService",
@@ -94,7 +134,7 @@ class TestVendorMetricsService:
         ) as mock_dd_service:
             mock_dd_instance = Mock()
             mock_dd_instance.get_monthly_costs = AsyncMock(
-                return_value=mock_costs_response
+                return_value=recent_costs_response
             )
             mock_dd_service.return_value = mock_dd_instance
 
@@ -104,13 +144,12 @@ class TestVendorMetricsService:
             )
 
             # THEN
-            assert result == mock_costs_response
-            assert mock_db.add.call_count == 2  # Two months of data
-            mock_db.commit.assert_called_once()
+            assert result == recent_costs_response
+            assert sqlite_db.query(VendorMetrics).count() == 2  # Two months of data
 
     @pytest.mark.asyncio
     async def test_get_and_store_vendor_metrics_update_existing(
-        self, mock_db, mock_user, mock_costs_response
+        self, sqlite_db, recent_costs_response
     ):
         """
         GIVEN a VendorMetricsService instance and existing metrics
@@ -118,11 +157,16 @@ class TestVendorMetricsService:
         THEN it should update existing metrics instead of creating new ones
         """
         # GIVEN
-        service = VendorMetricsService(mock_user.id, mock_db)
-        existing_metric = Mock(spec=VendorMetrics)
-        mock_db.query.return_value.filter.return_value.first.return_value = (
-            existing_metric
+        service = VendorMetricsService(1, sqlite_db)
+        month = datetime.strptime(
+            recent_costs_response["data"][1]["month"], "%m-%Y"
+        ).date()
+        sqlite_db.add(
+            VendorMetrics(
+                user_id=1, vendor="aws", identifier="test-config", month=month, cost=1.0
+            )
         )
+        sqlite_db.commit()
 
         with patch(
             "app.services.vendor_metrics_service.AWSService",
@@ -130,7 +174,7 @@ class TestVendorMetricsService:
         ) as mock_aws_service:
             mock_aws_instance = Mock()
             mock_aws_instance.get_monthly_costs = AsyncMock(
-                return_value=mock_costs_response
+                return_value=recent_costs_response
             )
             mock_aws_service.return_value = mock_aws_instance
 
@@ -138,139 +182,546 @@ class TestVendorMetricsService:
             result = await service.get_and_store_vendor_metrics("aws", "test-config")
 
             # THEN
-            assert result == mock_costs_response
-            mock_db.add.assert_not_called()  # Should not add new records
-            mock_db.commit.assert_called_once()
-            assert existing_metric.cost == mock_costs_response["data"][1]["cost"]
+            assert result == recent_costs_response
+            assert sqlite_db.query(VendorMetrics).count() == 2
+            existing_metric = (
+                sqlite_db.query(VendorMetrics).filter_by(month=month).one()
+            )
+            assert existing_metric.cost == recent_costs_response["data"][1]["cost"]
 
     @pytest.mark.asyncio
-    async def test_get_and_store_vendor_metrics_invalid_vendor(
-        self, mock_db, mock_user
+    async def test_get_and_store_uses_sync_state(
+        self, sqlite_db, recent_costs_response
     ):
         """
-        GIVEN a VendorMetricsService instance
-        WHEN get_and_store_vendor_metrics is called with invalid vendor
-        THEN it should raise ValueError
+        GIVEN a series that was just synced
+        WHEN its metrics are requested again
+        THEN they are served from the database without calling the vendor
         """
         # GIVEN
-        service = VendorMetricsService(mock_user.id, mock_db)
+        service = VendorMetricsService(1, sqlite_db)
 
-        # WHEN/THEN
-        with pytest.raises(ValueError, match="Unsupported vendor: invalid"):
-            await service.get_and_store_vendor_metrics("invalid", "test-config")
+        with patch(
+            "app.services.vendor_metrics_service.AWSService",
+            autospec=True,
+        ) as mock_aws_service:
+            mock_aws_instance = Mock()
+            mock_aws_instance.get_monthly_costs = AsyncMock(
+                return_value=recent_costs_response
+            )
+            mock_aws_service.return_value = mock_aws_instance
+            await service.get_and_store_vendor_metrics("aws", "prod")
+
+            # WHEN
+            result = await service.get_and_store_vendor_metrics("aws", "prod")
+
+        # THEN
+        assert result == recent_costs_response
+        mock_aws_instance.get_monthly_costs.assert_awaited_once()
+        state = sqlite_db.query(VendorSyncState).one()
+        assert state.covered_to == datetime.utcnow().date().replace(day=1)
+        assert state.last_error is None
 
     @pytest.mark.asyncio
-    async def test_batch_update_all_vendor_metrics_success(
-        self,
-        mock_db,
-        mock_user,
-        mock_aws_config,
-        mock_datadog_config,
-        mock_costs_response,
+    async def test_get_vendor_metrics_serves_stale_data(
+        self, sqlite_db, recent_costs_response
     ):
         """
-        GIVEN a database with users and their configurations
-        WHEN batch_update_all_vendor_metrics is called
-        THEN it should update metrics for all users and configurations
+        GIVEN a series whose current month was synced two days ago
+        WHEN its metrics are read, then read with force_sync
+        THEN the first read answers from storage and flags a pending refresh
+        AND the forced read calls the vendor before answering
         """
         # GIVEN
-        mock_db.query.return_value.all.side_effect = [
-            [mock_user],  # Users query
-        ]
-        mock_db.query.return_value.filter.return_value.all.side_effect = [
-            [mock_aws_config],  # AWS configs query
-            [mock_datadog_config],  # Datadog configs query
-        ]
+        service = VendorMetricsService(1, sqlite_db)
 
         with patch(
             "app.services.vendor_metrics_service.AWSService",
             autospec=True,
-        ) as mock_aws_service, patch(
-            "app.services.vendor_metrics_service.DatadogService",
-            autospec=True,
-        ) as mock_dd_service:
+        ) as mock_aws_service:
             mock_aws_instance = Mock()
             mock_aws_instance.get_monthly_costs = AsyncMock(
-                return_value=mock_costs_response
+                return_value=recent_costs_response
             )
             mock_aws_service.return_value = mock_aws_instance
-
-            mock_dd_instance = Mock()
-            mock_dd_instance.get_monthly_costs = AsyncMock(
-                return_value=mock_costs_response
+            first = await service.get_vendor_metrics("aws", "prod")
+            sqlite_db.query(VendorSyncState).update(
+                {"last_synced_at": datetime.utcnow() - timedelta(days=2)}
             )
-            mock_dd_service.return_value = mock_dd_instance
-
-            # Reset mock for storing metrics
-            mock_db.query.return_value.filter.return_value.first.return_value = None
+            sqlite_db.commit()
 
             # WHEN
-            results = await VendorMetricsService.batch_update_all_vendor_metrics(
-                mock_db
+            stale = await service.get_vendor_metrics("aws", "prod")
+            calls_before_force = mock_aws_instance.get_monthly_costs.await_count
+            forced = await service.get_vendor_metrics("aws", "prod", force_sync=True)
+
+        # THEN
+        assert first["refresh_pending"] is False
+        assert stale["data"] == recent_costs_response["data"]
+        assert stale["refresh_pending"] is True
+        assert stale["last_synced_at"] is not None
+        assert calls_before_force == 1
+        assert forced["refresh_pending"] is False
+        assert mock_aws_instance.get_monthly_costs.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_get_vendor_metrics_reads_through_async_session(
+        self, file_dbs, recent_costs_response
+    ):
+        """
+        GIVEN a series first synced through the sync session
+        WHEN its metrics are read with an async session
+        THEN they are answered from storage without calling the vendor
+        """
+        # GIVEN
+        db, async_db = file_dbs
+        with patch(
+            "app.services.vendor_metrics_service.AWSService",
+            autospec=True,
+        ) as mock_aws_service:
+            mock_aws_instance = Mock()
+            mock_aws_instance.get_monthly_costs = AsyncMock(
+                return_value=recent_costs_response
             )
+            mock_aws_service.return_value = mock_aws_instance
+            service = VendorMetricsService(1, db, async_db=async_db)
+            first = await service.get_vendor_metrics("aws", "prod")
 
-            # THEN
-            assert len(results["success"]) == 2  # One success message for each config
-            assert len(results["failed"]) == 0
-            assert any("AWS metrics updated" in msg for msg in results["success"])
-            assert any("Datadog metrics updated" in msg for msg in results["success"])
+            # WHEN
+            second = await service.get_vendor_metrics("aws", "prod")
+            await async_db.close()
+
+        # THEN
+        assert mock_aws_instance.get_monthly_costs.await_count == 1
+        assert second["data"] == first["data"] == recent_costs_response["data"]
+        assert second["last_synced_at"] == first["last_synced_at"]
+        assert second["refresh_pending"] is False
 
     @pytest.mark.asyncio
-    async def test_batch_update_all_vendor_metrics_partial_failure(
-        self,
-        mock_db,
-        mock_user,
-        mock_aws_config,
-        mock_datadog_config,
-        mock_costs_response,
+    async def test_concurrent_refreshes_share_one_vendor_call(
+        self, sqlite_db, recent_costs_response
     ):
         """
-        GIVEN a database with users and their configurations
-        WHEN batch_update_all_vendor_metrics is called and some updates fail
-        THEN it should handle errors gracefully and continue processing
+        GIVEN several requests refreshing the same series at once
+        WHEN the vendor call is slow
+        THEN the vendor is called once and every request gets the data
         """
+
         # GIVEN
-        mock_db.query.return_value.all.side_effect = [
-            [mock_user],  # Users query
-        ]
-        mock_db.query.return_value.filter.return_value.all.side_effect = [
-            [mock_aws_config],  # AWS configs query
-            [mock_datadog_config],  # Datadog configs query
-        ]
+        async def slow_costs(*args, **kwargs):
+            await asyncio.sleep(0.01)
+            return recent_costs_response
 
         with patch(
             "app.services.vendor_metrics_service.AWSService",
             autospec=True,
-        ) as mock_aws_service, patch(
-            "app.services.vendor_metrics_service.DatadogService",
+        ) as mock_aws_service:
+            mock_aws_instance = Mock()
+            mock_aws_instance.get_monthly_costs = AsyncMock(side_effect=slow_costs)
+            mock_aws_service.return_value = mock_aws_instance
+
+            # WHEN
+            results = await asyncio.gather(
+                *(
+                    VendorMetricsService(1, sqlite_db).get_and_store_vendor_metrics(
+                        "aws", "prod"
+                    )
+                    for _ in range(3)
+                )
+            )
+
+        # THEN
+        assert results == [recent_costs_response] * 3
+        mock_aws_instance.get_monthly_costs.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_forced_refresh_does_not_join_plain_refresh(
+        self, sqlite_db, recent_costs_response
+    ):
+        """
+        GIVEN a synced series with a plain refresh in flight
+        WHEN a forced refresh of the series starts
+        THEN it calls the vendor instead of sharing the plain refresh
+        """
+        with patch(
+            "app.services.vendor_metrics_service.AWSService",
             autospec=True,
-        ) as mock_dd_service:
-            # AWS service succeeds
+        ) as mock_aws_service:
             mock_aws_instance = Mock()
             mock_aws_instance.get_monthly_costs = AsyncMock(
-                return_value=mock_costs_response
+                return_value=recent_costs_response
+            )
+            mock_aws_service.return_value = mock_aws_instance
+            service = VendorMetricsService(1, sqlite_db)
+            await service.refresh_vendor_metrics("aws", "prod")
+
+            # WHEN
+            plain, forced = await asyncio.gather(
+                service.refresh_vendor_metrics("aws", "prod"),
+                service.refresh_vendor_metrics("aws", "prod", force=True),
             )
+
+        # THEN
+        assert plain is None
+        assert forced is not None
+        assert mock_aws_instance.get_monthly_costs.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_cancelled_leader_does_not_break_shared_refresh(
+        self, sqlite_db, recent_costs_response
+    ):
+        """
+        GIVEN a request whose refresh other requests are waiting on
+        WHEN that request is cancelled and its session closed mid-refresh
+        THEN the waiting requests still get the refreshed series
+        """
+        # GIVEN
+        vendor_called = asyncio.Event()
+        release = asyncio.Event()
+
+        async def slow_costs(*args, **kwargs):
+            vendor_called.set()
+            await release.wait()
+            return recent_costs_response
+
+        leader_db = Mock(wraps=sessionmaker(bind=sqlite_db.get_bind())())
+
+        def close_leader_db():
+            # Like get_db tearing down the request: the session is gone
+            for method in ("execute", "scalars", "commit", "rollback"):
+                getattr(leader_db, method).side_effect = RuntimeError("closed")
+
+        with patch(
+            "app.services.vendor_metrics_service.AWSService",
+            autospec=True,
+        ) as mock_aws_service:
+            mock_aws_instance = Mock()
+            mock_aws_instance.get_monthly_costs = AsyncMock(side_effect=slow_costs)
             mock_aws_service.return_value = mock_aws_instance
+            leader = asyncio.create_task(
+                VendorMetricsService(1, leader_db).refresh_vendor_metrics("aws", "prod")
+            )
+            await vendor_called.wait()
+            followers = [
+                asyncio.create_task(
+                    VendorMetricsService(1, sqlite_db).refresh_vendor_metrics(
+                        "aws", "prod"
+                    )
+                )
+                for _ in range(2)
+            ]
+            await asyncio.sleep(0)
+
+            # WHEN
+            leader.cancel()
+            close_leader_db()
+            release.set()
+            results = await asyncio.gather(*followers)
+
+        # THEN
+        assert leader.cancelled()
+        assert results[0] == results[1]
+        assert results[0]["inserted"] == 2
+        mock_aws_instance.get_monthly_costs.assert_awaited_once()
+        assert sqlite_db.query(VendorMetrics).count() == 2
+
+    @pytest.mark.asyncio
+    async def test_refresh_in_background_uses_own_session(self, sqlite_db):
+        """
+        GIVEN a stale series a dashboard load asked to revalidate
+        WHEN it is refreshed in the background
+        THEN it runs on its own session at interactive priority
+        """
+        session = Mock(wraps=sqlite_db)
+        services = []
+
+        async def refresh(service, vendor, identifier):
+            services.append(service)
+
+        with patch.object(VendorMetricsService, "refresh_vendor_metrics", new=refresh):
+            await refresh_vendor_metrics_in_background(
+                1, "aws", "prod", session_factory=lambda: session
+            )
 
-            # Datadog service fails
+        assert [service.priority for service in services] == [INTERACTIVE]
+        assert services[0].db is session
+        session.close.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_get_and_store_records_sync_error(self, sqlite_db):
+        service = VendorMetricsService(1, sqlite_db)
+
+        with patch(
+            "app.services.vendor_metrics_service.DatadogService",
+            autospec=True,
+        ) as mock_dd_service:
             mock_dd_instance = Mock()
             mock_dd_instance.get_monthly_costs = AsyncMock(
                 side_effect=Exception("Datadog API error")
             )
             mock_dd_service.return_value = mock_dd_instance
 
-            # Reset mock for storing metrics
-            mock_db.query.return_value.filter.return_value.first.return_value = None
+            with pytest.raises(Exception, match="Datadog API error"):
+                await service.get_and_store_vendor_metrics("datadog", "main")
+
+        state = sqlite_db.query(VendorSyncState).one()
+        assert state.last_error == "Datadog API error"
+        assert state.last_synced_at is None
+        assert state.covered_from is None
+
+    @pytest.mark.asyncio
+    async def test_get_and_store_aws_breakdown(self, sqlite_db, recent_costs_response):
+        """
+        GIVEN AWS costs broken down by service
+        WHEN they are stored, then refreshed with a different set of services
+        THEN the breakdown rows for the fetched months are replaced
+        """
+        # GIVEN
+        service = VendorMetricsService(1, sqlite_db)
+        month = recent_costs_response["data"][1]["month"]
+
+        def breakdown(*services):
+            return [
+                {"month": month, "service": name, "linked_account": "", "cost": 1.0}
+                for name in services
+            ]
+
+        with patch(
+            "app.services.vendor_metrics_service.AWSService",
+            autospec=True,
+        ) as mock_aws_service:
+            mock_aws_instance = Mock()
+            mock_aws_instance.get_monthly_costs = AsyncMock(
+                return_value={
+                    **recent_costs_response,
+                    "breakdown": breakdown("EC2", "S3"),
+                }
+            )
+            mock_aws_service.return_value = mock_aws_instance
+
+            # WHEN
+            await service.get_and_store_vendor_metrics("aws", "prod")
+        stored = sorted(row.service for row in sqlite_db.query(AWSCostBreakdown))
+        service._store_breakdown("aws", "prod", {month}, breakdown("EC2"))
+        sqlite_db.commit()
+
+        # THEN
+        assert stored == ["EC2", "S3"]
+        rows = sqlite_db.query(AWSCostBreakdown).all()
+        assert [(row.service, row.month.strftime("%m-%Y")) for row in rows] == [
+            ("EC2", month)
+        ]
+
+    def test_store_breakdown_upserts_rows_already_stored(self, sqlite_db):
+        """
+        GIVEN breakdown rows another refresh of the series just stored
+        WHEN the same services are stored again with new costs
+        THEN the existing rows are updated in place instead of conflicting
+        """
+        # GIVEN
+        service = VendorMetricsService(1, sqlite_db)
+        rows = [
+            {"month": "01-2025", "service": name, "linked_account": "", "cost": 1.0}
+            for name in ("EC2", "S3")
+        ]
+        service._store_breakdown("aws", "prod", {"01-2025"}, rows)
+        sqlite_db.commit()
+        ids = {row.service: row.id for row in sqlite_db.query(AWSCostBreakdown)}
+
+        # WHEN
+        service._store_breakdown(
+            "aws", "prod", {"01-2025"}, [{**rows[0], "cost": 2.0}, rows[1]]
+        )
+        sqlite_db.commit()
+
+        # THEN
+        sqlite_db.expire_all()
+        stored = {row.service: row for row in sqlite_db.query(AWSCostBreakdown)}
+        assert {name: row.id for name, row in stored.items()} == ids
+        assert stored["EC2"].cost == 2.0
+        assert stored["S3"].cost == 1.0
+
+    @pytest.mark.asyncio
+    async def test_daily_ingestion_fetches_new_days_and_rolls_up(self, sqlite_db):
+        """
+        GIVEN daily ingestion mode
+        WHEN a series is synced, and refreshed again two days later
+        THEN older months are fetched monthly and the last two months daily
+        AND the refresh fetches only the days since the last sync
+        AND monthly metrics are the sums of the stored daily costs
+        """
+
+        # GIVEN
+        async def daily_costs(start_day, end_day):
+            days = (end_day - start_day).days + 1
+            return {
+                "data": [
+                    {"day": start_day + timedelta(days=i), "cost": 1.0}
+                    for i in range(days)
+                ]
+            }
+
+        today = datetime.utcnow().date()
+        this_month = today.replace(day=1)
+        last_month = (this_month - timedelta(days=1)).replace(day=1)
+        with patch.dict("os.environ", {"COST_INGESTION_MODE": "daily"}), patch(
+            "app.services.vendor_metrics_service.AWSService",
+            autospec=True,
+        ) as mock_aws_service:
+            mock_aws_instance = Mock()
+            mock_aws_instance.get_monthly_costs = AsyncMock(return_value={"data": []})
+            mock_aws_instance.get_daily_costs = AsyncMock(side_effect=daily_costs)
+            mock_aws_service.return_value = mock_aws_instance
+            service = VendorMetricsService(1, sqlite_db)
 
             # WHEN
-            results = await VendorMetricsService.batch_update_all_vendor_metrics(
-                mock_db
+            await service.refresh_vendor_metrics("aws", "prod")
+            sqlite_db.query(VendorSyncState).update(
+                {
+                    "last_synced_at": datetime.utcnow() - timedelta(days=2),
+                    "daily_covered_to": today - timedelta(days=2),
+                }
             )
+            sqlite_db.commit()
+            await service.refresh_vendor_metrics("aws", "prod")
+
+        # THEN
+        monthly_end = mock_aws_instance.get_monthly_costs.await_args.args[1]
+        assert mock_aws_instance.get_monthly_costs.await_count == 1
+        assert monthly_end == ((last_month - timedelta(days=1)).strftime("%m-%Y"))
+        first, second = mock_aws_instance.get_daily_costs.await_args_list
+        assert first.args == (last_month, today)
+        assert second.args == (max(last_month, today - timedelta(days=5)), today)
+
+        metrics = {row.month: row.cost for row in sqlite_db.query(VendorMetrics).all()}
+        assert metrics == {
+            last_month: float((this_month - last_month).days),
+            this_month: float(today.day),
+        }
+        assert sqlite_db.query(VendorDailyCost).count() == (today - last_month).days + 1
+        state = sqlite_db.query(VendorSyncState).one()
+        assert (state.daily_covered_from, state.daily_covered_to) == (
+            last_month,
+            today,
+        )
 
-            # THEN
-            assert len(results["success"]) == 1  # AWS update succeeded
-            assert len(results["failed"]) == 1  # Datadog update failed
-            assert any("AWS metrics updated" in msg for msg in results["success"])
-            assert any(
-                "Failed to update Datadog metrics" in msg for msg in results["failed"]
+    def test_get_cost_breakdown_top_datadog_products(self, sqlite_db):
+        """
+        GIVEN stored Datadog charges for several products and charge types
+        WHEN the cost breakdown is requested
+        THEN products are ranked by their total charges over the period
+        """
+        # GIVEN
+        service = VendorMetricsService(1, sqlite_db)
+        month = datetime.now().strftime("%m-%Y")
+        charges = [
+            ("infra_hosts", "committed", 80.0),
+            ("infra_hosts", "total", 100.0),
+            ("logs", "total", 250.0),
+            ("apm_hosts", "total", 40.0),
+        ]
+        service._store_breakdown(
+            "datadog",
+            "main",
+            {month},
+            [
+                {
+                    "month": month,
+                    "product_name": product,
+                    "charge_type": charge_type,
+                    "cost": cost,
+                }
+                for product, charge_type, cost in charges
+            ],
+        )
+
+        # WHEN
+        result = service.get_cost_breakdown("datadog", "main", limit=2)
+
+        # THEN
+        assert result == {
+            "data": [
+                {"name": "logs", "cost": 250.0},
+                {"name": "infra_hosts", "cost": 100.0},
+            ]
+        }
+
+    def test_stored_metrics_are_ordered_by_date(self, sqlite_db):
+        """
+        GIVEN months stored out of order across three years
+        WHEN the stored metrics are read
+        THEN this year's and last year's months come back oldest first
+        AND in the MM-YYYY format
+        """
+        # GIVEN
+        year = datetime.now().year
+        for month in (date(year, 1, 1), date(year - 1, 12, 1), date(year - 2, 6, 1)):
+            sqlite_db.add(
+                VendorMetrics(
+                    user_id=1, vendor="aws", identifier="prod", month=month, cost=1.0
+                )
             )
+        sqlite_db.commit()
+
+        # WHEN
+        result = VendorMetricsService(1, sqlite_db).get_stored_vendor_metrics(
+            "aws", "prod"
+        )
+
+        # THEN
+        assert [item["month"] for item in result["data"]] == [
+            f"12-{year - 1}",
+            f"01-{year}",
+        ]
+
+    def test_store_metrics_skips_unchanged_rows(self, sqlite_db):
+        """
+        GIVEN stored metrics for two months
+        WHEN one month changes, one stays the same and one is new
+        THEN only the changed and new rows are written and counted as such
+        """
+        # GIVEN
+        service = VendorMetricsService(1, sqlite_db)
+        service._store_metrics(
+            "aws",
+            "prod",
+            [{"month": "01-2025", "cost": 10.0}, {"month": "02-2025", "cost": 20.0}],
+        )
+        stamps = {m.month: m.updated_at for m in sqlite_db.query(VendorMetrics)}
+
+        # WHEN
+        counts = service._store_metrics(
+            "aws",
+            "prod",
+            [
+                {"month": "01-2025", "cost": 10.0},
+                {"month": "02-2025", "cost": 25.0},
+                {"month": "03-2025", "cost": 30.0},
+            ],
+        )
+
+        # THEN
+        assert counts == {"inserted": 1, "updated": 1, "unchanged": 1}
+        sqlite_db.expire_all()
+        rows = {m.month: m for m in sqlite_db.query(VendorMetrics)}
+        january, february = date(2025, 1, 1), date(2025, 2, 1)
+        assert rows[january].updated_at == stamps[january]
+        assert rows[february].updated_at > stamps[february]
+        assert rows[february].cost == 25.0
+        assert rows[date(2025, 3, 1)].cost == 30.0
+
+    @pytest.mark.asyncio
+    async def test_get_and_store_vendor_metrics_invalid_vendor(
+        self, mock_db, mock_user
+    ):
+        """
+        GIVEN a VendorMetricsService instance
+        WHEN get_and_store_vendor_metrics is called with invalid vendor
+        THEN it should raise ValueError
+        """
+        # GIVEN
+        service = VendorMetricsService(mock_user.id, mock_db)
+
+        # WHEN/THEN
+        with pytest.raises(ValueError, match="Unsupported vendor: invalid"):
+            await service.get_and_store_vendor_metrics("invalid", "test-config")
@@ -1,11 +1,13 @@
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from unittest.mock import patch, MagicMock
 from app.main import app
 from app.models import Base, User
-from app.helpers.database import get_db
+from app.helpers.database import get_async_db, get_db
 from app.helpers.auth import get_authenticated_user
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
@@ -13,6 +15,8 @@ engine = create_engine(
     SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+async_engine = create_async_engine("sqlite+aiosqlite:///./test.db", poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
 
 
 def override_get_db():
@@ -23,6 +27,11 @@ def override_get_db():
         db.close()
 
 
+async def override_get_async_db():
+    async with TestingAsyncSessionLocal() as db:
+        yield db
+
+
 @pytest.fixture(scope="module")
 def mock_secrets_service():
     with patch("app.helpers.secrets_service.SecretsService", autospec=True) as mock:
@@ -36,6 +45,7 @@ def mock_secrets_service():
 def test_client(mock_secrets_service):
     Base.metadata.create_all(bind=engine)
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
     app.dependency_overrides[get_authenticated_user] = lambda: {"sub": "test-user-123"}
 
     client = TestClient(app)
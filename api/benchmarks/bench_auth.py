@@ -0,0 +1,107 @@
+"""
+Microbenchmark for the JWT validation path.
+
+Compares a cold validation (signature verified, key parsed from the JWKS)
+against a warm one (claims served from the token cache). The JWKS fetch and
+secrets lookups are stubbed so only local CPU work is measured.
+
+Run from the api directory: python -m benchmarks.bench_auth [iterations]
+"""
+
+import asyncio
+import base64
+import sys
+import time
+from unittest.mock import patch
+
+import httpx
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwt
+
+from app.helpers import auth
+from app.helpers.jwks import JWKSCache
+
+DOMAIN = "bench.auth0.com"
+AUDIENCE = "bench-audience"
+KID = "bench-key"
+
+
+class BenchSecrets:
+    AppSecretKey = "bench"
+    Auth0Domain = DOMAIN
+    Auth0Audience = AUDIENCE
+
+    @classmethod
+    async def aload(cls):
+        return cls()
+
+
+def _b64_uint(value: int) -> str:
+    raw = value.to_bytes((value.bit_length() + 7) // 8, "big")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def make_token_and_jwks():
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    numbers = private_key.public_key().public_numbers()
+    jwks = {
+        "keys": [
+            {
+                "kid": KID,
+                "kty": "RSA",
+                "alg": "RS256",
+                "use": "sig",
+                "n": _b64_uint(numbers.n),
+                "e": _b64_uint(numbers.e),
+            }
+        ]
+    }
+    private_pem = private_key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption(),
+    )
+    token = jwt.encode(
+        {
+            "sub": "auth0|bench",
+            "aud": AUDIENCE,
+            "iss": f"https://{DOMAIN}/",
+            "exp": int(time.time()) + 3600,
+        },
+        private_pem,
+        algorithm="RS256",
+        headers={"kid": KID},
+    )
+    return token, jwks
+
+
+async def run(iterations: int) -> None:
+    token, jwks = make_token_and_jwks()
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, json=jwks))
+
+    with patch.object(auth, "Secrets", BenchSecrets), patch.object(
+        auth, "jwks_cache", JWKSCache(transport=transport)
+    ):
+        await auth.validate_jwt(token)
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            auth.signing_key_cache.clear()
+            auth.claims_cache.clear()
+            await auth.validate_jwt(token)
+        cold = (time.perf_counter() - start) / iterations
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            await auth.validate_jwt(token)
+        warm = (time.perf_counter() - start) / iterations
+
+    print(f"iterations: {iterations}")
+    print(f"cold (verify signature): {cold * 1e6:10.1f} us/op")
+    print(f"warm (cached claims):    {warm * 1e6:10.1f} us/op")
+    print(f"speedup:                 {cold / warm:10.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(run(int(sys.argv[1]) if len(sys.argv) > 1 else 1000))
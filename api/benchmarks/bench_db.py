@@ -0,0 +1,88 @@
+"""
+Throughput benchmark for request handlers on the sync and async sessions.
+
+Serves the same query from two `async def` routes, one on a psycopg2 session
+from get_db and one on an asyncpg session from get_async_db, and drives each
+with concurrent requests in process. The query sleeps on the server to stand
+in for network and query latency; a sync query blocks the event loop for
+that long, an async one lets the other requests proceed.
+
+Needs a Postgres database in DATABASE_URL; no tables are touched.
+
+Run from the api directory:
+python -m benchmarks.bench_db [requests] [concurrency] [query_ms]
+"""
+
+import asyncio
+import sys
+import time
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.helpers.database import async_engine, engine, get_async_db, get_db
+
+QUERY = text("SELECT pg_sleep(:seconds)")
+
+app = FastAPI()
+
+
+@app.get("/sync")
+async def sync_query(seconds: float, db: Session = Depends(get_db)):
+    db.execute(QUERY, {"seconds": seconds})
+    return {}
+
+
+@app.get("/async")
+async def async_query(seconds: float, db: AsyncSession = Depends(get_async_db)):
+    await db.execute(QUERY, {"seconds": seconds})
+    return {}
+
+
+async def measure(
+    client: httpx.AsyncClient, path: str, requests: int, concurrency: int, ms: float
+) -> float:
+    """Requests per second for `requests` calls, `concurrency` at a time."""
+    limit = asyncio.Semaphore(concurrency)
+
+    async def call():
+        async with limit:
+            response = await client.get(path, params={"seconds": ms / 1000})
+            response.raise_for_status()
+
+    # Warm both pools so connection setup is not measured
+    await asyncio.gather(*(call() for _ in range(concurrency)))
+    start = time.perf_counter()
+    await asyncio.gather(*(call() for _ in range(requests)))
+    return requests / (time.perf_counter() - start)
+
+
+async def run(requests: int, concurrency: int, ms: float) -> None:
+    if engine.dialect.name != "postgresql":
+        sys.exit("bench_db needs DATABASE_URL to point at Postgres")
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as c:
+        sync_rps = await measure(c, "/sync", requests, concurrency, ms)
+        async_rps = await measure(c, "/async", requests, concurrency, ms)
+    await async_engine.dispose()
+    engine.dispose()
+
+    print(f"requests: {requests}, concurrency: {concurrency}, query: {ms} ms")
+    print(f"sync session (psycopg2): {sync_rps:10.1f} req/s")
+    print(f"async session (asyncpg): {async_rps:10.1f} req/s")
+    print(f"speedup:                 {async_rps / sync_rps:10.1f}x")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    asyncio.run(
+        run(
+            int(args[0]) if len(args) > 0 else 500,
+            int(args[1]) if len(args) > 1 else 10,
+            float(args[2]) if len(args) > 2 else 5.0,
+        )
+    )